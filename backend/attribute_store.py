@@ -0,0 +1,237 @@
+import math
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+NUTRITION_FIELDS = ("calories", "protein", "carbs", "fat", "fiber", "sugar")
+
+# total_time is derived from prep_time + cook_time
+NUMERIC_FIELDS = ("prep_time", "cook_time", "total_time", "servings") + NUTRITION_FIELDS
+
+CATEGORY_FIELDS = ("cuisine",)
+
+# Sorted indexes are rebuilt once this many rows changed since the last build
+REBUILD_THRESHOLD = 1024
+
+FILTER_RE = re.compile(r"^\s*([a-z_]+)\s*(<=|>=|<|>|=)\s*(.+?)\s*$")
+
+
+def numeric_values(recipe: Dict[str, Any]) -> Dict[str, float]:
+    nutrition = recipe.get("nutrition") or {}
+    values = {field: recipe.get(field) for field in ("prep_time", "cook_time", "servings")}
+    values.update((field, nutrition.get(field)) for field in NUTRITION_FIELDS)
+    times = [value for value in (values["prep_time"], values["cook_time"]) if value is not None]
+    values["total_time"] = sum(times) if times else None
+    return {
+        field: float(value) if isinstance(value, (int, float)) else math.nan
+        for field, value in values.items()
+    }
+
+
+class Range:
+    """
+    Bounds on one numeric field, narrowed by each condition added
+    """
+
+    def __init__(self):
+        self.low = -math.inf
+        self.low_inclusive = True
+        self.high = math.inf
+        self.high_inclusive = True
+
+    def add(self, op: str, value: float):
+        if op in (">", ">=", "=") and (value > self.low or (value == self.low and op == ">")):
+            self.low, self.low_inclusive = value, op != ">"
+        if op in ("<", "<=", "=") and (value < self.high or (value == self.high and op == "<")):
+            self.high, self.high_inclusive = value, op != "<"
+
+    def bounds(self, values: np.ndarray) -> Tuple[int, int]:
+        """
+        Slice of sorted values inside the range
+        """
+        start = np.searchsorted(values, self.low, side="left" if self.low_inclusive else "right")
+        end = np.searchsorted(values, self.high, side="right" if self.high_inclusive else "left")
+        return int(start), int(max(start, end))
+
+    def mask(self, values: np.ndarray) -> np.ndarray:
+        low = values >= self.low if self.low_inclusive else values > self.low
+        high = values <= self.high if self.high_inclusive else values < self.high
+        return low & high
+
+
+def parse_filters(text: str) -> Tuple[Dict[str, Range], Dict[str, str]]:
+    """
+    Parse filters such as "calories<500,protein>30,cuisine=italian" into
+    numeric ranges and category equalities. Raises ValueError when a
+    condition is malformed or names an unknown field.
+    """
+    ranges: Dict[str, Range] = {}
+    categories: Dict[str, str] = {}
+    for condition in filter(None, (part.strip() for part in text.split(","))):
+        match = FILTER_RE.match(condition)
+        if match is None:
+            raise ValueError(f"Invalid filter: {condition}")
+        field, op, value = match.groups()
+        if field in CATEGORY_FIELDS:
+            if op != "=":
+                raise ValueError(f"Only = is supported for {field}")
+            categories[field] = value.lower()
+        elif field in NUMERIC_FIELDS:
+            try:
+                number = float(value)
+            except ValueError:
+                raise ValueError(f"Invalid number in filter: {condition}")
+            ranges.setdefault(field, Range()).add(op, number)
+        else:
+            raise ValueError(f"Unknown filter field: {field}")
+    return ranges, categories
+
+
+class RowSet:
+    """
+    Membership test over a set of store rows, used to restrict text search
+    results without materializing a set of recipe IDs
+    """
+
+    def __init__(self, rows_by_id: Dict[str, int], mask: np.ndarray):
+        self._rows_by_id = rows_by_id
+        self._mask = mask
+
+    def __contains__(self, recipe_id: str) -> bool:
+        row = self._rows_by_id.get(recipe_id)
+        return row is not None and row < len(self._mask) and bool(self._mask[row])
+
+
+class AttributeStore:
+    """
+    Column-oriented store of the numeric recipe attributes.
+
+    Each attribute lives in a float64 array indexed by row (NaN when
+    unset), next to a sorted index of (value, row) pairs. A filter narrows
+    its candidates with a binary search on the most selective range, then
+    checks every condition with vectorized masks over just those rows.
+
+    Writes update the columns in place and record the row as dirty. Dirty
+    rows are always re-checked, so the sorted indexes stay correct between
+    rebuilds and are only rebuilt after REBUILD_THRESHOLD writes.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._columns = {field: np.full(capacity, np.nan) for field in NUMERIC_FIELDS}
+        self._cuisine = np.full(capacity, -1, dtype=np.int32)
+        self._cuisine_codes: Dict[str, int] = {}
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._rows: Dict[str, int] = {}
+        self._recipe_ids: List[Optional[str]] = []
+        self._free_rows: List[int] = []
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._dirty: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _grow(self, size: int):
+        capacity = len(self._alive)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 2)
+        for field, column in self._columns.items():
+            grown = np.full(capacity, np.nan)
+            grown[:len(column)] = column
+            self._columns[field] = grown
+        cuisine = np.full(capacity, -1, dtype=np.int32)
+        cuisine[:len(self._cuisine)] = self._cuisine
+        self._cuisine = cuisine
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self._alive)] = self._alive
+        self._alive = alive
+
+    def add(self, recipe_id: str, recipe: Dict[str, Any]):
+        """
+        Store or replace a recipe's attributes
+        """
+        row = self._rows.get(recipe_id)
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+                self._recipe_ids[row] = recipe_id
+            else:
+                row = len(self._recipe_ids)
+                self._grow(row + 1)
+                self._recipe_ids.append(recipe_id)
+            self._rows[recipe_id] = row
+
+        for field, value in numeric_values(recipe).items():
+            self._columns[field][row] = value
+        cuisine = (recipe.get("cuisine") or "").lower()
+        self._cuisine[row] = self._cuisine_codes.setdefault(cuisine, len(self._cuisine_codes)) if cuisine else -1
+        self._alive[row] = True
+        self._dirty.add(row)
+
+    def remove(self, recipe_id: str) -> bool:
+        row = self._rows.pop(recipe_id, None)
+        if row is None:
+            return False
+        for column in self._columns.values():
+            column[row] = np.nan
+        self._cuisine[row] = -1
+        self._alive[row] = False
+        self._recipe_ids[row] = None
+        self._free_rows.append(row)
+        self._dirty.add(row)
+        return True
+
+    def clear(self):
+        self.__init__()
+
+    def _ensure_sorted(self):
+        if self._sorted and len(self._dirty) < REBUILD_THRESHOLD:
+            return
+        size = len(self._recipe_ids)
+        for field, column in self._columns.items():
+            values = column[:size]
+            rows = np.flatnonzero(self._alive[:size] & ~np.isnan(values))
+            rows = rows[np.argsort(values[rows], kind="stable")]
+            self._sorted[field] = (values[rows], rows)
+        self._dirty.clear()
+
+    def query(self, ranges: Dict[str, Range], categories: Dict[str, str]) -> np.ndarray:
+        """
+        Return the rows matching every range and category, in row order
+        """
+        size = len(self._recipe_ids)
+        if ranges:
+            self._ensure_sorted()
+            best = None
+            for field, bounds in ranges.items():
+                values, rows = self._sorted[field]
+                start, end = bounds.bounds(values)
+                if best is None or end - start < len(best):
+                    best = rows[start:end]
+            dirty = np.fromiter(self._dirty, dtype=np.intp, count=len(self._dirty))
+            candidates = np.union1d(best, dirty)
+        else:
+            candidates = np.arange(size)
+
+        mask = self._alive[candidates]
+        for field, bounds in ranges.items():
+            mask &= bounds.mask(self._columns[field][candidates])
+        for field, value in categories.items():
+            code = self._cuisine_codes.get(value)
+            if code is None:
+                return candidates[:0]
+            mask &= self._cuisine[candidates] == code
+        return candidates[mask]
+
+    def recipe_ids(self, rows: np.ndarray, limit: Optional[int] = None) -> List[str]:
+        return [self._recipe_ids[row] for row in rows[:limit].tolist()]
+
+    def row_set(self, rows: np.ndarray) -> RowSet:
+        mask = np.zeros(len(self._recipe_ids), dtype=bool)
+        mask[rows] = True
+        return RowSet(self._rows, mask)
+
+
+# Shared store for the running application
+attribute_store = AttributeStore()
@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import urllib.request
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import Header, HTTPException, status
+
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Certificates Google signs Firebase ID tokens with
+GOOGLE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+# Used when the certificate response has no usable max-age
+DEFAULT_CERTS_MAX_AGE = 3600
+
+# Minimum interval between refreshes triggered by an unknown key ID
+MIN_FORCED_REFRESH_SECONDS = 60
+
+CLOCK_SKEW_SECONDS = 10
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv("VERIFIED_TOKEN_CACHE_SIZE", "10000"))
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def get_project_id() -> Optional[str]:
+    """
+    Return the Firebase project ID from FIREBASE_PROJECT_ID or the service
+    account credentials file
+    """
+    project_id = os.getenv("FIREBASE_PROJECT_ID")
+    if project_id:
+        return project_id
+    path = os.getenv(
+        "FIREBASE_CREDENTIALS",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "firebase-credentials.json"),
+    )
+    try:
+        with open(path) as f:
+            return json.load(f).get("project_id")
+    except (OSError, ValueError):
+        return None
+
+
+def fetch_google_certs() -> Tuple[Dict[str, str], int]:
+    """
+    Download Google's signing certificates. Returns the kid -> PEM mapping
+    and how long it may be cached, from the Cache-Control header.
+    """
+    with urllib.request.urlopen(GOOGLE_CERTS_URL, timeout=10) as response:
+        if response.status != 200:
+            raise OSError(f"Certificate request returned HTTP {response.status}")
+        certs = json.loads(response.read())
+        match = MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+    if not isinstance(certs, dict) or not all(isinstance(pem, str) for pem in certs.values()):
+        raise ValueError("Certificate response is not a key ID to PEM mapping")
+    return certs, int(match.group(1)) if match else DEFAULT_CERTS_MAX_AGE
+
+
+class TokenError(Exception):
+    pass
+
+
+class TokenVerifier:
+    """
+    Verifies Firebase ID tokens locally.
+
+    Signatures are checked against Google's public certificates, which are
+    fetched once and refreshed when their Cache-Control max-age runs out or
+    a token names an unknown key. If a refresh fails, the last certificates
+    fetched stay in use until their max-age runs out. Tokens that verified successfully are
+    remembered by hash until they expire, so repeat requests skip the RSA
+    check entirely. fetch_certs can be replaced to verify against a locally
+    generated key pair, e.g. in tests.
+    """
+
+    def __init__(
+        self,
+        project_id: Optional[str],
+        fetch_certs: Callable[[], Tuple[Dict[str, str], int]] = fetch_google_certs,
+        cache_size: int = VERIFIED_TOKEN_CACHE_SIZE,
+    ):
+        self.project_id = project_id
+        self.fetch_certs = fetch_certs
+        self._keys: Dict[str, Any] = {}
+        self._keys_expire = 0.0
+        self._last_refresh = float("-inf")
+        self._refresh_lock = asyncio.Lock()
+        self._verified = LRUCache(max_entries=cache_size)
+
+    async def _refresh_keys(self, force: bool = False):
+        async with self._refresh_lock:
+            now = time.monotonic()
+            if now < self._keys_expire and (not force or now - self._last_refresh < MIN_FORCED_REFRESH_SECONDS):
+                return
+            from cryptography.x509 import load_pem_x509_certificate
+
+            try:
+                certs, max_age = await asyncio.to_thread(self.fetch_certs)
+                keys = {
+                    kid: load_pem_x509_certificate(pem.encode()).public_key()
+                    for kid, pem in certs.items()
+                }
+            except (OSError, ValueError) as e:
+                # Also rate limits forced retries while the fetch fails
+                self._last_refresh = time.monotonic()
+                if self._last_refresh < self._keys_expire:
+                    logger.warning("Refreshing the token signing keys failed, keeping the current ones: %s", e)
+                    return
+                raise TokenError(f"Signing keys unavailable: {str(e)}")
+            self._keys = keys
+            self._last_refresh = time.monotonic()
+            self._keys_expire = self._last_refresh + max_age
+
+    async def _signing_key(self, kid: str) -> Any:
+        if time.monotonic() >= self._keys_expire:
+            await self._refresh_keys()
+        key = self._keys.get(kid)
+        if key is None:
+            # Google may have rotated keys before our copy expired; forced
+            # refreshes are rate limited so bogus key IDs cannot trigger a
+            # fetch per request
+            await self._refresh_keys(force=True)
+            key = self._keys.get(kid)
+        if key is None:
+            raise TokenError("Token signed with an unknown key")
+        return key
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Return the claims of a valid ID token, or raise TokenError
+        """
+        if not self.project_id:
+            raise TokenError("Firebase project ID is not configured")
+
+        cache_key = hashlib.sha256(token.encode()).hexdigest()
+        claims = self._verified.get(cache_key)
+        if claims is not None:
+            return claims
+
+        # Imported on first use; PyJWT pulls in cryptography, which is
+        # slow to import and not needed until a token must be checked
+        import jwt
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise TokenError(f"Malformed token: {str(e)}")
+        if header.get("alg") != "RS256":
+            raise TokenError("Token must be signed with RS256")
+
+        key = await self._signing_key(header.get("kid", ""))
+        try:
+            claims = jwt.decode(
+                token,
+                key=key,
+                algorithms=["RS256"],
+                audience=self.project_id,
+                issuer=f"https://securetoken.google.com/{self.project_id}",
+                leeway=CLOCK_SKEW_SECONDS,
+                options={"require": ["exp", "iat", "sub"]},
+            )
+        except jwt.PyJWTError as e:
+            raise TokenError(str(e))
+        if not claims.get("sub"):
+            raise TokenError("Token has no subject")
+        if claims.get("auth_time", 0) > time.time() + CLOCK_SKEW_SECONDS:
+            raise TokenError("Token auth_time is in the future")
+
+        self._verified.set(cache_key, claims, ttl=claims["exp"] - time.time())
+        return claims
+
+
+# Shared verifier for the running application
+token_verifier = TokenVerifier(get_project_id())
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    if authorization and authorization.lower().startswith("bearer "):
+        return authorization[7:].strip()
+    return None
+
+
+async def get_current_user(authorization: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """
+    FastAPI dependency returning the verified claims of the caller's
+    Authorization: Bearer ID token
+    """
+    token = bearer_token(authorization)
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing bearer token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        return await token_verifier.verify(token)
+    except TokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Authentication failed: {str(e)}",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
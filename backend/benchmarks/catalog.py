@@ -0,0 +1,94 @@
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List
+
+# Word pools for synthetic recipes. Sizes are chosen so text and ingredient
+# postings have a realistic skew: a few very common terms, a long tail.
+CUISINES = ["italian", "indian", "mexican", "thai", "french", "japanese", "greek", "american", "chinese", "spanish"]
+PROTEINS = ["chicken", "beef", "pork", "tofu", "salmon", "shrimp", "lamb", "chickpeas", "lentils", "eggs", "turkey", "cod"]
+VEGETABLES = [
+    "onion", "garlic", "tomato", "spinach", "carrot", "bell pepper", "zucchini", "mushroom", "broccoli",
+    "potato", "eggplant", "kale", "cabbage", "leek", "celery", "peas", "corn", "cauliflower", "asparagus",
+]
+PANTRY = [
+    "olive oil", "butter", "salt", "black pepper", "flour", "rice", "pasta", "cream", "parmesan cheese",
+    "soy sauce", "lemon", "lime", "cumin", "paprika", "ginger", "coconut milk", "basil", "cilantro",
+    "oregano", "thyme", "honey", "vinegar", "chili flakes", "stock", "yogurt", "mustard", "sesame oil",
+]
+DISHES = ["stew", "curry", "salad", "stir fry", "soup", "tacos", "bake", "skewers", "risotto", "bowl", "pie", "noodles"]
+STYLES = ["spicy", "creamy", "smoky", "crispy", "quick", "rustic", "herbed", "roasted", "grilled", "zesty", "classic"]
+UNITS = [("g", 50, 800), ("ml", 20, 500), ("tbsp", 1, 4), ("tsp", 0.5, 3), ("pcs", 1, 6), ("cup", 0.25, 2)]
+TAGS = ["dinner", "lunch", "vegetarian", "vegan", "gluten-free", "quick", "family", "meal-prep", "comfort", "healthy"]
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def recipe_id(number: int) -> str:
+    return f"bench-{number:07d}"
+
+
+def _ingredients(rng: random.Random, protein: str) -> List[Dict[str, Any]]:
+    names = [protein] + rng.sample(VEGETABLES, rng.randint(2, 5)) + rng.sample(PANTRY, rng.randint(3, 7))
+    ingredients = []
+    for name in names:
+        unit, low, high = rng.choice(UNITS)
+        ingredients.append({"name": name, "quantity": round(rng.uniform(low, high), 1), "unit": unit})
+    return ingredients
+
+
+def generate_recipe(rng: random.Random, number: int) -> Dict[str, Any]:
+    """
+    One recipe following the recipes collection schema in db_setup.py
+    """
+    cuisine = rng.choice(CUISINES)
+    protein = rng.choice(PROTEINS)
+    style = rng.choice(STYLES)
+    dish = rng.choice(DISHES)
+    ingredients = _ingredients(rng, protein)
+    created_at = EPOCH + timedelta(seconds=number * 37)
+    return {
+        "id": recipe_id(number),
+        "title": f"{style.title()} {cuisine.title()} {protein.title()} {dish.title()} {number}",
+        "chef_id": f"chef-{rng.randrange(1000)}",
+        "description": (
+            f"A {style} {dish} with {protein}, {ingredients[1]['name']} and {ingredients[-1]['name']}, "
+            f"inspired by {cuisine} home cooking."
+        ),
+        "media": [f"https://images.example.com/recipes/{number}/{index}.jpg" for index in range(rng.randint(1, 3))],
+        "cuisine": cuisine,
+        "prep_time": rng.randrange(5, 60, 5),
+        "cook_time": rng.randrange(0, 180, 5),
+        "servings": rng.randint(1, 8),
+        "ingredients": ingredients,
+        "steps": [
+            {"order": order, "description": f"Step {order}: prepare the {ingredient['name']}.", "time": rng.randint(1, 20)}
+            for order, ingredient in enumerate(ingredients[:rng.randint(3, 8)], start=1)
+        ],
+        "nutrition": {
+            "calories": rng.randint(150, 1200),
+            "protein": round(rng.uniform(2, 70), 1),
+            "carbs": round(rng.uniform(5, 120), 1),
+            "fat": round(rng.uniform(1, 60), 1),
+            "fiber": round(rng.uniform(0, 15), 1),
+            "sugar": round(rng.uniform(0, 40), 1),
+        },
+        "scaling_factors": {
+            "shrinkage": round(rng.uniform(0, 0.3), 2),
+            "waste": round(rng.uniform(0, 0.15), 2),
+            "time_adjustment": round(rng.uniform(0, 0.5), 2),
+        },
+        "tags": rng.sample(TAGS, rng.randint(1, 4)) + [cuisine],
+        "version": 1,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def generate_catalog(size: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Yield size recipes. The same size and seed always produce the same
+    catalog, so runs are comparable.
+    """
+    rng = random.Random(seed)
+    for number in range(size):
+        yield generate_recipe(rng, number)
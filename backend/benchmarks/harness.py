@@ -0,0 +1,271 @@
+import asyncio
+import math
+import os
+import random
+import resource
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+import derived_state
+from benchmarks.catalog import CUISINES, DISHES, PANTRY, PROTEINS, STYLES, VEGETABLES, generate_catalog, recipe_id
+from cache import response_cache
+from repository import recipe_key
+
+SEED_BATCH_SIZE = 1000
+
+# method, path, JSON body
+Call = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+def _any_id(rng: random.Random, size: int) -> str:
+    return recipe_id(rng.randrange(size))
+
+
+def _typo(rng: random.Random, word: str) -> str:
+    """
+    word with one letter after the first dropped
+    """
+    position = rng.randrange(1, len(word))
+    return word[:position] + word[position + 1:]
+
+
+# Each endpoint builds a request for a catalog of the given size. IDs and
+# terms are drawn at random so the response cache, when enabled, sees a
+# realistic hit rate instead of one hot key.
+ENDPOINTS: Dict[str, Callable[[random.Random, int], Call]] = {
+    "recipes_list": lambda rng, size: ("GET", "/api/recipes/?limit=20", None),
+    "recipes_list_fields": lambda rng, size: ("GET", "/api/recipes/?limit=20&fields=title,media[0]", None),
+    "recipe_get": lambda rng, size: ("GET", f"/api/recipes/{_any_id(rng, size)}", None),
+    "recipes_batch": lambda rng, size: (
+        "POST", "/api/recipes/batch", {"ids": [_any_id(rng, size) for _ in range(30)]},
+    ),
+    "search_text": lambda rng, size: (
+        "GET", f"/api/search/?query={rng.choice(PROTEINS)}+{rng.choice(DISHES)}&prefix=false", None,
+    ),
+    "search_prefix": lambda rng, size: ("GET", f"/api/search/?query={rng.choice(STYLES)[:3]}", None),
+    "search_filters": lambda rng, size: (
+        "GET",
+        f"/api/search/?query={rng.choice(PROTEINS)}&filters=calories<{rng.randrange(300, 900)},"
+        f"cuisine={rng.choice(CUISINES)}",
+        None,
+    ),
+    "search_filters_only": lambda rng, size: (
+        "GET", f"/api/search/?filters=total_time<{rng.randrange(20, 90)},protein>{rng.randrange(10, 50)}", None,
+    ),
+    "search_fuzzy": lambda rng, size: ("GET", f"/api/search/?query={_typo(rng, rng.choice(DISHES))}", None),
+    "suggest": lambda rng, size: ("GET", f"/api/search/suggest?q={rng.choice(PROTEINS)}+{rng.choice(DISHES)[:2]}", None),
+    "suggest_fuzzy": lambda rng, size: ("GET", f"/api/search/suggest?q={_typo(rng, rng.choice(DISHES))[:5]}", None),
+    "search_ingredients": lambda rng, size: (
+        "GET",
+        "/api/search/ingredients?ingredients="
+        + ",".join([rng.choice(PROTEINS)] + rng.sample(VEGETABLES, 2) + rng.sample(PANTRY, 2)),
+        None,
+    ),
+    "scale_recipe": lambda rng, size: (
+        "POST", f"/api/scaling/{_any_id(rng, size)}", {"yields": [2, rng.randint(3, 12)]},
+    ),
+}
+
+
+def rss_mb(pid: Optional[int] = None) -> float:
+    """
+    Current resident set size of a process in MB, from /proc where
+    available, else the peak RSS of this process
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def seed_catalog(app, size: int, seed: int):
+    """
+    Insert a synthetic catalog through the app's repository and index it,
+    like a bulk import would. A non-empty MongoDB collection of the same
+    size is reused as is; any other size is refused rather than modified.
+    """
+    repository = app.state.recipes
+    existing = await repository.collection.count_documents({"_id": {"$regex": "^bench-"}})
+    if existing == size:
+        return
+    if existing:
+        raise SystemExit(f"Store already holds {existing} benchmark recipes, expected 0 or {size}")
+
+    batch: List[Dict[str, Any]] = []
+    for recipe in generate_catalog(size, seed):
+        batch.append(recipe)
+        if len(batch) >= SEED_BATCH_SIZE:
+            await _insert(repository, batch)
+            batch = []
+    if batch:
+        await _insert(repository, batch)
+    response_cache.clear()
+
+
+async def _insert(repository, recipes: List[Dict[str, Any]]):
+    documents = [
+        {"_id": recipe_key(recipe["id"]), **{key: value for key, value in recipe.items() if key != "id"}}
+        for recipe in recipes
+    ]
+    failures = dict(await repository.insert_many(documents))
+    for index, recipe in enumerate(recipes):
+        if index not in failures:
+            derived_state.index_recipe(recipe["id"], recipe)
+
+
+@asynccontextmanager
+async def seeded_app(size: int, seed: int, cache: bool):
+    """
+    Run the application's lifespan with a synthetic catalog loaded
+    """
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        await seed_catalog(app, size, seed)
+        app.state.seed_seconds = time.perf_counter() - started
+        if not cache:
+            response_cache.local.max_entries = 0
+            response_cache.shared = None
+        yield app
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    if not latencies:
+        return {"requests": 0, "errors": errors}
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(values.mean()), 3),
+        "max_ms": round(float(values.max()), 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    build: Callable[[random.Random, int], Call],
+    size: int,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    seed: int,
+) -> Dict[str, Any]:
+    """
+    Send requests from concurrency closed-loop workers and summarize their
+    latencies. Responses other than 2xx count as errors.
+    """
+    rng = random.Random(seed)
+    calls = [build(rng, size) for _ in range(warmup + requests)]
+    for method, path, body in calls[:warmup]:
+        await client.request(method, path, json=body)
+
+    pending = iter(calls[warmup:])
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for method, path, body in pending:
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - started)
+            if not response.is_success:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def scaling_exponents(runs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fit p50 latency against catalog size on a log-log scale. The slope is
+    the empirical growth exponent: about 0 for constant time endpoints and
+    about 1 for ones that scan the catalog.
+    """
+    curves: Dict[str, List[Tuple[int, float]]] = {}
+    for run in runs:
+        for name, result in run["endpoints"].items():
+            if result.get("p50_ms"):
+                curves.setdefault(name, []).append((run["size"], result["p50_ms"]))
+
+    exponents = {}
+    for name, points in curves.items():
+        if len({size for size, _ in points}) < 2:
+            continue
+        sizes = np.log([size for size, _ in points])
+        latencies = np.log([latency for _, latency in points])
+        slope = float(np.polyfit(sizes, latencies, 1)[0])
+        exponents[name] = {
+            "exponent": round(slope, 3),
+            "growth": "constant" if slope < 0.2 else "sublinear" if slope < 0.7 else "linear or worse",
+            "points": [{"size": size, "p50_ms": latency} for size, latency in points],
+        }
+    return exponents
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Per endpoint and catalog size, the change of p50 and p95 latency
+    relative to a baseline result file. Entries whose latency grew by more
+    than threshold are flagged as regressions.
+    """
+    baseline_runs = {run["size"]: run["endpoints"] for run in baseline.get("runs", [])}
+    rows = []
+    for run in current["runs"]:
+        previous = baseline_runs.get(run["size"], {})
+        for name, result in run["endpoints"].items():
+            before = previous.get(name)
+            if not before or not before.get("p50_ms") or not result.get("p50_ms"):
+                continue
+            ratios = {
+                metric: result[metric] / before[metric]
+                for metric in ("p50_ms", "p95_ms")
+                if before.get(metric)
+            }
+            rows.append({
+                "size": run["size"],
+                "endpoint": name,
+                **{f"{metric}_ratio": round(ratio, 3) for metric, ratio in ratios.items()},
+                "regression": any(ratio > 1 + threshold for ratio in ratios.values()),
+            })
+    return rows
+
+
+def format_table(run: Dict[str, Any]) -> str:
+    lines = [
+        f"catalog size {run['size']}  (seeded in {run['seed_seconds']:.1f}s, RSS {run['rss_mb']:.0f} MB)",
+        f"  {'endpoint':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>10}{'errors':>8}{'RSS MB':>9}",
+    ]
+    for name, result in run["endpoints"].items():
+        lines.append(
+            f"  {name:<22}{result.get('p50_ms', math.nan):>10.2f}{result.get('p95_ms', math.nan):>10.2f}"
+            f"{result.get('p99_ms', math.nan):>10.2f}{result.get('rps') or math.nan:>10.0f}"
+            f"{result['errors']:>8}{result.get('rss_mb', math.nan):>9.0f}"
+        )
+    return "\n".join(lines)
+
+
+def environment() -> Dict[str, Any]:
+    import platform
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "store": os.getenv("COOKPILOT_STORE", "mongo"),
+    }
@@ -0,0 +1,177 @@
+"""
+Benchmark the API against synthetic catalogs.
+
+Run from the backend directory:
+
+    python -m benchmarks.run --sizes 10000,100000 --transport asgi
+    python -m benchmarks.run --sizes 10000 --transport uvicorn --concurrency 32
+    python -m benchmarks.run --sizes 10000 --baseline old.json --output new.json
+
+asgi drives the app in-process through httpx's ASGI transport, which
+measures the application alone. uvicorn starts a local server in a child
+process and measures it over loopback HTTP, including the server and
+network stack. Each catalog size gets a fresh application. The in-memory
+store is used unless COOKPILOT_STORE=mongo is set, in which case the
+catalog is written to MONGO_DB_NAME, which should be a scratch database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+os.environ.setdefault("COOKPILOT_STORE", "memory")
+
+import httpx
+
+from benchmarks.harness import (
+    ENDPOINTS,
+    compare,
+    drive,
+    environment,
+    format_table,
+    rss_mb,
+    scaling_exponents,
+    seeded_app,
+)
+
+# Seconds to wait for a uvicorn child to seed its catalog and start
+SERVER_START_TIMEOUT = 1800
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _run_endpoints(client: httpx.AsyncClient, args, size: int, pid: int = None) -> Dict[str, Any]:
+    results = {}
+    for name in args.endpoints:
+        result = await drive(
+            client, ENDPOINTS[name], size, args.requests, args.concurrency, args.warmup, args.seed,
+        )
+        result["rss_mb"] = round(rss_mb(pid), 1)
+        results[name] = result
+    return results
+
+
+async def run_asgi(args, size: int) -> Dict[str, Any]:
+    async with seeded_app(size, args.seed, args.cache) as app:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            endpoints = await _run_endpoints(client, args, size)
+        return {"size": size, "seed_seconds": round(app.state.seed_seconds, 2), "rss_mb": rss_mb(), "endpoints": endpoints}
+
+
+async def run_uvicorn(args, size: int) -> Dict[str, Any]:
+    port = _free_port()
+    command = [
+        sys.executable, "-m", "benchmarks.run", "--serve", str(port),
+        "--sizes", str(size), "--seed", str(args.seed),
+    ] + (["--cache"] if args.cache else [])
+    started = time.perf_counter()
+    server = subprocess.Popen(command, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            while True:
+                if server.poll() is not None:
+                    raise SystemExit(f"Benchmark server exited with status {server.returncode}")
+                if time.perf_counter() - started > SERVER_START_TIMEOUT:
+                    raise SystemExit("Benchmark server did not start in time")
+                try:
+                    if (await client.get("/api/recipes/?limit=1")).is_success:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.5)
+            seed_seconds = time.perf_counter() - started
+            endpoints = await _run_endpoints(client, args, size, server.pid)
+        return {"size": size, "seed_seconds": round(seed_seconds, 2), "rss_mb": rss_mb(server.pid), "endpoints": endpoints}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def serve(port: int, size: int, seed: int, cache: bool):
+    import uvicorn
+
+    async with seeded_app(size, seed, cache) as app:
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning")
+        await uvicorn.Server(config).serve()
+
+
+async def main(args) -> Dict[str, Any]:
+    runner = run_asgi if args.transport == "asgi" else run_uvicorn
+    runs: List[Dict[str, Any]] = []
+    for size in args.sizes:
+        run = await runner(args, size)
+        print(format_table(run), flush=True)
+        runs.append(run)
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(),
+        "settings": {
+            "transport": args.transport,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "cache": args.cache,
+        },
+        "runs": runs,
+        "scaling": scaling_exponents(runs),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the CookPilot API against synthetic catalogs")
+    parser.add_argument("--sizes", default="10000", help="Comma-separated catalog sizes")
+    parser.add_argument("--transport", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Comma-separated endpoint names")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache", action="store_true", help="Keep the response cache enabled")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Latency growth flagged as a regression")
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+    args.endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.serve:
+        asyncio.run(serve(args.serve, args.sizes[0], args.seed, args.cache))
+        sys.exit(0)
+
+    results = asyncio.run(main(args))
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(f"Results written to {args.output}")
+
+    for name, curve in results["scaling"].items():
+        print(f"  {name:<22} latency ~ n^{curve['exponent']:.2f} ({curve['growth']})")
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            rows = compare(results, json.load(baseline), args.threshold)
+        regressions = [row for row in rows if row["regression"]]
+        for row in regressions:
+            print(f"  REGRESSION {row['endpoint']} at {row['size']}: p50 x{row.get('p50_ms_ratio')}, p95 x{row.get('p95_ms_ratio')}")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,96 @@
+"""
+Compare FastAPI's default response encoding with the orjson path.
+
+    python -m benchmarks.serialization --counts 20,100,1000 --output serialization.json
+
+default is what FastAPI does for a handler returning plain dicts:
+jsonable_encoder followed by json.dumps. fast is serialization.dumps, used
+by FastJSONResponse and the response cache. Payloads are full recipes and
+search-result sized documents from the synthetic catalog.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.catalog import generate_catalog
+from search_index import STORED_FIELDS
+from serialization import dumps
+
+
+def default_path(content: Any) -> bytes:
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def fast_path(content: Any) -> bytes:
+    return dumps(content)
+
+
+PATHS: Dict[str, Callable[[Any], bytes]] = {"default": default_path, "fast": fast_path}
+
+
+def payloads(count: int) -> Dict[str, List[Dict[str, Any]]]:
+    recipes = list(generate_catalog(count))
+    return {
+        "recipes": recipes,
+        "search_results": [
+            {"id": recipe["id"], **{field: recipe.get(field) for field in STORED_FIELDS}, "score": 1.2345}
+            for recipe in recipes
+        ],
+    }
+
+
+def measure(encode: Callable[[Any], bytes], content: Any, min_seconds: float) -> Dict[str, Any]:
+    encode(content)
+    rounds = 0
+    started = time.perf_counter()
+    while True:
+        encode(content)
+        rounds += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            break
+
+    tracemalloc.start()
+    encode(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "ms_per_call": round(elapsed / rounds * 1000, 4),
+        "peak_alloc_kb": round(peak / 1024, 1),
+        "bytes": len(encode(content)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare response serialization paths")
+    parser.add_argument("--counts", default="20,100,1000", help="Comma-separated documents per payload")
+    parser.add_argument("--min-seconds", type=float, default=0.5, help="Minimum timing per measurement")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'payload':<16}{'docs':>7}{'path':>9}{'ms/call':>11}{'peak KB':>11}{'speedup':>9}")
+    for count in (int(value) for value in args.counts.split(",")):
+        for name, content in payloads(count).items():
+            timings = {path: measure(encode, content, args.min_seconds) for path, encode in PATHS.items()}
+            speedup = timings["default"]["ms_per_call"] / timings["fast"]["ms_per_call"]
+            for path, timing in timings.items():
+                print(
+                    f"{name:<16}{count:>7}{path:>9}{timing['ms_per_call']:>11.3f}{timing['peak_alloc_kb']:>11.1f}"
+                    + (f"{speedup:>8.1f}x" if path == "fast" else "")
+                )
+            results.append({"payload": name, "count": count, "speedup": round(speedup, 2), **timings})
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Measure cold start: what importing the application costs, and how long a
+fresh server takes to answer its first request.
+
+Run from the backend directory:
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --runs 5 --top 30 --output startup.json
+    python -m benchmarks.startup --baseline old.json
+
+The import report runs python -X importtime in a child process and
+groups the self time of every module by top-level package, so a heavy
+dependency shows up as one line however many submodules it has.
+Time to first response starts uvicorn in a child process and polls it:
+first_response is when /healthz first answers, ready when /readyz
+reports the search indexes loaded. The in-memory store is used unless
+COOKPILOT_STORE=mongo is set.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+os.environ.setdefault("COOKPILOT_STORE", "memory")
+
+import httpx
+
+from benchmarks.harness import environment
+from benchmarks.run import _free_port
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+# Seconds to wait for a server to become ready
+SERVER_START_TIMEOUT = 120
+
+POLL_INTERVAL = 0.005
+
+
+def import_times(module: str) -> Dict[str, Any]:
+    """
+    Import module in a fresh interpreter under -X importtime. Returns the
+    total import time and the self time per top-level package, in ms.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{result.stderr}")
+
+    packages: Dict[str, float] = defaultdict(float)
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        packages[name.split(".")[0]] += int(self_us) / 1000
+        if not indent:
+            total_us += int(cumulative_us)
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "packages": {
+            name: round(ms, 1)
+            for name, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)
+        },
+    }
+
+
+def first_response() -> Dict[str, float]:
+    """
+    Start a uvicorn server and time, from the moment it is spawned, its
+    first answer and its readiness
+    """
+    port = _free_port()
+    command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"]
+    started = time.perf_counter()
+    server = subprocess.Popen(command, cwd=BACKEND_DIR)
+    timings: Dict[str, float] = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            while "ready_ms" not in timings:
+                if server.poll() is not None:
+                    raise SystemExit(f"Server exited with status {server.returncode}")
+                if time.perf_counter() - started > SERVER_START_TIMEOUT:
+                    raise SystemExit("Server did not become ready in time")
+                try:
+                    path = "/readyz" if "first_response_ms" in timings else "/healthz"
+                    response = client.get(path)
+                except httpx.TransportError:
+                    time.sleep(POLL_INTERVAL)
+                    continue
+                elapsed = round((time.perf_counter() - started) * 1000, 1)
+                if path == "/healthz":
+                    timings["first_response_ms"] = elapsed
+                elif response.is_success:
+                    timings["ready_ms"] = elapsed
+                else:
+                    time.sleep(POLL_INTERVAL)
+    finally:
+        server.terminate()
+        server.wait()
+    return timings
+
+
+def median_timings(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    return {
+        metric: round(statistics.median(run[metric] for run in runs), 1)
+        for metric in ("first_response_ms", "ready_ms")
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Change of the import total and median startup timings relative to a
+    baseline result file. Entries that grew by more than threshold are
+    flagged as regressions.
+    """
+    pairs = {"import_total_ms": (current["imports"]["total_ms"], baseline.get("imports", {}).get("total_ms"))}
+    for metric, value in current["startup"].items():
+        pairs[metric] = (value, baseline.get("startup", {}).get(metric))
+    rows = []
+    for metric, (value, before) in pairs.items():
+        if not before:
+            continue
+        ratio = value / before
+        rows.append({"metric": metric, "ratio": round(ratio, 3), "regression": ratio > 1 + threshold})
+    return rows
+
+
+def format_report(results: Dict[str, Any], top: int) -> str:
+    imports = results["imports"]
+    lines = [f"import {results['settings']['module']}: {imports['total_ms']:.1f} ms", f"  {'package':<30}{'self ms':>10}"]
+    for name, ms in list(imports["packages"].items())[:top]:
+        lines.append(f"  {name:<30}{ms:>10.1f}")
+    startup = results["startup"]
+    lines.append(
+        f"median of {len(results['startup_runs'])} starts: first response {startup['first_response_ms']:.0f} ms, "
+        f"ready {startup['ready_ms']:.0f} ms"
+    )
+    return "\n".join(lines)
+
+
+def main(args) -> Dict[str, Any]:
+    runs = [first_response() for _ in range(args.runs)]
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(),
+        "settings": {"module": args.module, "runs": args.runs},
+        "imports": import_times(args.module),
+        "startup": median_timings(runs),
+        "startup_runs": runs,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Report CookPilot import time and time to first response")
+    parser.add_argument("--module", default="main", help="Module to profile the import of")
+    parser.add_argument("--runs", type=int, default=3, help="Server starts to take the median of")
+    parser.add_argument("--top", type=int, default=20, help="Packages to list in the import report")
+    parser.add_argument("--output", default="startup-results.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown flagged as a regression")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = main(args)
+    print(format_report(results, args.top))
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            rows = compare(results, json.load(baseline), args.threshold)
+        regressions = [row for row in rows if row["regression"]]
+        for row in regressions:
+            print(f"  REGRESSION {row['metric']}: x{row['ratio']}")
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,160 @@
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from repository import RecipeRepository, recipe_key, to_api
+from schemas import RECIPES_SCHEMA, validate
+from serialization import dumps_line, loads
+
+# Records validated and written per insert_many call
+IMPORT_BATCH_SIZE = 500
+
+# Longest accepted NDJSON line; bounds the import read buffer
+MAX_LINE_BYTES = 1 << 20
+
+# Per-line errors kept in the import report
+MAX_REPORTED_ERRORS = 1000
+
+# Export output is flushed in chunks of roughly this size
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+async def export_ndjson(recipes: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """
+    Encode recipes as NDJSON, yielding output in EXPORT_CHUNK_BYTES chunks
+    """
+    buffer: List[bytes] = []
+    size = 0
+    async for recipe in recipes:
+        line = dumps_line(recipe)
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Optional[bytes], Optional[str]]]:
+    """
+    Split a byte stream into (line_number, line, error) tuples without ever
+    buffering more than MAX_LINE_BYTES. Lines that are too long are skipped
+    and reported through error.
+    """
+    buffer = bytearray()
+    line_number = 0
+    overflow = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                if not overflow:
+                    buffer += chunk[start:]
+                    if len(buffer) > MAX_LINE_BYTES:
+                        overflow = True
+                        buffer.clear()
+                break
+            line_number += 1
+            if overflow:
+                overflow = False
+                yield line_number, None, f"Line exceeds {MAX_LINE_BYTES} bytes"
+            else:
+                buffer += chunk[start:end]
+                yield line_number, bytes(buffer), None
+            buffer.clear()
+            start = end + 1
+    if overflow:
+        yield line_number + 1, None, f"Line exceeds {MAX_LINE_BYTES} bytes"
+    elif buffer:
+        yield line_number + 1, bytes(buffer), None
+
+
+def prepare_recipe(record: Any, now: datetime) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    Turn an imported record into a document ready for insertion. Returns the
+    document and a list of validation errors.
+    """
+    if not isinstance(record, dict):
+        return None, ["Record must be a JSON object"]
+    document = {key: value for key, value in record.items() if key not in ("id", "_id")}
+    if record.get("id") is not None:
+        document["_id"] = recipe_key(str(record["id"]))
+    document.setdefault("created_at", now)
+    document.setdefault("updated_at", now)
+    document.setdefault("version", 1)
+    return document, validate(document, RECIPES_SCHEMA)
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def add_error(self, line: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+async def _flush(
+    batch: List[Tuple[int, Dict[str, Any]]],
+    repository: RecipeRepository,
+    report: ImportReport,
+    on_inserted: Callable[[Dict[str, Any]], None],
+):
+    failures = dict(await repository.insert_many([document for _, document in batch]))
+    for index, (line_number, document) in enumerate(batch):
+        if index in failures:
+            report.add_error(line_number, failures[index])
+        else:
+            report.inserted += 1
+            on_inserted(to_api(document))
+
+
+async def import_ndjson(
+    chunks: AsyncIterator[bytes],
+    repository: RecipeRepository,
+    on_inserted: Callable[[Dict[str, Any]], None],
+) -> ImportReport:
+    """
+    Validate and insert recipes from an NDJSON byte stream in batches of
+    IMPORT_BATCH_SIZE, so memory use does not depend on the input size
+    """
+    report = ImportReport()
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    now = datetime.now(timezone.utc)
+
+    async for line_number, line, error in iter_lines(chunks):
+        if error:
+            report.add_error(line_number, error)
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = loads(line)
+        except ValueError as e:
+            report.add_error(line_number, f"Invalid JSON: {str(e)}")
+            continue
+        document, errors = prepare_recipe(record, now)
+        if errors:
+            report.add_error(line_number, "; ".join(errors))
+            continue
+        batch.append((line_number, document))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await _flush(batch, repository, report, on_inserted)
+            batch = []
+
+    if batch:
+        await _flush(batch, repository, report, on_inserted)
+    return report
@@ -0,0 +1,249 @@
+import hashlib
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+from serialization import dumps
+
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+
+# Shared tier, served by Redis when set
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+# Version recorded for deleted recipes, so late writers cannot resurrect them
+DELETED = sys.maxsize
+
+
+class CacheEntry(NamedTuple):
+    version: int
+    etag: str
+    body: bytes
+
+    def encode(self) -> bytes:
+        return f"{self.version}\n{self.etag}\n".encode() + self.body
+
+    @classmethod
+    def decode(cls, data: bytes) -> "CacheEntry":
+        version, etag, body = data.split(b"\n", 2)
+        return cls(int(version), etag.decode(), body)
+
+
+class LRUCache:
+    """
+    In-process LRU with a per-entry time to live
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class CacheBackend(ABC):
+    """
+    Interface for the shared cache tier
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float):
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+
+class DictBackend(CacheBackend):
+    """
+    Process-local shared tier, for a single instance and for tests
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Any] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._entries.get(key)
+        if item is None or item[0] < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return item[1]
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self._entries[key] = (time.monotonic() + ttl, value)
+
+    async def delete(self, key: str):
+        self._entries.pop(key, None)
+
+
+class RedisBackend(CacheBackend):
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        await self._client.set(key, value, px=int(ttl * 1000))
+
+    async def delete(self, key: str):
+        await self._client.delete(key)
+
+
+def create_shared_backend() -> Optional[CacheBackend]:
+    return RedisBackend(CACHE_REDIS_URL) if CACHE_REDIS_URL else None
+
+
+def make_entry(version: int, payload: Any) -> CacheEntry:
+    body = dumps(payload)
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    return CacheEntry(version, etag, body)
+
+
+class ResponseCache:
+    """
+    Two-tier cache of serialized responses.
+
+    Recipe entries are checked against per-recipe version counters, which
+    follow the recipe's version field. Once a recipe has been updated or
+    deleted, entries built from an older version are ignored in both tiers,
+    even if a slow request stores one after the write.
+
+    Search results depend on the whole catalog and are built from this
+    process's indexes, so they are kept in the local tier only and keyed
+    by a generation counter that every write bumps.
+    """
+
+    def __init__(self, local: Optional[LRUCache] = None, shared: Optional[CacheBackend] = None):
+        self.local = local if local is not None else LRUCache()
+        self.shared = shared
+        self.generation = 0
+        # Versions of recently written recipes. A record only has to outlive
+        # the entries and requests in flight at the time of the write, so
+        # it is bounded and expires like an entry.
+        self._versions = LRUCache(self.local.max_entries, self.local.ttl)
+
+    def _is_current(self, recipe_id: str, entry: CacheEntry) -> bool:
+        return entry.version >= (self._versions.get(recipe_id) or 0)
+
+    async def get_recipe(self, recipe_id: str) -> Optional[CacheEntry]:
+        key = f"recipe:{recipe_id}"
+        entry = self.local.get(key)
+        if entry is not None and self._is_current(recipe_id, entry):
+            return entry
+        if self.shared is not None:
+            data = await self.shared.get(key)
+            if data is not None:
+                entry = CacheEntry.decode(data)
+                if self._is_current(recipe_id, entry):
+                    self.local.set(key, entry)
+                    return entry
+        return None
+
+    async def put_recipe(self, recipe_id: str, recipe: Dict[str, Any]) -> CacheEntry:
+        entry = make_entry(recipe.get("version", 0), recipe)
+        if self._is_current(recipe_id, entry):
+            key = f"recipe:{recipe_id}"
+            self.local.set(key, entry)
+            if self.shared is not None:
+                await self.shared.set(key, entry.encode(), self.local.ttl)
+        return entry
+
+    async def invalidate_recipe(self, recipe_id: str, version: Optional[int] = None):
+        """
+        Record a write to a recipe. version is the recipe's new version, or
+        None if it was deleted. Versions only move forward, so a late
+        notification of an older write changes nothing.
+        """
+        current = self._versions.get(recipe_id) or 0
+        self._versions.set(recipe_id, DELETED if version is None else max(version, current))
+        self.generation += 1
+        key = f"recipe:{recipe_id}"
+        self.local.delete(key)
+        if self.shared is not None:
+            await self.shared.delete(key)
+
+    def recipe_created(self, recipe_id: str):
+        self._versions.delete(recipe_id)
+        self.generation += 1
+
+    def invalidate_search(self):
+        """
+        Record a change to data search results embed besides the indexes
+        """
+        self.generation += 1
+
+    def get_search(self, key: str) -> Optional[CacheEntry]:
+        return self.local.get(f"search:{self.generation}:{key}")
+
+    def put_search(self, key: str, results: Any, generation: Optional[int] = None) -> CacheEntry:
+        """
+        Cache results under the generation they were built in, by default
+        the current one. Results that took awaits to build pass the
+        generation they started in, so a write in between is not hidden.
+        """
+        generation = self.generation if generation is None else generation
+        entry = make_entry(generation, results)
+        self.local.set(f"search:{generation}:{key}", entry)
+        return entry
+
+    def clear(self):
+        self.local.clear()
+        self._versions.clear()
+        self.generation += 1
+
+
+def cached_response(entry: CacheEntry, request: Request) -> Response:
+    """
+    Build a response for a cache entry, or a bodyless 304 when the client
+    already holds it
+    """
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or entry.etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+# Shared cache for the running application
+response_cache = ResponseCache()
@@ -0,0 +1,308 @@
+"""
+Keeps in-process derived state current with writes made by other
+instances, by following MongoDB change streams.
+
+Each watched collection has a handler that applies one change event to
+the structures derived from that collection, and can rebuild them from
+scratch. The subscriber remembers the resume token of the last event it
+applied, so a dropped connection resumes where it stopped. When the token
+can no longer be resumed from (the oplog has moved past it, or the
+collection was dropped), it takes a new checkpoint and rebuilds: events
+from the checkpoint onwards are replayed after the rebuild, so none are
+missed.
+
+Events are also delivered for this instance's own writes. Applying them
+again is harmless since every handler replaces state rather than adding
+to it, and change streams are ordered, so the last event for a document
+always reflects its latest write.
+"""
+import asyncio
+import logging
+import os
+import random
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from pymongo.errors import OperationFailure
+
+import derived_state
+from cache import response_cache
+from memory_store import InMemoryDatabase
+from repository import INDEX_PROJECTION, RecipeRepository, to_api
+
+logger = logging.getLogger(__name__)
+
+# "0" disables the subscriber, e.g. against a standalone mongod, which has
+# no change streams
+CHANGE_STREAMS = os.getenv("CHANGE_STREAMS", "1") != "0"
+
+# Bounds, in seconds, of the exponential backoff after a stream fails
+MIN_BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = float(os.getenv("CHANGE_STREAM_MAX_BACKOFF_SECONDS", "30"))
+
+# ChangeStreamHistoryLost, ChangeStreamFatalError, InvalidResumeToken
+HISTORY_LOST_CODES = {286, 280, 260}
+
+# Top-level recipe fields the search indexes are built from
+INDEXED_FIELDS = frozenset(field.split(".")[0] for field in INDEX_PROJECTION)
+
+
+class ResumeTokenLost(Exception):
+    """
+    The stream can no longer be resumed from the given token
+    """
+
+
+class MongoChangeSource:
+    """
+    Change events from a motor database
+    """
+
+    def __init__(self, database):
+        self.database = database
+
+    async def checkpoint(self, collection: str) -> Any:
+        """
+        Resume token for the current position of the collection's stream
+        """
+        async with self.database[collection].watch() as stream:
+            return stream.resume_token
+
+    async def watch(self, collection: str, resume_after: Any) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            async with self.database[collection].watch(
+                full_document="updateLookup",
+                resume_after=resume_after,
+            ) as stream:
+                async for change in stream:
+                    yield change
+        except OperationFailure as e:
+            if e.code in HISTORY_LOST_CODES:
+                raise ResumeTokenLost(str(e))
+            raise
+
+
+class InMemoryChangeSource:
+    """
+    Stand-in event source for tests. The in-memory store has no change
+    streams, so create_subscriber returns no subscriber for it; here events
+    are published explicitly and kept in a bounded history, like the oplog,
+    so resuming from a token that fell out of it raises ResumeTokenLost.
+    """
+
+    def __init__(self, history_size: int = 1000):
+        self.history_size = history_size
+        self._history: Dict[str, Deque[Dict[str, Any]]] = {}
+        # Token of the newest event dropped from each history
+        self._dropped: Dict[str, int] = {}
+        self._sequence = 0
+        self._changed = asyncio.Condition()
+
+    async def publish(self, collection: str, change: Dict[str, Any]) -> int:
+        """
+        Append an event, stamped with its resume token, and return the token
+        """
+        async with self._changed:
+            self._sequence += 1
+            history = self._history.setdefault(collection, deque())
+            history.append({**change, "_id": self._sequence})
+            if len(history) > self.history_size:
+                self._dropped[collection] = history.popleft()["_id"]
+            self._changed.notify_all()
+        return self._sequence
+
+    async def checkpoint(self, collection: str) -> Any:
+        return self._sequence
+
+    def _newer(self, collection: str, position: int) -> List[Dict[str, Any]]:
+        return [change for change in self._history.get(collection, ()) if change["_id"] > position]
+
+    async def watch(self, collection: str, resume_after: Any) -> AsyncIterator[Dict[str, Any]]:
+        position = resume_after
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._newer(collection, position))
+                if position < self._dropped.get(collection, 0):
+                    raise ResumeTokenLost(f"Token {position} is no longer in the {collection} history")
+                pending = self._newer(collection, position)
+            for change in pending:
+                position = change["_id"]
+                yield change
+
+
+class RecipeChangeHandler:
+    """
+    Applies recipe change events to the search indexes and response cache
+    """
+
+    collection = "recipes"
+
+    def __init__(self, repository: RecipeRepository):
+        self.repository = repository
+
+    async def apply(self, change: Dict[str, Any]):
+        operation = change["operationType"]
+        recipe_id = str(change["documentKey"]["_id"])
+        if operation == "delete":
+            derived_state.unindex_recipe(recipe_id)
+            await response_cache.invalidate_recipe(recipe_id)
+            return
+
+        document = change.get("fullDocument")
+        if document is None:
+            # Deleted before the update could be looked up; its delete
+            # event follows
+            return
+        if operation == "update" and not self._touches_index(change.get("updateDescription") or {}):
+            await response_cache.invalidate_recipe(recipe_id, document.get("version"))
+            return
+        derived_state.index_recipe(recipe_id, to_api(document))
+        if operation == "insert":
+            response_cache.recipe_created(recipe_id)
+        else:
+            await response_cache.invalidate_recipe(recipe_id, document.get("version"))
+
+    @staticmethod
+    def _touches_index(description: Dict[str, Any]) -> bool:
+        paths = list(description.get("updatedFields", {})) + list(description.get("removedFields", []))
+        return any(path.split(".")[0] in INDEXED_FIELDS for path in paths)
+
+    async def rebuild(self):
+        await derived_state.rebuild(self.repository)
+        response_cache.clear()
+
+
+class NoteChangeHandler:
+    """
+    Applies note change events to the recent notes and live streams
+    """
+
+    collection = "notes"
+
+    def __init__(self, notes):
+        self.notes = notes
+
+    async def apply(self, change: Dict[str, Any]):
+        operation = change["operationType"]
+        document = change.get("fullDocument")
+        if operation == "insert":
+            self.notes.publish(to_api(document))
+        elif document is not None:
+            self.notes.forget(document["recipe_id"])
+        else:
+            # Delete events only carry the note's _id, not its recipe
+            self.notes.forget()
+
+    async def rebuild(self):
+        self.notes.forget()
+
+
+class MediaChangeHandler:
+    """
+    Drops cached media manifests replaced by other instances
+    """
+
+    collection = "media_manifests"
+
+    def __init__(self, media):
+        self.media = media
+
+    async def apply(self, change: Dict[str, Any]):
+        self.media.forget(str(change["documentKey"]["_id"]))
+        response_cache.invalidate_search()
+
+    async def rebuild(self):
+        self.media.forget()
+        response_cache.invalidate_search()
+
+
+class ChangeSubscriber:
+    """
+    Follows the change stream of every handler's collection in the
+    background and applies its events
+    """
+
+    def __init__(self, source, handlers: List[Any]):
+        self.source = source
+        self.handlers = {handler.collection: handler for handler in handlers}
+        self.tokens: Dict[str, Any] = {}
+
+    async def checkpoint(self) -> Dict[str, Any]:
+        """
+        Resume tokens for the current position of every stream. Taken
+        before a full rebuild, so the events it might miss are replayed.
+        """
+        return {collection: await self.source.checkpoint(collection) for collection in self.handlers}
+
+    async def run(self, tokens: Optional[Dict[str, Any]] = None):
+        """
+        Follow every stream until cancelled, resuming after tokens where
+        given and rebuilding the others first
+        """
+        self.tokens.update(tokens or {})
+        await asyncio.gather(*(self._follow(handler) for handler in self.handlers.values()))
+
+    async def _follow(self, handler):
+        collection = handler.collection
+        failures = 0
+        while True:
+            try:
+                if self.tokens.get(collection) is None:
+                    self.tokens[collection] = await self.source.checkpoint(collection)
+                    await handler.rebuild()
+                    logger.info("Rebuilt state derived from %s", collection)
+                async for change in self.source.watch(collection, self.tokens[collection]):
+                    if change["operationType"] in ("invalidate", "drop", "rename", "dropDatabase"):
+                        raise ResumeTokenLost(f"{collection} stream invalidated by {change['operationType']}")
+                    if change["operationType"] in ("insert", "update", "replace", "delete"):
+                        await handler.apply(change)
+                    self.tokens[collection] = change["_id"]
+                    failures = 0
+            except asyncio.CancelledError:
+                raise
+            except ResumeTokenLost as e:
+                logger.warning("Cannot resume the %s change stream (%s); rebuilding", collection, e)
+                self.tokens[collection] = None
+            except Exception:
+                failures += 1
+                delay = min(MAX_BACKOFF_SECONDS, MIN_BACKOFF_SECONDS * 2 ** (failures - 1))
+                logger.exception("The %s change stream failed; retrying in %.1fs", collection, delay)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+
+def change_handlers(repository: RecipeRepository, notes=None, media=None) -> List[Any]:
+    """
+    Handlers for recipes, and for notes and media manifests when their
+    service is given
+    """
+    handlers: List[Any] = [RecipeChangeHandler(repository)]
+    if notes is not None:
+        handlers.append(NoteChangeHandler(notes))
+    if media is not None:
+        handlers.append(MediaChangeHandler(media))
+    return handlers
+
+
+def create_subscriber(database, repository: RecipeRepository, notes=None, media=None) -> Optional[ChangeSubscriber]:
+    """
+    Subscriber for the running application, or None when the store has no
+    change streams
+    """
+    if not CHANGE_STREAMS or isinstance(database, InMemoryDatabase):
+        return None
+    return ChangeSubscriber(MongoChangeSource(database), change_handlers(repository, notes, media))
+
+
+async def start_subscriber(subscriber: ChangeSubscriber, tokens: Optional[Dict[str, Any]] = None) -> Optional[asyncio.Task]:
+    """
+    Follow the streams in a background task, from tokens or else from a
+    checkpoint taken now. Returns None if the server does not support
+    change streams.
+    """
+    try:
+        if tokens is None:
+            tokens = await subscriber.checkpoint()
+    except OperationFailure as e:
+        logger.warning("Change streams unavailable, derived state will only follow local writes: %s", e)
+        return None
+    return asyncio.create_task(subscriber.run(tokens))
@@ -0,0 +1,91 @@
+import os
+import urllib.parse
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+
+from memory_store import InMemoryDatabase
+from sample_data import SAMPLE_RECIPES
+
+# Load environment variables
+load_dotenv()
+
+DB_NAME = os.getenv("MONGO_DB_NAME", "cookpilot_db")
+
+# "mongo" talks to MONGO_URI, "memory" uses the in-process stand-in
+STORE_BACKEND = os.getenv("COOKPILOT_STORE", "mongo")
+
+client = None
+db = None
+
+
+def get_mongo_uri() -> str:
+    """
+    Return MONGO_URI with the credentials of SRV URIs properly encoded
+    """
+    uri = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+    if "mongodb+srv://" in uri:
+        parts = uri.split("@")
+        if len(parts) > 1:
+            auth_part = parts[0].replace("mongodb+srv://", "")
+            if ":" in auth_part:
+                username, password = auth_part.split(":", 1)
+                encoded_username = urllib.parse.quote_plus(username)
+                encoded_password = urllib.parse.quote_plus(password)
+                uri = f"mongodb+srv://{encoded_username}:{encoded_password}@{parts[1]}"
+    return uri
+
+
+def pool_options() -> Dict[str, Any]:
+    """
+    Connection pool settings, overridable through the environment
+    """
+    return {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", "5")),
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "60000")),
+        "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000")),
+        "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")),
+        "connectTimeoutMS": int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000")),
+        "retryWrites": True,
+        "appname": "cookpilot-backend",
+    }
+
+
+async def seed_samples(database):
+    """
+    Load the sample recipes into an empty recipes collection
+    """
+    if await database.recipes.count_documents({}):
+        return
+    await database.recipes.insert_many([
+        {"_id": recipe["id"], **{key: value for key, value in recipe.items() if key != "id"}}
+        for recipe in SAMPLE_RECIPES
+    ])
+
+
+async def connect():
+    """
+    Create the shared database handle. Called from the FastAPI lifespan so
+    the connection pool is bound to the server's event loop.
+    """
+    global client, db
+    if STORE_BACKEND == "memory":
+        db = InMemoryDatabase(DB_NAME)
+        await seed_samples(db)
+    else:
+        # Imported here so the in-memory store and tools importing this
+        # module do not pay for motor
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(get_mongo_uri(), **pool_options())
+        db = client[DB_NAME]
+    return db
+
+
+async def close():
+    global client, db
+    if client is not None:
+        client.close()
+    client = None
+    db = None
@@ -1,296 +1,178 @@
-import os
-from pymongo import MongoClient
+import argparse
+import sys
+from datetime import datetime, timezone
+
+from pymongo import ASCENDING, DESCENDING, TEXT, MongoClient
 from bson import ObjectId
-from dotenv import load_dotenv
-import urllib.parse
 
-# Load environment variables
-load_dotenv()
+from database import DB_NAME, get_mongo_uri
+from schemas import NOTES_SCHEMA, RECIPES_SCHEMA, USERS_SCHEMA
 
 # MongoDB connection with properly encoded credentials
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-# Parse and properly encode the credentials
-if "mongodb+srv://" in MONGO_URI:
-    parts = MONGO_URI.split("@")
-    if len(parts) > 1:
-        auth_part = parts[0].replace("mongodb+srv://", "")
-        if ":" in auth_part:
-            username, password = auth_part.split(":", 1)
-            encoded_username = urllib.parse.quote_plus(username)
-            encoded_password = urllib.parse.quote_plus(password)
-            MONGO_URI = f"mongodb+srv://{encoded_username}:{encoded_password}@{parts[1]}"
+MONGO_URI = get_mongo_uri()
+
+# Indexes per collection, matched to the routers' access patterns
+INDEXES = {
+    'users': [
+        {'name': 'email_unique', 'keys': [('email', ASCENDING)], 'unique': True},
+    ],
+    'recipes': [
+        # Keyset pagination in GET /api/recipes
+        {'name': 'created_at_id', 'keys': [('created_at', ASCENDING), ('_id', ASCENDING)]},
+        {'name': 'chef_created_at', 'keys': [('chef_id', ASCENDING), ('created_at', DESCENDING)]},
+        {'name': 'cuisine_created_at', 'keys': [('cuisine', ASCENDING), ('created_at', ASCENDING)]},
+        # Multikey indexes over array fields
+        {'name': 'tags', 'keys': [('tags', ASCENDING)]},
+        {'name': 'ingredient_names', 'keys': [('ingredients.name', ASCENDING)]},
+        {
+            'name': 'recipe_text',
+            'keys': [('title', TEXT), ('description', TEXT), ('tags', TEXT), ('ingredients.name', TEXT)],
+            'weights': {'title': 10, 'tags': 5, 'ingredients.name': 3, 'description': 1},
+        },
+    ],
+    'notes': [
+        {'name': 'recipe_created_at', 'keys': [('recipe_id', ASCENDING), ('created_at', DESCENDING)]},
+        {'name': 'user_created_at', 'keys': [('user_id', ASCENDING), ('created_at', DESCENDING)]},
+    ],
+    'recipe_versions': [
+        # One record per replaced version; ranges are read to rebuild one
+        {'name': 'recipe_version', 'keys': [('recipe_id', ASCENDING), ('version', ASCENDING)], 'unique': True},
+    ],
+}
+
+# Canonical queries issued by the routers: (collection, description, filter, sort)
+CANONICAL_QUERIES = [
+    ('users', 'user by email', {'email': 'chef@example.com'}, None),
+    ('recipes', 'first recipe page', {}, [('created_at', ASCENDING), ('_id', ASCENDING)]),
+    ('recipes', 'next recipe page', {'$or': [
+        {'created_at': {'$gt': datetime(2025, 1, 1, tzinfo=timezone.utc)}},
+        {'created_at': datetime(2025, 1, 1, tzinfo=timezone.utc), '_id': {'$gt': ObjectId('000000000000000000000000')}},
+    ]}, [('created_at', ASCENDING), ('_id', ASCENDING)]),
+    ('recipes', 'recipes by chef', {'chef_id': 'chef-1'}, [('created_at', DESCENDING)]),
+    ('recipes', 'recipes by cuisine', {'cuisine': 'italian'}, [('created_at', ASCENDING)]),
+    ('recipes', 'recipes by tag', {'tags': 'pasta'}, None),
+    ('recipes', 'recipes by ingredient', {'ingredients.name': 'Eggs'}, None),
+    ('recipes', 'recipes by ID batch', {'_id': {'$in': [ObjectId('000000000000000000000000')]}}, None),
+    ('recipes', 'text search', {'$text': {'$search': 'carbonara'}}, None),
+    ('notes', 'notes by recipe', {'recipe_id': 'recipe-1'}, [('created_at', DESCENDING)]),
+    ('notes', 'notes by user', {'user_id': 'user-1'}, [('created_at', DESCENDING)]),
+    ('recipe_versions', 'version range', {'recipe_id': 'recipe-1', 'version': {'$gte': 1, '$lte': 20}}, [('version', DESCENDING)]),
+]
+
+
+def ensure_indexes(database):
+    """
+    Build any declared index that is missing. Safe to run repeatedly.
+    """
+    for collection_name, indexes in INDEXES.items():
+        collection = database[collection_name]
+        existing = collection.index_information()
+        for spec in indexes:
+            options = {key: value for key, value in spec.items() if key != 'keys'}
+            current = existing.get(spec['name'])
+            if current is not None and (spec['keys'][0][1] == TEXT or current['key'] == spec['keys']):
+                continue
+            if current is not None:
+                print(f"Rebuilding index {collection_name}.{spec['name']} with new keys")
+                collection.drop_index(spec['name'])
+            collection.create_index(spec['keys'], **options)
+            print(f"Created index {collection_name}.{spec['name']}")
+
 
-try:
+def plan_stages(plan):
+    """
+    Yield the stage names of an explain() plan tree
+    """
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for key in ('inputStage', 'queryPlan', 'winningPlan'):
+            if key in plan:
+                yield from plan_stages(plan[key])
+        for child in plan.get('inputStages', []):
+            yield from plan_stages(child)
+
+
+def check_query_plans(database):
+    """
+    Explain every canonical query and report any that plans a COLLSCAN.
+    Returns True when all queries use an index.
+    """
+    ok = True
+    for collection_name, description, query, sort in CANONICAL_QUERIES:
+        cursor = database[collection_name].find(query).limit(20)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = cursor.explain()
+        stages = list(plan_stages(explain['queryPlanner']['winningPlan']))
+        status = 'FAIL' if 'COLLSCAN' in stages else 'ok'
+        ok = ok and status == 'ok'
+        print(f"{status:4} {collection_name}: {description} -> {' > '.join(stages)}")
+    return ok
+
+def connect():
+    """
+    Connect to the MONGO_DB_NAME database at MONGO_URI. Only called when
+    this file runs as a script, so importing it (for INDEXES or the
+    helpers) never opens a connection.
+    """
     client = MongoClient(MONGO_URI)
-    db = client.cookpilot_db
+    db = client[DB_NAME]
     print("Successfully connected to MongoDB Atlas!")
-    
-    # Create collections with validation schemas
-    def setup_database():
-        try:
-            # Users collection schema
-            db.command({
-                'create': 'users',
-                'validator': {
-                    '$jsonSchema': {
-                        'bsonType': 'object',
-                        'required': ['email', 'role', 'created_at'],
-                        'properties': {
-                            'email': {
-                                'bsonType': 'string',
-                                'description': 'Email address of the user'
-                            },
-                            'name': {
-                                'bsonType': 'string',
-                                'description': 'Full name of the user'
-                            },
-                            'role': {
-                                'enum': ['admin', 'chef', 'client', 'viewer'],
-                                'description': 'Role of the user'
-                            },
-                            'created_at': {
-                                'bsonType': 'date',
-                                'description': 'Date when the user was created'
-                            },
-                            'updated_at': {
-                                'bsonType': 'date',
-                                'description': 'Date when the user was last updated'
-                            },
-                            'preferences': {
-                                'bsonType': 'object',
-                                'description': 'User preferences'
-                            }
-                        }
-                    }
-                }
-            })
-            print("Created users collection with schema validation")
+    return db
+
+
+# Create collections with validation schemas
+def setup_database(db):
+    try:
+        # Users collection schema
+        db.command({
+            'create': 'users',
+            'validator': {
+                '$jsonSchema': USERS_SCHEMA
+            }
+        })
+        print("Created users collection with schema validation")
 
-            # Recipes collection schema
-            db.command({
-                'create': 'recipes',
-                'validator': {
-                    '$jsonSchema': {
-                        'bsonType': 'object',
-                        'required': ['title', 'chef_id', 'ingredients', 'steps', 'created_at', 'version'],
-                        'properties': {
-                            'title': {
-                                'bsonType': 'string',
-                                'description': 'Title of the recipe'
-                            },
-                            'chef_id': {
-                                'bsonType': 'string',
-                                'description': 'ID of the chef who created the recipe'
-                            },
-                            'description': {
-                                'bsonType': 'string',
-                                'description': 'Description of the recipe'
-                            },
-                            'ingredients': {
-                                'bsonType': 'array',
-                                'description': 'List of ingredients',
-                                'items': {
-                                    'bsonType': 'object',
-                                    'required': ['name', 'quantity', 'unit'],
-                                    'properties': {
-                                        'name': {
-                                            'bsonType': 'string',
-                                            'description': 'Name of the ingredient'
-                                        },
-                                        'quantity': {
-                                            'bsonType': 'double',
-                                            'description': 'Quantity of the ingredient'
-                                        },
-                                        'unit': {
-                                            'bsonType': 'string',
-                                            'description': 'Unit of measurement'
-                                        },
-                                        'notes': {
-                                            'bsonType': 'string',
-                                            'description': 'Additional notes about the ingredient'
-                                        }
-                                    }
-                                }
-                            },
-                            'steps': {
-                                'bsonType': 'array',
-                                'description': 'List of steps',
-                                'items': {
-                                    'bsonType': 'object',
-                                    'required': ['order', 'description'],
-                                    'properties': {
-                                        'order': {
-                                            'bsonType': 'int',
-                                            'description': 'Order of the step'
-                                        },
-                                        'description': {
-                                            'bsonType': 'string',
-                                            'description': 'Description of the step'
-                                        },
-                                        'time': {
-                                            'bsonType': 'int',
-                                            'description': 'Time in minutes for this step'
-                                        },
-                                        'temperature': {
-                                            'bsonType': 'object',
-                                            'properties': {
-                                                'value': {
-                                                    'bsonType': 'int',
-                                                    'description': 'Temperature value'
-                                                },
-                                                'unit': {
-                                                    'enum': ['C', 'F'],
-                                                    'description': 'Temperature unit (Celsius or Fahrenheit)'
-                                                }
-                                            }
-                                        },
-                                        'media': {
-                                            'bsonType': 'array',
-                                            'items': {
-                                                'bsonType': 'string',
-                                                'description': 'URL to media file'
-                                            }
-                                        }
-                                    }
-                                }
-                            },
-                            'tags': {
-                                'bsonType': 'array',
-                                'items': {
-                                    'bsonType': 'string'
-                                },
-                                'description': 'Tags for the recipe'
-                            },
-                            'cuisine': {
-                                'bsonType': 'string',
-                                'description': 'Cuisine type'
-                            },
-                            'prep_time': {
-                                'bsonType': 'int',
-                                'description': 'Preparation time in minutes'
-                            },
-                            'cook_time': {
-                                'bsonType': 'int',
-                                'description': 'Cooking time in minutes'
-                            },
-                            'servings': {
-                                'bsonType': 'int',
-                                'description': 'Number of servings'
-                            },
-                            'media': {
-                                'bsonType': 'array',
-                                'items': {
-                                    'bsonType': 'string',
-                                    'description': 'URL to media file'
-                                }
-                            },
-                            'nutrition': {
-                                'bsonType': 'object',
-                                'properties': {
-                                    'calories': {
-                                        'bsonType': 'int',
-                                        'description': 'Calories per serving'
-                                    },
-                                    'protein': {
-                                        'bsonType': 'double',
-                                        'description': 'Protein in grams'
-                                    },
-                                    'carbs': {
-                                        'bsonType': 'double',
-                                        'description': 'Carbohydrates in grams'
-                                    },
-                                    'fat': {
-                                        'bsonType': 'double',
-                                        'description': 'Fat in grams'
-                                    },
-                                    'fiber': {
-                                        'bsonType': 'double',
-                                        'description': 'Fiber in grams'
-                                    },
-                                    'sugar': {
-                                        'bsonType': 'double',
-                                        'description': 'Sugar in grams'
-                                    }
-                                }
-                            },
-                            'scaling_factors': {
-                                'bsonType': 'object',
-                                'properties': {
-                                    'shrinkage': {
-                                        'bsonType': 'double',
-                                        'description': 'Shrinkage factor for scaling'
-                                    },
-                                    'waste': {
-                                        'bsonType': 'double',
-                                        'description': 'Waste factor for scaling'
-                                    },
-                                    'time_adjustment': {
-                                        'bsonType': 'double',
-                                        'description': 'Time adjustment factor for scaling'
-                                    }
-                                }
-                            },
-                            'version': {
-                                'bsonType': 'int',
-                                'description': 'Version number of the recipe'
-                            },
-                            'created_at': {
-                                'bsonType': 'date',
-                                'description': 'Date when the recipe was created'
-                            },
-                            'updated_at': {
-                                'bsonType': 'date',
-                                'description': 'Date when the recipe was last updated'
-                            }
-                        }
-                    }
-                }
-            })
-            print("Created recipes collection with schema validation")
+        # Recipes collection schema
+        db.command({
+            'create': 'recipes',
+            'validator': {
+                '$jsonSchema': RECIPES_SCHEMA
+            }
+        })
+        print("Created recipes collection with schema validation")
 
-            # Notes collection schema
-            db.command({
-                'create': 'notes',
-                'validator': {
-                    '$jsonSchema': {
-                        'bsonType': 'object',
-                        'required': ['recipe_id', 'user_id', 'content', 'created_at'],
-                        'properties': {
-                            'recipe_id': {
-                                'bsonType': 'string',
-                                'description': 'ID of the recipe'
-                            },
-                            'user_id': {
-                                'bsonType': 'string',
-                                'description': 'ID of the user who created the note'
-                            },
-                            'content': {
-                                'bsonType': 'string',
-                                'description': 'Content of the note'
-                            },
-                            'created_at': {
-                                'bsonType': 'date',
-                                'description': 'Date when the note was created'
-                            },
-                            'updated_at': {
-                                'bsonType': 'date',
-                                'description': 'Date when the note was last updated'
-                            }
-                        }
-                    }
-                }
-            })
-            print("Created notes collection with schema validation")
+        # Notes collection schema
+        db.command({
+            'create': 'notes',
+            'validator': {
+                '$jsonSchema': NOTES_SCHEMA
+            }
+        })
+        print("Created notes collection with schema validation")
 
-            print("Database setup completed successfully!")
-            return True
-        except Exception as e:
-            print(f"Error setting up database: {str(e)}")
-            return False
+        print("Database setup completed successfully!")
+        return True
+    except Exception as e:
+        print(f"Error setting up database: {str(e)}")
+        return False
 
-    # Run the setup function
-    if __name__ == "__main__":
-        setup_database()
 
-except Exception as e:
-    print(f"Error connecting to MongoDB: {str(e)}")
+# Run the setup function, or only verify query plans with --check
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Set up the CookPilot database. Point MONGO_URI at a local mongod "
+                    "(e.g. mongodb://localhost:27017) to check plans without Atlas.",
+    )
+    parser.add_argument("--check", action="store_true", help="fail if any canonical query plans a COLLSCAN")
+    args = parser.parse_args()
+    try:
+        db = connect()
+    except Exception as e:
+        print(f"Error connecting to MongoDB: {str(e)}")
+        sys.exit(1)
+    if args.check:
+        sys.exit(0 if check_query_plans(db) else 1)
+    setup_database(db)
+    ensure_indexes(db)
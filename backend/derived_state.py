@@ -0,0 +1,156 @@
+import asyncio
+import os
+from typing import Any, Dict, Optional, Set, Tuple
+
+from fastapi import HTTPException, status
+
+from attribute_store import AttributeStore, attribute_store
+from ingredient_index import IngredientIndex, ingredient_index
+from repository import INDEX_PROJECTION
+from search_index import SearchIndex, recipe_index
+from suggest_index import SuggestIndex, suggest_index
+
+# Set by serve.py when the structures were built before forking workers,
+# so the application lifespan does not rebuild them per worker
+prebuilt = False
+
+# Set by serve.py in workers forked before the master has built the
+# structures. They answer requests until the master replaces them with
+# workers sharing its copy, and do not build or follow one of their own.
+standby = False
+
+# Change stream positions the prebuilt structures are current to, so
+# workers resume from there instead of rebuilding; None if none were taken
+resume_tokens: Optional[Dict[str, Any]] = None
+
+# Seconds a request needing the structures waits for a load in progress
+READY_TIMEOUT_SECONDS = float(os.getenv("READY_TIMEOUT_SECONDS", "10"))
+
+# Set once the structures reflect the whole catalog
+ready = asyncio.Event()
+
+# Error of the last failed load, reported by /readyz
+load_error: Optional[str] = None
+
+# IDs written while a load is streaming the catalog; the load skips them
+# so it cannot replace a newer write with the older copy it read
+_written_during_load: Optional[Set[str]] = None
+
+Structures = Tuple[SearchIndex, IngredientIndex, AttributeStore, SuggestIndex]
+
+# Structures a rebuild is filling off to the side; writes reach them too
+_rebuilding: Optional[Structures] = None
+
+
+def _live() -> Structures:
+    return recipe_index, ingredient_index, attribute_store, suggest_index
+
+
+def index_recipe(recipe_id: str, recipe: Dict[str, Any]):
+    """
+    Add or replace a recipe in every in-process derived structure
+    """
+    if _written_during_load is not None:
+        _written_during_load.add(recipe_id)
+    for structure in _live() + (_rebuilding or ()):
+        structure.add(recipe_id, recipe)
+
+
+def unindex_recipe(recipe_id: str):
+    """
+    Remove a recipe from every in-process derived structure
+    """
+    if _written_during_load is not None:
+        _written_during_load.add(recipe_id)
+    for structure in _live() + (_rebuilding or ()):
+        structure.remove(recipe_id)
+
+
+def clear():
+    for structure in _live():
+        structure.clear()
+
+
+async def _fill(structures: Structures, repository):
+    global _written_during_load
+    _written_during_load = set()
+    suggest = structures[3]
+    suggest.begin_bulk()
+    try:
+        async for recipe in repository.iter_recipes(INDEX_PROJECTION):
+            if recipe["id"] not in _written_during_load:
+                for structure in structures:
+                    structure.add(recipe["id"], recipe)
+    finally:
+        _written_during_load = None
+        suggest.end_bulk()
+
+
+async def load(repository):
+    """
+    Rebuild all derived structures by streaming the recipes collection.
+    Writes made through index_recipe and unindex_recipe while it runs are
+    kept.
+    """
+    global load_error
+    ready.clear()
+    clear()
+    try:
+        await _fill(_live(), repository)
+    except Exception as e:
+        load_error = str(e)
+        raise
+    load_error = None
+    ready.set()
+
+
+async def rebuild(repository):
+    """
+    Rebuild all derived structures off to the side while the current ones
+    keep answering, then swap the new ones in at once. Writes made while it
+    runs reach both. Without a complete set to keep serving, this is load.
+    """
+    global _rebuilding
+    if not ready.is_set():
+        await load(repository)
+        return
+    fresh = (SearchIndex(), IngredientIndex(), AttributeStore(), SuggestIndex())
+    _rebuilding = fresh
+    try:
+        await _fill(fresh, repository)
+    finally:
+        _rebuilding = None
+    # The module-level instances are imported by name elsewhere, so they
+    # take over the new state rather than being rebound
+    for current, built in zip(_live(), fresh):
+        current.__dict__ = built.__dict__
+
+
+async def wait_until_ready():
+    """
+    Dependency for routes answered from the derived structures. Waits for
+    a load in progress, then fails with 503 so clients retry. A standby
+    worker never loads them, so it fails right away.
+    """
+    if ready.is_set():
+        return
+    if standby:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search indexes are still loading",
+            headers={"Retry-After": "5"},
+        )
+    if load_error is not None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Search indexes failed to load: {load_error}",
+            headers={"Retry-After": "30"},
+        )
+    try:
+        await asyncio.wait_for(ready.wait(), READY_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search indexes are still loading",
+            headers={"Retry-After": "5"},
+        )
@@ -0,0 +1,115 @@
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+# Candidates sharing the most trigrams with a query word that are checked
+# with an exact edit distance
+MAX_CANDIDATES = 200
+
+
+def max_edits(word: str) -> int:
+    """
+    Edits tolerated for a word of this length: none for very short words,
+    where one edit changes the meaning, up to two for long ones
+    """
+    if len(word) <= 2:
+        return 0
+    return 1 if len(word) <= 5 else 2
+
+
+def trigrams(word: str, prefix: bool = False) -> List[str]:
+    """
+    Trigrams of a word padded with two leading spaces, so its first
+    letters carry extra weight. Without prefix the end is padded too.
+    """
+    padded = "  " + word + ("" if prefix else " ")
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a: str, b: str, limit: int, prefix: bool = False) -> Optional[int]:
+    """
+    Levenshtein distance between a and b, or None if it exceeds limit.
+    With prefix, the distance between a and the closest prefix of b, so a
+    partially typed word matches the words it could become.
+    """
+    if not prefix and abs(len(a) - len(b)) > limit:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i]
+        best = i
+        for j, other in enumerate(b, 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+            current.append(value)
+            if value < best:
+                best = value
+        if best > limit:
+            return None
+        previous = current
+    distance = min(previous) if prefix else previous[-1]
+    return distance if distance <= limit else None
+
+
+class TrigramIndex:
+    """
+    Words by trigram, for finding the vocabulary words within a few edits
+    of a misspelled one without comparing it to every word
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._words: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._words
+
+    def add(self, word: str):
+        if word in self._words:
+            return
+        self._words.add(word)
+        # Prefix trigrams are a subset of the full ones, so one set serves both
+        for gram in trigrams(word):
+            self._postings.setdefault(gram, set()).add(word)
+
+    def remove(self, word: str):
+        if word not in self._words:
+            return
+        self._words.discard(word)
+        for gram in trigrams(word):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(word)
+                if not postings:
+                    del self._postings[gram]
+
+    def clear(self):
+        self._postings.clear()
+        self._words.clear()
+
+    def similar(self, word: str, prefix: bool = False, limit: int = 5) -> List[Tuple[str, int]]:
+        """
+        Up to limit (word, distance) pairs within max_edits(word) edits,
+        closest first, leaving out exact matches. With prefix, words that
+        word is a misspelled prefix of also match.
+        """
+        edits = max_edits(word)
+        if not edits:
+            return []
+        grams = trigrams(word, prefix)
+        # Each edit breaks at most three trigrams
+        required = max(1, len(grams) - 3 * edits)
+        shared: Counter = Counter()
+        for gram in set(grams):
+            shared.update(self._postings.get(gram, ()))
+        matches = []
+        for candidate, count in shared.most_common(MAX_CANDIDATES):
+            if count < required:
+                break
+            distance = edit_distance(word, candidate, edits, prefix)
+            # Distance 0 is the word itself, or with prefix one it begins
+            if distance:
+                matches.append((distance, -count, candidate))
+        matches.sort()
+        return [(candidate, distance) for distance, _, candidate in matches[:limit]]
@@ -0,0 +1,162 @@
+"""
+Version history of recipes, stored as compact structural deltas.
+
+Every edit appends one record to the recipe_versions collection. The
+record of version n holds the delta that turns version n + 1 back into
+version n, so the live recipe document, always the newest version, is
+the starting point for walking back through its history. Every
+SNAPSHOT_INTERVAL versions the record holds a full copy instead, which
+bounds any reconstruction to fewer than SNAPSHOT_INTERVAL deltas, all
+fetched with one range query.
+
+A delta is a list of operations on paths into the recipe:
+
+    ["s", path, value]             set path to value
+    ["u", path]                    remove path
+    ["r", path, start, end, items] replace list[start:end] with items
+
+Paths are lists of keys and list positions. Lists that keep their length
+are compared element by element, so rewording one step stores only that
+step's text; inserting or removing elements stores a single splice of
+the part between the unchanged head and tail.
+"""
+import copy
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from pymongo.errors import DuplicateKeyError
+
+# Versions whose record is a full copy rather than a delta
+SNAPSHOT_INTERVAL = max(1, int(os.getenv("HISTORY_SNAPSHOT_INTERVAL", "20")))
+
+# Recipe fields that are not part of a version's content
+UNVERSIONED_FIELDS = ("_id", "id", "version")
+
+
+def content(recipe: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in recipe.items() if key not in UNVERSIONED_FIELDS}
+
+
+def diff(old: Any, new: Any, path: Sequence[Any] = ()) -> List[list]:
+    """
+    Operations that turn old into new
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops = [["u", [*path, key]] for key in old if key not in new]
+        for key, value in new.items():
+            if key not in old:
+                ops.append(["s", [*path, key], value])
+            elif old[key] != value:
+                ops.extend(diff(old[key], value, (*path, key)))
+        return ops
+    if isinstance(old, list) and isinstance(new, list):
+        head = 0
+        while head < min(len(old), len(new)) and old[head] == new[head]:
+            head += 1
+        tail = 0
+        while tail < min(len(old), len(new)) - head and old[-1 - tail] == new[-1 - tail]:
+            tail += 1
+        if len(old) == len(new):
+            ops = []
+            for index in range(head, len(new) - tail):
+                if old[index] != new[index]:
+                    ops.extend(diff(old[index], new[index], (*path, index)))
+            return ops
+        return [["r", list(path), head, len(old) - tail, new[head:len(new) - tail]]]
+    return [["s", list(path), new]]
+
+
+def apply(document: Dict[str, Any], ops: List[list]) -> Dict[str, Any]:
+    """
+    Apply the operations of a delta to document in place, and return it.
+    Values are used as they are, not copied.
+    """
+    for op in ops:
+        kind, path = op[0], op[1]
+        if not path:
+            document = op[2]
+            continue
+        target = document
+        for part in path[:-1]:
+            target = target[part]
+        if kind == "s":
+            target[path[-1]] = op[2]
+        elif kind == "u":
+            del target[path[-1]]
+        elif kind == "r":
+            target[path[-1]][op[2]:op[3]] = op[4]
+        else:
+            raise ValueError(f"Unknown delta operation: {kind}")
+    return document
+
+
+class RecipeHistory:
+    """
+    Append-only version records of recipes.
+
+    Works with a motor collection or any object exposing the same coroutine
+    API, such as memory_store.InMemoryCollection.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def record(self, previous: Dict[str, Any], current: Dict[str, Any]):
+        """
+        Store the version replaced by an edit. previous and current are the
+        recipe before and after it.
+        """
+        version = previous["version"]
+        record: Dict[str, Any] = {
+            "recipe_id": str(previous.get("id", previous.get("_id"))),
+            "version": version,
+            "created_at": datetime.now(timezone.utc),
+        }
+        if version % SNAPSHOT_INTERVAL == 0:
+            record["snapshot"] = content(previous)
+        else:
+            record["delta"] = diff(content(current), content(previous))
+        try:
+            await self.collection.insert_one(record)
+        except DuplicateKeyError:
+            # Only the edit that moved the recipe past this version records
+            # it, so the record is already there from a retried insert
+            pass
+
+    async def rebuild(self, current: Dict[str, Any], version: int) -> Optional[Dict[str, Any]]:
+        """
+        The recipe as it was at version, from its current state. Returns
+        None if that version is newer than the recipe or its history has
+        a gap, e.g. edits made before history was recorded.
+        """
+        if version > current["version"] or version < 1:
+            return None
+        if version == current["version"]:
+            return current
+        recipe_id = current["id"]
+        # Start from the nearest snapshot above version, or the live recipe
+        snapshot = -(-version // SNAPSHOT_INTERVAL) * SNAPSHOT_INTERVAL
+        end = min(snapshot, current["version"] - 1)
+        records = await self.collection.find(
+            {"recipe_id": recipe_id, "version": {"$gte": version, "$lte": end}},
+            {"_id": 0, "version": 1, "delta": 1, "snapshot": 1},
+        ).sort([("version", -1)]).to_list(None)
+        if len(records) != end - version + 1:
+            return None
+
+        if snapshot < current["version"]:
+            if "snapshot" not in records[0]:
+                return None
+            state = records[0]["snapshot"]
+            records = records[1:]
+        else:
+            state = copy.deepcopy(content(current))
+        for record in records:
+            if "delta" not in record:
+                return None
+            state = apply(state, record["delta"])
+        return {"id": recipe_id, **state, "version": version}
+
+    async def delete(self, recipe_id: str):
+        await self.collection.delete_many({"recipe_id": recipe_id})
@@ -0,0 +1,267 @@
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from search_index import ingredient_names, tokenize
+
+# array typecode and matching numpy dtype for recipe row numbers
+ROW_TYPECODE = "I"
+ROW_DTYPE = np.uintc
+
+MATCH_MODES = ("any", "all")
+
+# Postings are compacted once this many of them point at removed rows,
+# and at least COMPACT_FRACTION of all postings do
+COMPACT_THRESHOLD = 1024
+COMPACT_FRACTION = 0.25
+
+
+def normalize_ingredient(name: str) -> str:
+    return " ".join(tokenize(name))
+
+
+class IngredientIndex:
+    """
+    Ingredient vocabulary mapping each normalized ingredient to the compact
+    array of recipe rows that use it.
+
+    Recipes are assigned dense row numbers (freed rows are reused), so the
+    per-ingredient row arrays can be viewed as numpy arrays without copying.
+    Queries turn into a handful of concatenations and bincounts over those
+    arrays instead of nested loops over every recipe's ingredient list.
+
+    Removing a recipe only marks its row dead; queries already mask dead
+    rows out. Its postings stay behind as tombstones until enough have
+    built up, then every affected array is filtered in one pass and the
+    dead rows are freed for reuse.
+    """
+
+    def __init__(self):
+        self._rows: Dict[str, int] = {}
+        self._recipe_ids: List[Optional[str]] = []
+        self._free_rows: List[int] = []
+        self._names: List[List[str]] = []
+        self._entries_by_row: List[Set[str]] = []
+        self._alive = bytearray()
+        self._totals = array(ROW_TYPECODE)
+        self._postings: Dict[str, array] = {}
+        # Live recipes per entry; postings can also hold dead rows
+        self._entry_counts: Dict[str, int] = {}
+        # Token -> entries containing it, so "pepper" resolves to "black pepper"
+        self._token_entries: Dict[str, Set[str]] = {}
+        # Removed rows still listed in postings, the entries listing them
+        # and how many postings they account for
+        self._dead_rows: List[int] = []
+        self._stale_entries: Set[str] = set()
+        self._tombstones = 0
+        self._posting_count = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, recipe_id: str) -> bool:
+        return recipe_id in self._rows
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._postings)
+
+    def add(self, recipe_id: str, recipe: Dict[str, Any]):
+        """
+        Index a recipe's ingredients, replacing any previous version
+        """
+        if recipe_id in self._rows:
+            self.remove(recipe_id)
+
+        names = ingredient_names(recipe)
+        entries = {normalize_ingredient(name) for name in names}
+        entries.discard("")
+
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._recipe_ids[row] = recipe_id
+            self._names[row] = names
+            self._entries_by_row[row] = entries
+            self._alive[row] = 1
+            self._totals[row] = len(entries)
+        else:
+            row = len(self._recipe_ids)
+            self._recipe_ids.append(recipe_id)
+            self._names.append(names)
+            self._entries_by_row.append(entries)
+            self._alive.append(1)
+            self._totals.append(len(entries))
+        self._rows[recipe_id] = row
+
+        for entry in entries:
+            postings = self._postings.get(entry)
+            if postings is None:
+                postings = self._postings[entry] = array(ROW_TYPECODE)
+                for token in entry.split():
+                    self._token_entries.setdefault(token, set()).add(entry)
+            postings.append(row)
+            self._entry_counts[entry] = self._entry_counts.get(entry, 0) + 1
+        self._posting_count += len(entries)
+
+    def remove(self, recipe_id: str) -> bool:
+        """
+        Drop a recipe from the index. Returns False if it was not indexed.
+        """
+        row = self._rows.pop(recipe_id, None)
+        if row is None:
+            return False
+
+        for entry in self._entries_by_row[row]:
+            self._entry_counts[entry] -= 1
+            if self._entry_counts[entry]:
+                self._stale_entries.add(entry)
+                self._tombstones += 1
+                continue
+            # No live recipe uses it any more: drop it with its tombstones
+            del self._entry_counts[entry]
+            dropped = len(self._postings.pop(entry))
+            self._posting_count -= dropped
+            self._tombstones -= dropped - 1
+            self._stale_entries.discard(entry)
+            for token in entry.split():
+                token_entries = self._token_entries[token]
+                token_entries.discard(entry)
+                if not token_entries:
+                    del self._token_entries[token]
+
+        self._recipe_ids[row] = None
+        self._names[row] = []
+        self._entries_by_row[row] = set()
+        self._alive[row] = 0
+        self._totals[row] = 0
+        self._dead_rows.append(row)
+        if self._tombstones >= max(COMPACT_THRESHOLD, COMPACT_FRACTION * self._posting_count):
+            self.compact()
+        return True
+
+    def compact(self):
+        """
+        Drop the postings of removed recipes and free their rows for reuse
+        """
+        alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+        for entry in self._stale_entries:
+            postings = self._postings[entry]
+            rows = np.frombuffer(postings, dtype=ROW_DTYPE)
+            kept = rows[alive[rows]]
+            compacted = array(ROW_TYPECODE)
+            compacted.frombytes(kept.tobytes())
+            self._postings[entry] = compacted
+            self._posting_count -= len(rows) - len(kept)
+        self._stale_entries.clear()
+        self._free_rows.extend(self._dead_rows)
+        self._dead_rows.clear()
+        self._tombstones = 0
+
+    def clear(self):
+        self._rows.clear()
+        self._recipe_ids.clear()
+        self._free_rows.clear()
+        self._names.clear()
+        self._entries_by_row.clear()
+        self._alive = bytearray()
+        self._totals = array(ROW_TYPECODE)
+        self._postings.clear()
+        self._entry_counts.clear()
+        self._token_entries.clear()
+        self._dead_rows.clear()
+        self._stale_entries.clear()
+        self._tombstones = 0
+        self._posting_count = 0
+
+    def resolve(self, ingredient: str) -> Set[str]:
+        """
+        Return vocabulary entries containing every token of ingredient
+        """
+        tokens = tokenize(ingredient)
+        if not tokens:
+            return set()
+        candidates = [self._token_entries.get(token) for token in tokens]
+        if not all(candidates):
+            return set()
+        candidates.sort(key=len)
+        return set.intersection(*candidates)
+
+    def _row_counts(self, entries: Iterable[str], size: int, unique: bool = False) -> np.ndarray:
+        views = [np.frombuffer(self._postings[entry], dtype=ROW_DTYPE) for entry in entries]
+        if not views:
+            return np.zeros(size, dtype=np.intp)
+        rows = np.concatenate(views)
+        if unique:
+            rows = np.unique(rows)
+        return np.bincount(rows, minlength=size)
+
+    def match(
+        self,
+        ingredients: List[str],
+        mode: str = "any",
+        max_missing: Optional[int] = None,
+        min_coverage: float = 0.0,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        Match recipes against a list of ingredients on hand.
+
+        mode "any" keeps recipes using at least one of the ingredients and
+        "all" keeps recipes using every one of them. max_missing and
+        min_coverage further restrict results to recipes that need at most
+        that many other ingredients, or whose ingredient list is covered by
+        at least that fraction. Results are ranked by coverage, then by the
+        number of missing ingredients.
+        """
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown match mode: {mode}")
+
+        size = len(self._recipe_ids)
+        resolved = [self.resolve(item) for item in ingredients if item.strip()]
+        if not size or not resolved:
+            return []
+
+        # Number of requested ingredients each recipe uses
+        requested = np.zeros(size, dtype=np.intp)
+        for entries in resolved:
+            requested += self._row_counts(entries, size, unique=True)
+
+        # Number of each recipe's own ingredients covered by the pantry
+        pantry = set().union(*resolved)
+        covered = self._row_counts(pantry, size)
+
+        totals = np.frombuffer(self._totals, dtype=ROW_DTYPE).astype(np.intp)
+        missing = totals - covered
+        coverage = covered / np.maximum(totals, 1)
+
+        mask = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+        if mode == "all":
+            mask &= requested == len(resolved)
+        else:
+            mask &= requested > 0
+        if max_missing is not None:
+            mask &= missing <= max_missing
+        if min_coverage > 0:
+            mask &= coverage >= min_coverage
+
+        rows = np.flatnonzero(mask)
+        order = np.lexsort((-requested[rows], missing[rows], -coverage[rows]))
+        results = []
+        for row in rows[order[:limit]].tolist():
+            results.append({
+                "id": self._recipe_ids[row],
+                "ingredients": self._names[row],
+                "matched": int(covered[row]),
+                "missing": int(missing[row]),
+                "coverage": round(float(coverage[row]), 4),
+                "missing_ingredients": [
+                    name for name in self._names[row]
+                    if normalize_ingredient(name) not in pantry
+                ],
+            })
+        return results
+
+
+# Shared index for the running application
+ingredient_index = IngredientIndex()
@@ -0,0 +1,141 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+import metrics
+
+# Seconds a lookup waits for others to join its batch. 0 batches the
+# lookups made in the same event loop iteration without adding latency.
+LOADER_WINDOW_SECONDS = float(os.getenv("LOADER_WINDOW_MS", "0")) / 1000
+
+# Batches are dispatched early once they reach this many keys
+LOADER_MAX_BATCH = int(os.getenv("LOADER_MAX_BATCH", "100"))
+
+BatchFetch = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+
+class BatchLoader:
+    """
+    Coalesces concurrent lookups by key into one batched fetch, like a
+    dataloader. Lookups of the same key in one batch share a single
+    result. fetch receives the distinct keys and returns a mapping of the
+    ones it found; the others resolve to None.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch: BatchFetch,
+        window: float = LOADER_WINDOW_SECONDS,
+        max_batch: int = LOADER_MAX_BATCH,
+    ):
+        self.name = name
+        self.fetch = fetch
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Running fetches, referenced so they are not garbage collected
+        self._running: Set[asyncio.Task] = set()
+
+    async def load(self, key: Hashable) -> Any:
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[key] = loop.create_future()
+            if len(self._pending) >= self.max_batch:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._dispatch)
+        # Shielded so a cancelled caller does not cancel the other waiters
+        return await asyncio.shield(future)
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: Dict[Hashable, asyncio.Future]):
+        metrics.loader_batch_size.observe((self.name,), len(batch))
+        try:
+            results = await self.fetch(list(batch))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if not future.done():
+                future.set_result(results.get(key))
+
+
+BatchWrite = Callable[[List[Any]], Awaitable[Dict[int, Exception]]]
+
+
+class BatchWriter:
+    """
+    Groups concurrent writes into one batched write, sent once it holds
+    max_batch items or window seconds after its first item. write receives
+    the items and returns the exceptions of the ones it rejected, by
+    position; submit raises that exception for those items.
+    """
+
+    def __init__(self, name: str, write: BatchWrite, window: float, max_batch: int):
+        self.name = name
+        self.write = write
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Set[asyncio.Task] = set()
+
+    async def submit(self, item: Any):
+        """
+        Queue item and wait until the batch holding it was written
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._dispatch)
+        # Shielded so a cancelled caller leaves the rest of its batch alone
+        await asyncio.shield(future)
+
+    async def drain(self):
+        """
+        Write what is queued and wait for every running batch
+        """
+        self._dispatch()
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        metrics.writer_batch_size.observe((self.name,), len(batch))
+        try:
+            errors = await self.write([item for item, _ in batch])
+        except Exception as e:
+            errors = {index: e for index in range(len(batch))}
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(None)
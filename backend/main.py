@@ -1,8 +1,110 @@
-from fastapi import FastAPI
-from routers import auth, recipes, search
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+from fastapi import Depends, FastAPI, status
+from fastapi.responses import JSONResponse
+
+import change_stream
+import database
+import derived_state
+import media
+import metrics
+from cache import create_shared_backend, response_cache
+from metrics import MetricsMiddleware, router as metrics_router
+from notes import NoteService
+from repository import RecipeRepository
+from routers import auth, notes, recipes, scaling, search
+from routers.media import VariantFiles, router as media_router
+
+logger = logging.getLogger(__name__)
+
+
+async def load_derived_state(repository: RecipeRepository, started: float):
+    try:
+        await derived_state.load(repository)
+    except Exception:
+        logger.exception("Loading the derived structures failed")
+        return
+    metrics.startup_ready_seconds.value = round(time.perf_counter() - started, 4)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    db = await database.connect()
+    app.state.recipes = RecipeRepository(db.recipes, db.recipe_versions)
+    app.state.notes = NoteService(db.notes)
+    app.state.media = media.MediaCatalog(db.media_manifests)
+    if media.MEDIA_URL.startswith("/"):
+        # Served by the mount below, which fails on a missing directory
+        os.makedirs(media.MEDIA_VARIANT_DIR, exist_ok=True)
+    response_cache.shared = create_shared_backend()
+    response_cache.clear()
+    # Other instances' writes reach the derived structures through change
+    # streams. The subscriber checkpoints before the load starts, so writes
+    # made while it runs are replayed afterwards.
+    tasks = []
+    subscriber = None
+    if not derived_state.standby:
+        subscriber = change_stream.create_subscriber(db, app.state.recipes, app.state.notes, app.state.media)
+    if subscriber is not None:
+        tokens = derived_state.resume_tokens if derived_state.prebuilt else None
+        follower = await change_stream.start_subscriber(subscriber, tokens)
+        if follower is not None:
+            tasks.append(follower)
+    # The server starts accepting requests right away; routes answered
+    # from the derived structures wait for them through wait_until_ready
+    if derived_state.prebuilt:
+        metrics.startup_ready_seconds.value = round(time.perf_counter() - started, 4)
+    elif not derived_state.standby:
+        tasks.append(asyncio.create_task(load_derived_state(app.state.recipes, started)))
+    yield
+    for task in tasks:
+        task.cancel()
+    await app.state.notes.close()
+    app.state.media.close()
+    await database.close()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router, prefix="/api/auth")
 app.include_router(recipes.router, prefix="/api/recipes")
-app.include_router(search.router, prefix="/api/search")
+app.include_router(notes.router, prefix="/api/recipes")
+app.include_router(
+    search.router,
+    prefix="/api/search",
+    dependencies=[Depends(derived_state.wait_until_ready)],
+)
+app.include_router(scaling.router, prefix="/api/scaling")
+app.include_router(media_router, prefix="/api/media")
+app.include_router(metrics_router)
+
+# Variants are served from here unless MEDIA_URL points at a CDN
+if media.MEDIA_URL.startswith("/"):
+    app.mount(media.MEDIA_URL, VariantFiles(directory=media.MEDIA_VARIANT_DIR, check_dir=False), name="media")
+
+
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness: the process is up and serving requests
+    """
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: the search indexes reflect the whole catalog
+    """
+    if derived_state.ready.is_set():
+        return {"status": "ready"}
+    body = {"status": "loading"}
+    if derived_state.load_error is not None:
+        body = {"status": "failed", "error": derived_state.load_error}
+    return JSONResponse(body, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -0,0 +1,328 @@
+"""
+Responsive variants of recipe images.
+
+Recipes and their steps carry media lists of original image URLs.
+Ingesting a recipe resolves each URL to its uploaded file, generates
+resized WebP variants, AVIF ones where Pillow supports it, and a
+blurhash placeholder in a process pool, and stores a manifest of them
+in the media_manifests collection, one document per recipe.
+
+List and search responses embed only the thumbnail of a recipe's first
+image in place of its media list, looked up in an in-process cache of
+manifests, so catalog pages no longer download full-size originals.
+Images not ingested yet fall back to their original URL.
+
+MEDIA_UPLOAD_DIR stands in for the upload bucket: the file behind
+https://host/path is MEDIA_UPLOAD_DIR/host/path. Variants are written to
+MEDIA_VARIANT_DIR, named after a digest of the source so they can be
+cached forever, and linked under MEDIA_URL.
+"""
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import Request
+
+from cache import response_cache
+from loader import BatchLoader
+
+MEDIA_UPLOAD_DIR = os.path.abspath(os.getenv("MEDIA_UPLOAD_DIR", "media/uploads"))
+MEDIA_VARIANT_DIR = os.path.abspath(os.getenv("MEDIA_VARIANT_DIR", "media/variants"))
+
+# Prefix of variant URLs: a path served by this application, or a CDN
+# origin in front of MEDIA_VARIANT_DIR
+MEDIA_URL = os.getenv("MEDIA_URL", "/media").rstrip("/")
+
+# Width of the variant embedded in list and search responses
+THUMBNAIL_WIDTH = int(os.getenv("MEDIA_THUMBNAIL_WIDTH", "320"))
+
+# Variant widths; images are never scaled up
+MEDIA_WIDTHS = tuple(sorted({THUMBNAIL_WIDTH, *(int(width) for width in os.getenv("MEDIA_WIDTHS", "640,1280").split(","))}))
+
+# "0" skips AVIF, which takes several times longer to encode than WebP
+MEDIA_AVIF = os.getenv("MEDIA_AVIF", "1") != "0"
+
+# Processes encoding images; 0 uses one per CPU
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "0")) or None
+
+# Recipes whose manifest, or lack of one, is kept in memory
+MEDIA_CACHED_MANIFESTS = int(os.getenv("MEDIA_CACHED_MANIFESTS", "10000"))
+
+QUALITY = {"webp": 80, "avif": 55}
+
+# Basis functions per axis of blurhash placeholders
+BLURHASH_COMPONENTS = (4, 3)
+
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+def source_path(url: str) -> Optional[str]:
+    """
+    Uploaded file behind a media URL, or None if the URL points outside
+    the upload directory
+    """
+    parsed = urllib.parse.urlsplit(url)
+    path = os.path.normpath(os.path.join(MEDIA_UPLOAD_DIR, parsed.netloc, urllib.parse.unquote(parsed.path).lstrip("/")))
+    return path if path.startswith(MEDIA_UPLOAD_DIR + os.sep) else None
+
+
+def image_formats() -> Tuple[str, ...]:
+    """
+    Formats to encode variants in, the most widely supported last
+    """
+    from PIL import features
+
+    return ("avif", "webp") if MEDIA_AVIF and features.check("avif") else ("webp",)
+
+
+def _base83(value: int, length: int) -> str:
+    return "".join(BASE83[value // 83 ** (length - 1 - i) % 83] for i in range(length))
+
+
+def _to_srgb(value: float) -> int:
+    value = min(max(value, 0.0), 1.0)
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def blurhash(pixels: np.ndarray, components: Tuple[int, int] = BLURHASH_COMPONENTS) -> str:
+    """
+    Blurhash of an RGB image given as a height x width x 3 uint8 array
+    """
+    x_components, y_components = components
+    height, width = pixels.shape[:2]
+    srgb = pixels.astype(np.float64) / 255
+    linear = np.where(srgb <= 0.04045, srgb / 12.92, ((srgb + 0.055) / 1.055) ** 2.4)
+    cos_x = np.cos(np.pi * np.outer(np.arange(x_components), np.arange(width)) / width)
+    cos_y = np.cos(np.pi * np.outer(np.arange(y_components), np.arange(height)) / height)
+    # factors[j, i] is the mean colour weighted by basis function (i, j)
+    factors = np.einsum("jy,ix,yxc->jic", cos_y, cos_x, linear) / (width * height)
+    factors[1:, :] *= 2
+    factors[0, 1:] *= 2
+    dc = factors[0, 0]
+    ac = factors.reshape(-1, 3)[1:]
+
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if len(ac):
+        quantised_max = int(max(0, min(82, np.floor(np.abs(ac).max() * 166 - 0.5))))
+        maximum = (quantised_max + 1) / 166
+    else:
+        quantised_max, maximum = 0, 1.0
+    result += _base83(quantised_max, 1)
+    result += _base83((_to_srgb(dc[0]) << 16) + (_to_srgb(dc[1]) << 8) + _to_srgb(dc[2]), 4)
+    quantised = np.clip(np.floor(np.sign(ac) * np.abs(ac / maximum) ** 0.5 * 9 + 9.5), 0, 18).astype(int)
+    for r, g, b in quantised:
+        result += _base83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def process_image(path: str, formats: Tuple[str, ...]) -> Dict[str, Any]:
+    """
+    Write the variants of one uploaded image and describe them. Runs in a
+    worker process. Variants already written for the same source are
+    reused.
+    """
+    from PIL import Image, ImageOps
+
+    with open(path, "rb") as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()[:24]
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+    width, height = image.size
+
+    variants = []
+    for target in MEDIA_WIDTHS:
+        size = (min(target, width), max(1, round(height * min(target, width) / width)))
+        resized = None
+        for image_format in formats:
+            name = f"{digest}/{size[0]}.{image_format}"
+            output = os.path.join(MEDIA_VARIANT_DIR, name)
+            if not os.path.exists(output):
+                if resized is None:
+                    resized = image.resize(size, Image.LANCZOS) if size != image.size else image
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+                partial = f"{output}.{os.getpid()}.tmp"
+                resized.save(partial, image_format.upper(), quality=QUALITY[image_format])
+                os.replace(partial, output)
+            variants.append({
+                "url": f"{MEDIA_URL}/{name}",
+                "format": image_format,
+                "width": size[0],
+                "height": size[1],
+                "bytes": os.path.getsize(output),
+            })
+        if target >= width:
+            break
+
+    placeholder = image.convert("RGB")
+    placeholder.thumbnail((32, 32))
+    return {
+        "digest": digest,
+        "width": width,
+        "height": height,
+        "blurhash": blurhash(np.asarray(placeholder)),
+        "variants": variants,
+    }
+
+
+def thumbnail(image: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The THUMBNAIL_WIDTH variants of a processed image, as embedded in
+    lists: url in the most widely supported format, with the other formats
+    by name
+    """
+    width = min(THUMBNAIL_WIDTH, image["width"])
+    variants = [variant for variant in image["variants"] if variant["width"] == width]
+    result: Dict[str, Any] = {
+        "url": variants[-1]["url"],
+        "width": width,
+        "height": variants[-1]["height"],
+        "blurhash": image["blurhash"],
+    }
+    result.update((variant["format"], variant["url"]) for variant in variants[:-1])
+    return result
+
+
+def recipe_media(recipe: Dict[str, Any]) -> List[str]:
+    """
+    Distinct media URLs of a recipe and its steps, in order
+    """
+    urls = list(recipe.get("media") or [])
+    for step in recipe.get("steps") or []:
+        urls.extend(step.get("media") or [])
+    return list(dict.fromkeys(urls))
+
+
+class MediaCatalog:
+    """
+    Image manifests of recipes, cached in memory, and their ingestion.
+
+    Works with a motor collection or any object exposing the same coroutine
+    API, such as memory_store.InMemoryCollection.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        # Manifest by recipe ID; None records that a recipe has none
+        self._manifests: "OrderedDict[str, Optional[Dict[str, Any]]]" = OrderedDict()
+        self._loader = BatchLoader("media_manifests", self._fetch)
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def _fetch(self, recipe_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        documents = await self.collection.find({"_id": {"$in": recipe_ids}}).to_list(None)
+        return {document["_id"]: document for document in documents}
+
+    def _remember(self, recipe_id: str, manifest: Optional[Dict[str, Any]]):
+        self._manifests[recipe_id] = manifest
+        self._manifests.move_to_end(recipe_id)
+        while len(self._manifests) > MEDIA_CACHED_MANIFESTS:
+            self._manifests.popitem(last=False)
+
+    async def manifest(self, recipe_id: str) -> Optional[Dict[str, Any]]:
+        if recipe_id in self._manifests:
+            self._manifests.move_to_end(recipe_id)
+            return self._manifests[recipe_id]
+        manifest = await self._loader.load(recipe_id)
+        self._remember(recipe_id, manifest)
+        return manifest
+
+    def forget(self, recipe_id: Optional[str] = None):
+        """
+        Drop the cached manifest of one recipe, or of all
+        """
+        if recipe_id is None:
+            self._manifests.clear()
+        else:
+            self._manifests.pop(recipe_id, None)
+
+    async def with_thumbnails(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Copies of list items with the thumbnail of their first image added
+        next to their media
+        """
+        manifests = await asyncio.gather(*(self.manifest(item["id"]) for item in items))
+        results = []
+        for item, manifest in zip(items, manifests):
+            result = dict(item)
+            media = item.get("media")
+            result["thumbnail"] = None
+            if media:
+                images = (manifest or {}).get("images", [])
+                image = next((image for image in images if image["url"] == media[0]), None)
+                result["thumbnail"] = image["thumbnail"] if image is not None else {"url": media[0]}
+            results.append(result)
+        return results
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Spawned rather than forked, so workers do not inherit the
+            # event loop and driver threads of this process
+            self._pool = ProcessPoolExecutor(MEDIA_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    async def ingest(self, recipe: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Process the uploaded images of a recipe and store its manifest.
+        URLs without an upload keep the images of the previous manifest,
+        if any, and are listed as missing.
+        """
+        loop = asyncio.get_running_loop()
+        previous = {image["url"]: image for image in ((await self.manifest(recipe["id"])) or {}).get("images", [])}
+        formats = image_formats()
+        jobs = {}
+        missing = []
+        for url in recipe_media(recipe):
+            path = source_path(url)
+            if path is not None and os.path.isfile(path):
+                jobs[url] = loop.run_in_executor(self._executor(), process_image, path, formats)
+            else:
+                missing.append(url)
+
+        images, errors = [], []
+        results = await asyncio.gather(*jobs.values(), return_exceptions=True)
+        processed = dict(zip(jobs, results))
+        for url in recipe_media(recipe):
+            result = processed.get(url)
+            if isinstance(result, Exception):
+                errors.append({"url": url, "error": f"{type(result).__name__}: {result}"})
+                result = None
+            if result is not None:
+                image = {"url": url, **result}
+                image["thumbnail"] = thumbnail(image)
+                images.append(image)
+            elif url in previous:
+                images.append(previous[url])
+
+        manifest = {
+            "_id": recipe["id"],
+            "images": images,
+            "missing": missing,
+            "errors": errors,
+            "updated_at": datetime.now(timezone.utc),
+        }
+        await self.collection.replace_one({"_id": recipe["id"]}, manifest, upsert=True)
+        self._remember(recipe["id"], manifest)
+        response_cache.invalidate_search()
+        return manifest
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+def get_media_catalog(request: Request) -> MediaCatalog:
+    """
+    FastAPI dependency returning the media catalog created at startup
+    """
+    return request.app.state.media
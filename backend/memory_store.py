@@ -0,0 +1,380 @@
+import copy
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+_MISSING = object()
+
+
+def _get_path(document: Any, path: str) -> Any:
+    """
+    Resolve a dotted path, collecting values across arrays like MongoDB does
+    """
+    value = document
+    for part in path.split("."):
+        if isinstance(value, list):
+            if part.isdigit():
+                index = int(part)
+                value = value[index] if index < len(value) else _MISSING
+            else:
+                values = [item.get(part, _MISSING) for item in value if isinstance(item, dict)]
+                values = [item for item in values if item is not _MISSING]
+                value = values if values else _MISSING
+        elif isinstance(value, dict):
+            value = value.get(part, _MISSING)
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+def _candidates(value: Any) -> List[Any]:
+    if value is _MISSING:
+        return []
+    if isinstance(value, list):
+        flat = [value]
+        for item in value:
+            flat.extend(item if isinstance(item, list) else [item])
+        return flat
+    return [value]
+
+
+def _compare(left: Any, right: Any, op: str) -> bool:
+    try:
+        if op == "$gt":
+            return left > right
+        if op == "$gte":
+            return left >= right
+        if op == "$lt":
+            return left < right
+        if op == "$lte":
+            return left <= right
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+def _match_operator(value: Any, op: str, operand: Any) -> bool:
+    candidates = _candidates(value)
+    if op == "$eq":
+        return operand in candidates
+    if op == "$ne":
+        return operand not in candidates
+    if op == "$in":
+        return any(item in candidates for item in operand)
+    if op == "$nin":
+        return not any(item in candidates for item in operand)
+    if op == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    if op == "$all":
+        return all(item in candidates for item in operand)
+    if op == "$regex":
+        pattern = re.compile(operand) if isinstance(operand, str) else operand
+        return any(isinstance(item, str) and pattern.search(item) for item in candidates)
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        return any(_compare(item, operand, op) for item in candidates)
+    raise ValueError(f"Unsupported operator: {op}")
+
+
+def matches(document: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """
+    Evaluate the subset of the MongoDB query language the routers use
+    """
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(matches(document, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, sub) for sub in condition):
+                return False
+        else:
+            value = _get_path(document, key)
+            if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+                if not all(_match_operator(value, op, operand) for op, operand in condition.items()):
+                    return False
+            elif condition not in _candidates(value) and not (condition is None and value is _MISSING):
+                return False
+    return True
+
+
+def _set_path(document: Dict[str, Any], path: str, value: Any):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+
+def _unset_path(document: Dict[str, Any], path: str):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(parts[-1], None)
+
+
+def _include_path(source: Dict[str, Any], target: Dict[str, Any], parts: List[str]):
+    key = parts[0]
+    if key not in source:
+        return
+    value = source[key]
+    if len(parts) == 1:
+        target[key] = copy.deepcopy(value)
+    elif isinstance(value, dict):
+        _include_path(value, target.setdefault(key, {}), parts[1:])
+    elif isinstance(value, list):
+        items = [item for item in value if isinstance(item, dict)]
+        existing = target.get(key)
+        projected = existing if isinstance(existing, list) else [{} for item in items]
+        for item, projected_item in zip(items, projected):
+            _include_path(item, projected_item, parts[1:])
+        target[key] = projected
+
+
+def project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Apply an inclusion or exclusion projection, including $slice
+    """
+    if not projection:
+        return copy.deepcopy(document)
+
+    slices = {key: spec["$slice"] for key, spec in projection.items() if isinstance(spec, dict)}
+    fields = {key: spec for key, spec in projection.items() if not isinstance(spec, dict)}
+    include_id = bool(fields.pop("_id", 1))
+    inclusive = any(fields.values()) or (projection.get("_id") == 1 and not fields)
+
+    if inclusive:
+        result: Dict[str, Any] = {}
+        for path in list(fields) + list(slices):
+            _include_path(document, result, path.split("."))
+    else:
+        result = copy.deepcopy(document)
+        for path in fields:
+            _unset_path(result, path)
+
+    for path, count in slices.items():
+        value = _get_path(result, path)
+        if isinstance(value, list):
+            if isinstance(count, list):
+                start, length = count
+                _set_path(result, path, value[start:start + length])
+            else:
+                _set_path(result, path, value[:count] if count >= 0 else value[count:])
+
+    if include_id and "_id" in document:
+        result["_id"] = document["_id"]
+    else:
+        result.pop("_id", None)
+    return result
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    # Missing values sort first, then values grouped by type
+    if value is _MISSING or value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, ObjectId):
+        return (3, value)
+    return (4, value)
+
+
+class InMemoryCursor:
+    """
+    Async cursor mirroring the parts of motor's AsyncIOMotorCursor in use
+    """
+
+    def __init__(self, documents: List[Dict[str, Any]], projection: Optional[Dict[str, Any]]):
+        self._documents = documents
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._iterator = None
+
+    def sort(self, key_or_list, direction: int = 1) -> "InMemoryCursor":
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def skip(self, count: int) -> "InMemoryCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "InMemoryCursor":
+        self._limit = count
+        return self
+
+    def batch_size(self, count: int) -> "InMemoryCursor":
+        return self
+
+    def _results(self) -> List[Dict[str, Any]]:
+        documents = self._documents
+        for key, direction in reversed(self._sort):
+            documents = sorted(
+                documents,
+                key=lambda document: _sort_key(_get_path(document, key)),
+                reverse=direction < 0,
+            )
+        documents = documents[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        return [project(document, self._projection) for document in documents]
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        results = self._results()
+        return results[:length] if length else results
+
+    def __aiter__(self):
+        self._iterator = iter(self._results())
+        return self
+
+    async def __anext__(self) -> Dict[str, Any]:
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class InMemoryCollection:
+    """
+    Dict-backed stand-in for a motor collection, used for local development
+    and tests when no MongoDB server is available
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._documents: Dict[Any, Dict[str, Any]] = {}
+        self.indexes: List[Any] = []
+
+    def _matching(self, query: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if query and set(query) == {"_id"} and not isinstance(query["_id"], dict):
+            document = self._documents.get(query["_id"])
+            return [document] if document is not None else []
+        return [document for document in self._documents.values() if matches(document, query)]
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> InMemoryCursor:
+        return InMemoryCursor(self._matching(filter), projection)
+
+    async def find_one(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        documents = self._matching(filter)
+        return project(documents[0], projection) if documents else None
+
+    async def count_documents(self, filter: Dict[str, Any]) -> int:
+        return len(self._matching(filter))
+
+    async def insert_one(self, document: Dict[str, Any]) -> InsertOneResult:
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._documents:
+            raise DuplicateKeyError(f"Duplicate _id: {document['_id']}")
+        self._documents[document["_id"]] = copy.deepcopy(document)
+        return InsertOneResult(document["_id"], True)
+
+    async def insert_many(self, documents: Iterable[Dict[str, Any]], ordered: bool = True) -> InsertManyResult:
+        inserted, errors = [], []
+        for index, document in enumerate(documents):
+            try:
+                await self.insert_one(document)
+                inserted.append(document["_id"])
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e), "op": document})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return InsertManyResult(inserted, True)
+
+    def _apply_update(self, document: Dict[str, Any], update: Dict[str, Any]):
+        for op, fields in update.items():
+            for path, value in fields.items():
+                if op == "$set":
+                    _set_path(document, path, copy.deepcopy(value))
+                elif op == "$unset":
+                    _unset_path(document, path)
+                elif op == "$inc":
+                    current = _get_path(document, path)
+                    _set_path(document, path, (0 if current is _MISSING else current) + value)
+                elif op == "$push":
+                    current = _get_path(document, path)
+                    _set_path(document, path, ([] if current is _MISSING else current) + [copy.deepcopy(value)])
+                else:
+                    raise ValueError(f"Unsupported update operator: {op}")
+
+    async def update_one(self, filter: Dict[str, Any], update: Dict[str, Any]) -> UpdateResult:
+        documents = self._matching(filter)
+        if not documents:
+            return UpdateResult({"n": 0, "nModified": 0}, True)
+        self._apply_update(documents[0], update)
+        return UpdateResult({"n": 1, "nModified": 1}, True)
+
+    async def find_one_and_update(
+        self,
+        filter: Dict[str, Any],
+        update: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        return_document: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        documents = self._matching(filter)
+        if not documents:
+            return None
+        before = project(documents[0], projection)
+        self._apply_update(documents[0], update)
+        return project(documents[0], projection) if return_document else before
+
+    async def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False) -> UpdateResult:
+        documents = self._matching(filter)
+        if not documents:
+            if upsert:
+                document = {**replacement}
+                if "_id" not in document and "_id" in filter:
+                    document["_id"] = filter["_id"]
+                await self.insert_one(document)
+                return UpdateResult({"n": 1, "nModified": 0, "upserted": document["_id"]}, True)
+            return UpdateResult({"n": 0, "nModified": 0}, True)
+        document_id = documents[0]["_id"]
+        self._documents[document_id] = {**copy.deepcopy(replacement), "_id": document_id}
+        return UpdateResult({"n": 1, "nModified": 1}, True)
+
+    async def delete_one(self, filter: Dict[str, Any]) -> DeleteResult:
+        documents = self._matching(filter)
+        if documents:
+            del self._documents[documents[0]["_id"]]
+        return DeleteResult({"n": len(documents[:1])}, True)
+
+    async def delete_many(self, filter: Dict[str, Any]) -> DeleteResult:
+        documents = self._matching(filter)
+        for document in documents:
+            del self._documents[document["_id"]]
+        return DeleteResult({"n": len(documents)}, True)
+
+    async def create_index(self, keys, **kwargs) -> str:
+        self.indexes.append((keys, kwargs))
+        return kwargs.get("name", str(keys))
+
+
+class InMemoryDatabase:
+    """
+    Collection namespace matching attribute access on a motor database
+    """
+
+    def __init__(self, name: str = "cookpilot_db"):
+        self.name = name
+        self._collections: Dict[str, InMemoryCollection] = {}
+
+    def __getattr__(self, name: str) -> InMemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> InMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(name)
+        return self._collections[name]
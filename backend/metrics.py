@@ -0,0 +1,320 @@
+import io
+import os
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Fraction of requests profiled automatically; 0 disables sampling
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+
+# Requests sending this value in X-Profile are profiled; unset disables it
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+
+# "cprofile" or "pyinstrument"
+PROFILER = os.getenv("PROFILER", "cprofile")
+
+MAX_PROFILES = 20
+
+LabelValues = Tuple[str, ...]
+
+
+def process_start_time() -> float:
+    """
+    Unix time this process started, from /proc where available, else the
+    time this module was imported. A forked worker reports its fork time.
+    """
+    try:
+        with open("/proc/self/stat") as stat:
+            # Fields after the parenthesized command name; starttime is 22nd
+            start_ticks = int(stat.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as proc_stat:
+            boot_time = next(int(line.split()[1]) for line in proc_stat if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+
+def route_template(scope) -> str:
+    """
+    Route label for a request: the path format of the route it matched, so
+    /api/recipes/42 is reported as /api/recipes/{recipe_id}. The route of an
+    included router may be formatted without the router's prefix, which is
+    then the part of the path in front of what the route itself matched.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    path_format = getattr(route, "path_format", None)
+    path_regex = getattr(route, "path_regex", None)
+    if path_format is None or path_regex is None:
+        return scope["path"]
+    path = scope["path"]
+    start = 0
+    while start != -1:
+        if path_regex.match(path[start:]):
+            return path[:start] + path_format
+        start = path.find("/", start + 1)
+    return path_format
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """
+    Prometheus-style cumulative histogram with fixed buckets
+    """
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets: Iterable[float]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, labels: LabelValues, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            # One counter per bucket, then +Inf, sum and count
+            series = self._series[labels] = [0.0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in self._series.items():
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                bucket_labels = _format_labels(self.labels, labels, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative:g}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {series[-1]:g}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}"]
+
+
+REQUEST_LABELS = ("method", "route", "status")
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request until its last body chunk was sent",
+    REQUEST_LABELS,
+    LATENCY_BUCKETS,
+)
+payload_build_duration = Histogram(
+    "http_payload_build_seconds",
+    "Time from receiving a request until response headers were ready (handler and serialization)",
+    REQUEST_LABELS,
+    LATENCY_BUCKETS,
+)
+response_size = Histogram(
+    "http_response_size_bytes",
+    "Response body size",
+    REQUEST_LABELS,
+    SIZE_BUCKETS,
+)
+loader_batch_size = Histogram(
+    "loader_batch_size",
+    "Keys fetched per batch by coalescing loaders",
+    ("loader",),
+    (1, 2, 5, 10, 20, 50, 100),
+)
+writer_batch_size = Histogram(
+    "writer_batch_size",
+    "Items written per batch by batching writers",
+    ("writer",),
+    (1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+requests_in_flight = Gauge("http_requests_in_flight", "Requests currently being handled")
+notes_stream_subscribers = Gauge("notes_stream_subscribers", "Open live note streams")
+process_start_time_seconds = Gauge("process_start_time_seconds", "Start time of the process since the Unix epoch")
+process_start_time_seconds.value = round(process_start_time(), 3)
+startup_ready_seconds = Gauge(
+    "startup_ready_seconds",
+    "Time from the start of the application lifespan until the search indexes were ready",
+)
+time_to_first_response_seconds = Gauge(
+    "time_to_first_response_seconds",
+    "Time from process start until the first response was sent",
+)
+
+METRICS = (
+    request_duration,
+    payload_build_duration,
+    response_size,
+    loader_batch_size,
+    writer_batch_size,
+    requests_in_flight,
+    notes_stream_subscribers,
+    process_start_time_seconds,
+    startup_ready_seconds,
+    time_to_first_response_seconds,
+)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class ProfileCapture:
+    """
+    Profiles a single request with cProfile or pyinstrument. Only one
+    capture runs at a time because both profilers are process-wide.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, profiler: str = PROFILER):
+        self.profiler = profiler
+        self._profile = None
+
+    def start(self) -> bool:
+        if not self._lock.acquire(blocking=False):
+            return False
+        if self.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+
+            self._profile = Profiler(async_mode="enabled")
+            self._profile.start()
+        else:
+            import cProfile
+
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return True
+
+    def stop(self) -> str:
+        try:
+            if self.profiler == "pyinstrument":
+                self._profile.stop()
+                return self._profile.output_text(unicode=False, color=False)
+            import pstats
+
+            self._profile.disable()
+            output = io.StringIO()
+            pstats.Stats(self._profile, stream=output).sort_stats("cumulative").print_stats(50)
+            return output.getvalue()
+        finally:
+            self._lock.release()
+
+
+# Most recent profiles by ID
+profiles: "OrderedDict[str, str]" = OrderedDict()
+
+
+def _store_profile(profile_id: str, report: str):
+    profiles[profile_id] = report
+    while len(profiles) > MAX_PROFILES:
+        profiles.popitem(last=False)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, payload build time and
+    response size, plus the number of requests in flight.
+
+    Requests are labeled with their route template rather than the raw
+    path, so /api/recipes/{recipe_id} is one series. Requests carrying
+    X-Profile: <PROFILE_TOKEN>, or picked by PROFILE_SAMPLE_RATE, are
+    profiled and get an X-Profile-Id header pointing at the report.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wants_profile(self, scope) -> bool:
+        if PROFILE_TOKEN:
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    return value.decode() == PROFILE_TOKEN
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = {"status": 500, "headers_at": None, "size": 0}
+        capture = None
+        if (PROFILE_TOKEN or PROFILE_SAMPLE_RATE > 0) and self._wants_profile(scope):
+            capture = ProfileCapture()
+            if not capture.start():
+                capture = None
+        profile_id = uuid.uuid4().hex if capture else None
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                state["headers_at"] = time.perf_counter()
+                if profile_id:
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            elif message["type"] == "http.response.body":
+                state["size"] += len(message.get("body", b""))
+            await send(message)
+
+        requests_in_flight.value += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            requests_in_flight.value -= 1
+            end = time.perf_counter()
+            if capture:
+                _store_profile(profile_id, capture.stop())
+            labels = (scope["method"], route_template(scope), str(state["status"]))
+            request_duration.observe(labels, end - start)
+            payload_build_duration.observe(labels, (state["headers_at"] or end) - start)
+            response_size.observe(labels, state["size"])
+            if not time_to_first_response_seconds.value:
+                time_to_first_response_seconds.value = round(time.time() - process_start_time_seconds.value, 3)
+
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics in the text exposition format
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@router.get("/metrics/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    """
+    Report of a profiled request, by the ID from its X-Profile-Id header
+    """
+    report = profiles.get(profile_id)
+    if report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Profile {profile_id} not found",
+        )
+    return PlainTextResponse(report)
@@ -0,0 +1,197 @@
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+# Typed request and response bodies mirroring RECIPES_SCHEMA in schemas.py.
+# Response models document the API; handlers return FastJSONResponse
+# directly, so responses are not validated against them at runtime.
+
+
+class Temperature(BaseModel):
+    value: Optional[int] = None
+    unit: Optional[Literal["C", "F"]] = None
+
+
+class Ingredient(BaseModel):
+    name: str
+    quantity: float
+    unit: str
+    notes: Optional[str] = None
+
+
+class Step(BaseModel):
+    order: int
+    description: str
+    time: Optional[int] = None
+    temperature: Optional[Temperature] = None
+    media: Optional[List[str]] = None
+
+
+class Nutrition(BaseModel):
+    calories: Optional[int] = None
+    protein: Optional[float] = None
+    carbs: Optional[float] = None
+    fat: Optional[float] = None
+    fiber: Optional[float] = None
+    sugar: Optional[float] = None
+
+
+class ScalingFactors(BaseModel):
+    shrinkage: Optional[float] = None
+    waste: Optional[float] = None
+    time_adjustment: Optional[float] = None
+
+
+class RecipeCreate(BaseModel):
+    title: str
+    chef_id: str
+    description: Optional[str] = None
+    ingredients: List[Ingredient]
+    steps: List[Step]
+    tags: Optional[List[str]] = None
+    cuisine: Optional[str] = None
+    prep_time: Optional[int] = None
+    cook_time: Optional[int] = None
+    servings: Optional[int] = None
+    media: Optional[List[str]] = None
+    nutrition: Optional[Nutrition] = None
+    scaling_factors: Optional[ScalingFactors] = None
+
+
+class RecipeUpdate(BaseModel):
+    """
+    Fields to change; fields left out of the request keep their value
+    """
+
+    title: Optional[str] = None
+    chef_id: Optional[str] = None
+    description: Optional[str] = None
+    ingredients: Optional[List[Ingredient]] = None
+    steps: Optional[List[Step]] = None
+    tags: Optional[List[str]] = None
+    cuisine: Optional[str] = None
+    prep_time: Optional[int] = None
+    cook_time: Optional[int] = None
+    servings: Optional[int] = None
+    media: Optional[List[str]] = None
+    nutrition: Optional[Nutrition] = None
+    scaling_factors: Optional[ScalingFactors] = None
+
+
+class Thumbnail(BaseModel):
+    """
+    Smallest variant of a recipe's first image, or only its original URL
+    if it was not processed yet
+    """
+
+    url: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    blurhash: Optional[str] = None
+    avif: Optional[str] = None
+
+
+class Recipe(RecipeUpdate):
+    """
+    A stored recipe. Every field but id is optional because list endpoints
+    leave out large fields and honour the fields parameter.
+    """
+
+    id: str
+    version: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    thumbnail: Optional[Thumbnail] = None
+
+
+class RecipeBatchRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=200)
+    fields: Optional[str] = None
+
+
+class RecipeBatch(BaseModel):
+    """
+    Found recipes in request order, and the requested IDs that were not
+    """
+
+    recipes: List[Recipe]
+    missing: List[str]
+
+
+class SearchResult(BaseModel):
+    id: str
+    title: Optional[str] = None
+    description: Optional[str] = None
+    media: Optional[List[str]] = None
+    tags: Optional[List[str]] = None
+    thumbnail: Optional[Thumbnail] = None
+    score: Optional[float] = None
+
+
+class Suggestion(BaseModel):
+    text: str
+    kind: Literal["title", "tag", "ingredient"]
+    recipes: int
+    recipe_id: Optional[str] = None
+    score: float
+    edits: int = 0
+
+
+class IngredientMatch(BaseModel):
+    id: str
+    title: Optional[str] = None
+    description: Optional[str] = None
+    media: Optional[List[str]] = None
+    thumbnail: Optional[Thumbnail] = None
+    ingredients: List[str]
+    matched: int
+    missing: int
+    coverage: float
+    missing_ingredients: List[str] = Field(default_factory=list)
+
+
+class NoteCreate(BaseModel):
+    content: str = Field(..., min_length=1, max_length=2000)
+
+
+class Note(NoteCreate):
+    id: str
+    recipe_id: str
+    user_id: str
+    created_at: datetime
+
+
+class MediaVariant(BaseModel):
+    url: str
+    format: str
+    width: int
+    height: int
+    bytes: int
+
+
+class MediaImage(BaseModel):
+    url: str
+    digest: str
+    width: int
+    height: int
+    blurhash: str
+    variants: List[MediaVariant]
+    thumbnail: Thumbnail
+
+
+class MediaManifest(BaseModel):
+    """
+    Processed images of a recipe. missing lists media URLs without an
+    upload, errors the uploads that could not be processed.
+    """
+
+    id: str
+    images: List[MediaImage]
+    missing: List[str] = Field(default_factory=list)
+    errors: List[Dict[str, str]] = Field(default_factory=list)
+    updated_at: datetime
+
+
+class TokenRequest(BaseModel):
+    token: str = Field(..., min_length=1)
@@ -0,0 +1,196 @@
+"""
+Notes staff leave on recipes: the hottest write path, read per recipe.
+
+Writes go through a BatchWriter, so notes posted within a few
+milliseconds of each other reach the collection as one unordered
+insert_many. Each note gets its ObjectId before it is queued, which also
+orders notes by creation without comparing timestamps.
+
+Reads are served from a ring buffer of the newest notes per recipe,
+loaded from the collection on first read and kept current by every write
+this process makes or learns of through the change stream, so refreshing
+a recipe's notes does not query the collection. Live streams subscribe to
+a recipe and receive each new note as it is added.
+"""
+import asyncio
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
+
+from bson import ObjectId
+from fastapi import Request
+from pymongo.errors import BulkWriteError, WriteError
+
+import metrics
+from loader import BatchWriter
+from repository import to_api
+
+# Seconds a note waits for others to join its insert_many
+NOTES_WRITE_WINDOW_SECONDS = float(os.getenv("NOTES_WRITE_WINDOW_MS", "5")) / 1000
+
+# Batches are written early once they hold this many notes
+NOTES_WRITE_MAX_BATCH = int(os.getenv("NOTES_WRITE_MAX_BATCH", "500"))
+
+# Newest notes kept per recipe, and so the most a read returns
+NOTES_RECENT_LIMIT = int(os.getenv("NOTES_RECENT_LIMIT", "50"))
+
+# Recipes whose recent notes are kept, least recently read dropped first
+NOTES_CACHED_RECIPES = int(os.getenv("NOTES_CACHED_RECIPES", "10000"))
+
+# Notes a live stream may fall behind by before it is closed
+NOTES_STREAM_BUFFER = int(os.getenv("NOTES_STREAM_BUFFER", "100"))
+
+# IDs of recently published notes remembered, so a note this process
+# wrote is not sent again when its change event comes back
+PUBLISHED_IDS = 10000
+
+
+class NoteService:
+    """
+    Batched note writes, recent notes per recipe and live fan-out.
+
+    Works with a motor collection or any object exposing the same coroutine
+    API, such as memory_store.InMemoryCollection.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self._writer = BatchWriter("notes", self._insert, NOTES_WRITE_WINDOW_SECONDS, NOTES_WRITE_MAX_BATCH)
+        # Newest first, by recipe ID
+        self._recent: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Task] = {}
+        # Notes added while a recipe's buffer was being loaded
+        self._arrived: Dict[str, List[Dict[str, Any]]] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._published: "OrderedDict[str, None]" = OrderedDict()
+
+    async def add(self, recipe_id: str, user_id: str, content: str) -> Dict[str, Any]:
+        """
+        Store a note and publish it. Raises WriteError if it was rejected.
+        """
+        document = {
+            "_id": ObjectId(),
+            "recipe_id": recipe_id,
+            "user_id": user_id,
+            "content": content,
+            "created_at": datetime.now(timezone.utc),
+        }
+        await self._writer.submit(document)
+        note = to_api(document)
+        self.publish(note)
+        return note
+
+    async def _insert(self, documents: List[Dict[str, Any]]) -> Dict[int, Exception]:
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            return {
+                error["index"]: WriteError(error.get("errmsg", "Write failed"), error.get("code"), error)
+                for error in e.details.get("writeErrors", [])
+            }
+        return {}
+
+    async def recent(self, recipe_id: str, limit: int = NOTES_RECENT_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Up to limit of the newest notes on a recipe, newest first
+        """
+        notes = self._recent.get(recipe_id)
+        if notes is not None:
+            self._recent.move_to_end(recipe_id)
+            return notes[:limit]
+        task = self._loading.get(recipe_id)
+        if task is None:
+            # Concurrent first reads of a recipe share one query
+            self._arrived[recipe_id] = []
+            task = self._loading[recipe_id] = asyncio.ensure_future(self._load(recipe_id))
+        notes = await asyncio.shield(task)
+        return notes[:limit]
+
+    async def _load(self, recipe_id: str) -> List[Dict[str, Any]]:
+        try:
+            cursor = self.collection.find({"recipe_id": recipe_id}).sort([("created_at", -1)]).limit(NOTES_RECENT_LIMIT)
+            notes = _merge([to_api(document) for document in await cursor.to_list(None)], self._arrived[recipe_id])
+            self._recent[recipe_id] = notes
+            while len(self._recent) > NOTES_CACHED_RECIPES:
+                self._recent.popitem(last=False)
+            return notes
+        finally:
+            del self._loading[recipe_id]
+            del self._arrived[recipe_id]
+
+    def publish(self, note: Dict[str, Any]):
+        """
+        Add a note stored by this or another instance to its recipe's
+        buffer, if loaded, and send it to the recipe's live streams
+        """
+        if note["id"] in self._published:
+            return
+        self._published[note["id"]] = None
+        if len(self._published) > PUBLISHED_IDS:
+            self._published.popitem(last=False)
+        recipe_id = note["recipe_id"]
+        if recipe_id in self._recent:
+            self._recent[recipe_id] = _merge(self._recent[recipe_id], [note])
+        elif recipe_id in self._arrived:
+            self._arrived[recipe_id].append(note)
+        for queue in list(self._subscribers.get(recipe_id, ())):
+            try:
+                queue.put_nowait(note)
+            except asyncio.QueueFull:
+                # Too slow to keep up: end its stream so the client
+                # reconnects and catches up from the buffer
+                self.unsubscribe(recipe_id, queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    def forget(self, recipe_id: Optional[str] = None):
+        """
+        Drop the buffered notes of one recipe, or of all, to be reloaded on
+        their next read
+        """
+        if recipe_id is None:
+            self._recent.clear()
+        else:
+            self._recent.pop(recipe_id, None)
+
+    def subscribe(self, recipe_id: str) -> asyncio.Queue:
+        """
+        Queue receiving each new note on a recipe, then None if the
+        subscriber fell too far behind
+        """
+        queue: asyncio.Queue = asyncio.Queue(NOTES_STREAM_BUFFER)
+        self._subscribers.setdefault(recipe_id, set()).add(queue)
+        metrics.notes_stream_subscribers.value += 1
+        return queue
+
+    def unsubscribe(self, recipe_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(recipe_id)
+        if subscribers is None or queue not in subscribers:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[recipe_id]
+        metrics.notes_stream_subscribers.value -= 1
+
+    async def close(self):
+        await self._writer.drain()
+
+
+def _merge(notes: List[Dict[str, Any]], added: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Newest NOTES_RECENT_LIMIT of notes and added, with added replacing
+    notes of the same ID
+    """
+    by_id = {note["id"]: note for note in notes}
+    by_id.update((note["id"], note) for note in added)
+    # ObjectId hex strings sort in creation order
+    return sorted(by_id.values(), key=lambda note: note["id"], reverse=True)[:NOTES_RECENT_LIMIT]
+
+
+def get_note_service(request: Request) -> NoteService:
+    """
+    FastAPI dependency returning the note service created at startup
+    """
+    return request.app.state.notes
@@ -0,0 +1,304 @@
+import base64
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import Request
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from history import RecipeHistory
+from loader import BatchLoader
+
+logger = logging.getLogger(__name__)
+
+# Heavy fields left out of list views
+LIST_PROJECTION = {"steps": 0, "nutrition": 0}
+
+# Fields the in-process search indexes are built from
+INDEX_PROJECTION = {
+    "title": 1,
+    "description": 1,
+    "tags": 1,
+    "media": 1,
+    "ingredients.name": 1,
+    "cuisine": 1,
+    "prep_time": 1,
+    "cook_time": 1,
+    "servings": 1,
+    "nutrition": 1,
+}
+
+# Fields needed to scale a recipe
+SCALING_PROJECTION = {
+    "title": 1,
+    "servings": 1,
+    "prep_time": 1,
+    "cook_time": 1,
+    "ingredients": 1,
+    "scaling_factors": 1,
+}
+
+# Top-level recipe fields that can be requested through fields=
+RECIPE_FIELDS = (
+    "title", "chef_id", "description", "ingredients", "steps", "tags",
+    "cuisine", "prep_time", "cook_time", "servings", "media", "nutrition",
+    "scaling_factors", "version", "created_at", "updated_at",
+)
+
+# Keyset pagination order; _id breaks ties between equal timestamps
+PAGE_SORT = [("created_at", 1), ("_id", 1)]
+
+FIELD_RE = re.compile(r"^([a-z_]+)(?:\[(\d+)\])?$")
+
+# Fields clients may not set directly
+PROTECTED_FIELDS = ("id", "_id", "created_at", "updated_at", "version")
+
+
+class VersionConflict(Exception):
+    """
+    An update expected a version the recipe has already moved past
+    """
+
+    def __init__(self, recipe_id: str, version: int):
+        super().__init__(f"Recipe {recipe_id} is at version {version}")
+        self.version = version
+
+
+def recipe_key(recipe_id: str) -> Any:
+    """
+    Convert an API recipe ID into the stored _id value
+    """
+    return ObjectId(recipe_id) if ObjectId.is_valid(recipe_id) else recipe_id
+
+
+def parse_fields(fields: str) -> Dict[str, Any]:
+    """
+    Turn a fields= value such as "id,title,media[0],tags" into a projection.
+    An index selects a single array element. Raises ValueError for unknown
+    fields.
+    """
+    projection: Dict[str, Any] = {}
+    for field in filter(None, (part.strip() for part in fields.split(","))):
+        match = FIELD_RE.match(field)
+        if match is None or (match.group(1) not in RECIPE_FIELDS and match.group(1) != "id"):
+            raise ValueError(f"Unknown field: {field}")
+        name, index = match.groups()
+        if name == "id":
+            continue
+        projection[name] = {"$slice": [int(index), 1]} if index is not None else 1
+    if not projection:
+        projection["_id"] = 1
+    return projection
+
+
+def encode_cursor(document: Dict[str, Any]) -> str:
+    created_at = document.get("created_at")
+    key = document["_id"]
+    payload = {
+        "c": created_at.isoformat() if created_at else None,
+        "i": str(key),
+        "o": isinstance(key, ObjectId),
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], Any]:
+    """
+    Return the (created_at, _id) position encoded in a page cursor.
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        created_at = datetime.fromisoformat(payload["c"]) if payload["c"] else None
+        key = ObjectId(payload["i"]) if payload["o"] else payload["i"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return created_at, key
+
+
+def to_api(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Replace the stored _id with a string id field
+    """
+    result = {"id": str(document["_id"])}
+    result.update((key, value) for key, value in document.items() if key != "_id")
+    return result
+
+
+class RecipeRepository:
+    """
+    Async data access for the recipes collection.
+
+    Works with a motor collection or any object exposing the same coroutine
+    API, such as memory_store.InMemoryCollection.
+    """
+
+    def __init__(self, collection, versions=None):
+        self.collection = collection
+        # Version history, kept when a recipe_versions collection is given
+        self.history = RecipeHistory(versions) if versions is not None else None
+        self._loader = BatchLoader("recipes", self.get_many)
+
+    async def list_recipes(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Return one page of recipes and the cursor for the next page.
+
+        Pages are keyed on (created_at, _id) rather than skipped over, so
+        fetching a deep page costs the same as fetching the first one.
+        """
+        query: Dict[str, Any] = {}
+        if cursor:
+            created_at, key = decode_cursor(cursor)
+            query = {"$or": [
+                {"created_at": {"$gt": created_at}},
+                {"created_at": created_at, "_id": {"$gt": key}},
+            ]}
+
+        # The cursor needs created_at even when the caller did not ask for it
+        projection = dict(projection or LIST_PROJECTION)
+        strip_created_at = False
+        if "created_at" not in projection and any(value != 0 for value in projection.values()):
+            projection["created_at"] = 1
+            strip_created_at = True
+
+        documents = await self.collection.find(query, projection).sort(PAGE_SORT).limit(limit + 1).to_list(None)
+        next_cursor = encode_cursor(documents[limit - 1]) if len(documents) > limit else None
+        items = []
+        for document in documents[:limit]:
+            item = to_api(document)
+            if strip_created_at:
+                item.pop("created_at", None)
+            items.append(item)
+        return items, next_cursor
+
+    async def iter_recipes(
+        self,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream every recipe through a server-side cursor
+        """
+        async for document in self.collection.find({}, projection).batch_size(batch_size):
+            yield to_api(document)
+
+    async def get_recipe(self, recipe_id: str, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        document = await self.collection.find_one({"_id": recipe_key(recipe_id)}, projection)
+        return to_api(document) if document is not None else None
+
+    async def load_recipe(self, recipe_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a whole recipe like get_recipe, batched with concurrent
+        load_recipe calls into one get_many query
+        """
+        return await self._loader.load(recipe_id)
+
+    async def get_many(self, recipe_ids: List[str], projection: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch several recipes with a single $in query, keyed by the IDs as
+        requested, so "65F0..." finds the recipe stored as ObjectId("65f0...")
+        """
+        keys = {recipe_id: recipe_key(recipe_id) for recipe_id in recipe_ids}
+        cursor = self.collection.find({"_id": {"$in": list(set(keys.values()))}}, projection)
+        found = {str(document["_id"]): to_api(document) for document in await cursor.to_list(None)}
+        return {recipe_id: found[str(key)] for recipe_id, key in keys.items() if str(key) in found}
+
+    async def create_recipe(self, recipe: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc)
+        document = {key: value for key, value in recipe.items() if key not in PROTECTED_FIELDS}
+        document.update(created_at=now, updated_at=now, version=1)
+        await self.collection.insert_one(document)
+        return to_api(document)
+
+    async def insert_many(self, documents: List[Dict[str, Any]]) -> List[Tuple[int, str]]:
+        """
+        Insert prepared documents with an unordered bulk write. Returns the
+        (index, message) pairs of the documents that were rejected.
+        """
+        if not documents:
+            return []
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            return [
+                (error["index"], error.get("errmsg", "Write failed"))
+                for error in e.details.get("writeErrors", [])
+            ]
+        return []
+
+    async def update_recipe(
+        self,
+        recipe_id: str,
+        recipe: Dict[str, Any],
+        expected_version: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Apply the given fields and bump the version. Returns the updated
+        recipe, or None if it does not exist.
+
+        With expected_version the update only applies if the recipe is
+        still at that version, checked by the same atomic write, and
+        raises VersionConflict otherwise. Editors never read, merge and
+        retry; the one that loses is told which version it missed.
+        """
+        changes = {key: value for key, value in recipe.items() if key not in PROTECTED_FIELDS}
+        changes["updated_at"] = datetime.now(timezone.utc)
+        query: Dict[str, Any] = {"_id": recipe_key(recipe_id)}
+        if expected_version is not None:
+            query["version"] = expected_version
+        # The previous version comes back with the write, for the history
+        previous = await self.collection.find_one_and_update(
+            query,
+            {"$set": changes, "$inc": {"version": 1}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if previous is None:
+            if expected_version is not None:
+                current = await self.collection.find_one({"_id": recipe_key(recipe_id)}, {"version": 1})
+                if current is not None:
+                    raise VersionConflict(recipe_id, current["version"])
+            return None
+        updated = {**previous, **changes, "version": previous["version"] + 1}
+        if self.history is not None:
+            try:
+                await self.history.record(to_api(previous), to_api(updated))
+            except Exception:
+                # The edit itself succeeded; this leaves a gap that older
+                # versions cannot be rebuilt across
+                logger.exception("Recording version %s of recipe %s failed", previous["version"], recipe_id)
+        return to_api(updated)
+
+    async def get_version(self, recipe_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """
+        The recipe as it was at the given version, or None if it does not
+        exist or that version is not in its history
+        """
+        current = await self.get_recipe(recipe_id)
+        if current is None:
+            return None
+        if self.history is None:
+            return current if current["version"] == version else None
+        return await self.history.rebuild(current, version)
+
+    async def delete_recipe(self, recipe_id: str) -> bool:
+        result = await self.collection.delete_one({"_id": recipe_key(recipe_id)})
+        if result.deleted_count and self.history is not None:
+            await self.history.delete(recipe_id)
+        return result.deleted_count > 0
+
+
+def get_recipe_repository(request: Request) -> RecipeRepository:
+    """
+    FastAPI dependency returning the repository created at startup
+    """
+    return request.app.state.recipes
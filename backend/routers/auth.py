@@ -1,23 +1,42 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from firebase_admin import auth as firebase_auth
 from typing import Dict, Any
 
+from auth_tokens import TokenError, token_verifier
+from models import TokenRequest
+
 router = APIRouter()
 
 @router.post("/login")
-async def login(credentials: Dict[str, Any]):
+async def login(credentials: TokenRequest):
     """
-    Login endpoint that verifies Firebase credentials
+    Login endpoint that verifies a Firebase ID token locally
     """
     try:
-        # This would typically verify the Firebase token
-        # For now, just return a success message
-        return {"message": "Login successful"}
-    except Exception as e:
+        claims = await token_verifier.verify(credentials.token)
+    except TokenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=f"Authentication failed: {str(e)}",
+        )
+    return {
+        "message": "Login successful",
+        "uid": claims["sub"],
+        "email": claims.get("email"),
+    }
+
+@router.post("/verify-token")
+async def verify_token(credentials: TokenRequest):
+    """
+    Verify a Firebase ID token and return its claims
+    """
+    try:
+        claims = await token_verifier.verify(credentials.token)
+    except TokenError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Authentication failed: {str(e)}",
         )
+    return {"uid": claims["sub"], "claims": claims}
 
 @router.post("/register")
 async def register(user_data: Dict[str, Any]):
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.staticfiles import StaticFiles
+
+from auth_tokens import get_current_user
+from media import MediaCatalog, get_media_catalog
+from models import MediaManifest
+from repository import RecipeRepository, get_recipe_repository, to_api
+from serialization import FastJSONResponse
+
+# Variant files are named after their content, so they never change
+VARIANT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+router = APIRouter()
+
+@router.get("/recipes/{recipe_id}", response_model=MediaManifest)
+async def get_manifest(recipe_id: str, media: MediaCatalog = Depends(get_media_catalog)):
+    """
+    Get the processed images of a recipe, with every variant for srcset
+    """
+    manifest = await media.manifest(recipe_id)
+    if manifest is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No media manifest for recipe {recipe_id}",
+        )
+    return FastJSONResponse(to_api(manifest))
+
+@router.post("/recipes/{recipe_id}", response_model=MediaManifest, dependencies=[Depends(get_current_user)])
+async def ingest_media(
+    recipe_id: str,
+    repository: RecipeRepository = Depends(get_recipe_repository),
+    media: MediaCatalog = Depends(get_media_catalog),
+):
+    """
+    Generate resized variants and placeholders for the uploaded images of
+    a recipe and its steps, and replace its manifest
+    """
+    recipe = await repository.get_recipe(recipe_id, {"media": 1, "steps.media": 1})
+    if recipe is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Recipe {recipe_id} not found",
+        )
+    return FastJSONResponse(to_api(await media.ingest(recipe)))
+
+
+class VariantFiles(StaticFiles):
+    """
+    Serves variant files with long-lived caching
+    """
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            response.headers["Cache-Control"] = VARIANT_CACHE_CONTROL
+        return response
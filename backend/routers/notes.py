@@ -0,0 +1,93 @@
+import asyncio
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from pymongo.errors import WriteError
+from typing import Any, Dict, List
+
+from auth_tokens import get_current_user
+from models import Note, NoteCreate
+from notes import NOTES_RECENT_LIMIT, NoteService, get_note_service
+from serialization import FastJSONResponse, dumps
+
+# Seconds between comments sent on an idle stream, so proxies keep it open
+KEEPALIVE_SECONDS = float(os.getenv("NOTES_STREAM_KEEPALIVE_SECONDS", "15"))
+
+# Milliseconds a disconnected client waits before reconnecting
+RECONNECT_MS = 2000
+
+router = APIRouter()
+
+@router.get("/{recipe_id}/notes", response_model=List[Note])
+async def get_notes(
+    recipe_id: str,
+    limit: int = Query(20, ge=1, le=NOTES_RECENT_LIMIT),
+    notes: NoteService = Depends(get_note_service),
+):
+    """
+    Get the newest notes on a recipe, newest first
+    """
+    return FastJSONResponse(await notes.recent(recipe_id, limit))
+
+@router.post("/{recipe_id}/notes", status_code=status.HTTP_201_CREATED, response_model=Note)
+async def create_note(
+    recipe_id: str,
+    note: NoteCreate,
+    notes: NoteService = Depends(get_note_service),
+    user: Dict[str, Any] = Depends(get_current_user),
+):
+    """
+    Add a note to a recipe as the signed-in user
+    """
+    try:
+        created = await notes.add(recipe_id, user["sub"], note.content)
+    except WriteError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid note: {str(e)}",
+        )
+    return FastJSONResponse(created, status_code=status.HTTP_201_CREATED)
+
+def _event(note) -> bytes:
+    return b"id: " + note["id"].encode() + b"\nevent: note\ndata: " + dumps(note) + b"\n\n"
+
+@router.get("/{recipe_id}/notes/stream")
+async def stream_notes(recipe_id: str, request: Request, notes: NoteService = Depends(get_note_service)):
+    """
+    Server-sent events with each note added to a recipe from now on.
+
+    A client reconnecting with Last-Event-ID first receives the notes it
+    missed, as far back as the recent notes go.
+    """
+    last_event_id = request.headers.get("last-event-id")
+
+    async def events():
+        # Subscribe before catching up, so no note falls in between
+        queue = notes.subscribe(recipe_id)
+        try:
+            yield f"retry: {RECONNECT_MS}\n\n".encode()
+            replayed = set()
+            if last_event_id:
+                for note in reversed(await notes.recent(recipe_id)):
+                    if note["id"] > last_event_id:
+                        replayed.add(note["id"])
+                        yield _event(note)
+            while True:
+                try:
+                    note = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                if note is None:
+                    return
+                if note["id"] not in replayed:
+                    yield _event(note)
+        finally:
+            notes.unsubscribe(recipe_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
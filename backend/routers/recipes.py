@@ -1,108 +1,220 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict, Any, List
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pymongo.errors import WriteError
+from typing import Dict, Any, List, Optional
+
+from auth_tokens import get_current_user
+from bulk import export_ndjson, import_ndjson
+from cache import cached_response, response_cache
+from derived_state import index_recipe, unindex_recipe
+from media import MediaCatalog, get_media_catalog
+from models import Recipe, RecipeBatch, RecipeBatchRequest, RecipeCreate, RecipeUpdate
+from repository import RecipeRepository, VersionConflict, get_recipe_repository, parse_fields
+from serialization import FastJSONResponse, dumps
 
 router = APIRouter()
 
-@router.get("/")
-async def get_recipes():
-    """
-    Get all recipes
-    """
-    # This would typically fetch recipes from a database
-    # For now, return sample recipes
-    sample_recipes = [
-        {
-            "id": "1",
-            "title": "Spaghetti Carbonara",
-            "description": "A classic Italian pasta dish with eggs, cheese, pancetta, and black pepper.",
-            "media": ["https://images.unsplash.com/photo-1612874742237-6526221588e3"],
-            "prep_time": 10,
-            "cook_time": 15,
-            "servings": 4,
-            "tags": ["pasta", "italian", "dinner"]
-        },
-        {
-            "id": "2",
-            "title": "Chicken Tikka Masala",
-            "description": "Grilled chicken chunks in a creamy sauce with Indian spices.",
-            "media": ["https://images.unsplash.com/photo-1565557623262-b51c2513a641"],
-            "prep_time": 20,
-            "cook_time": 30,
-            "servings": 4,
-            "tags": ["chicken", "indian", "curry", "dinner"]
-        },
-        {
-            "id": "3",
-            "title": "Avocado Toast",
-            "description": "Simple and delicious breakfast with mashed avocado on toasted bread.",
-            "media": ["https://images.unsplash.com/photo-1588137378633-dea1336ce1e2"],
-            "prep_time": 5,
-            "cook_time": 5,
-            "servings": 1,
-            "tags": ["breakfast", "vegetarian", "quick"]
-        }
-    ]
-    return sample_recipes
-
-@router.get("/{recipe_id}")
-async def get_recipe(recipe_id: str):
-    """
-    Get a specific recipe by ID
-    """
-    # This would typically fetch a recipe from a database
-    # For now, return a sample recipe
-    sample_recipe = {
-        "id": recipe_id,
-        "title": "Spaghetti Carbonara",
-        "description": "A classic Italian pasta dish with eggs, cheese, pancetta, and black pepper.",
-        "media": ["https://images.unsplash.com/photo-1612874742237-6526221588e3"],
-        "prep_time": 10,
-        "cook_time": 15,
-        "servings": 4,
-        "ingredients": [
-            {"name": "Spaghetti", "amount": "400g"},
-            {"name": "Pancetta", "amount": "150g"},
-            {"name": "Eggs", "amount": "3"},
-            {"name": "Parmesan cheese", "amount": "50g"},
-            {"name": "Black pepper", "amount": "to taste"},
-            {"name": "Salt", "amount": "to taste"}
-        ],
-        "instructions": [
-            "Bring a large pot of salted water to boil and cook spaghetti according to package instructions.",
-            "While pasta is cooking, fry pancetta in a large pan until crispy.",
-            "In a bowl, whisk eggs and grated parmesan cheese.",
-            "Drain pasta, reserving some cooking water.",
-            "Add pasta to the pan with pancetta, remove from heat.",
-            "Quickly stir in egg mixture, adding some reserved cooking water if needed to create a creamy sauce.",
-            "Season with black pepper and serve immediately."
-        ],
-        "tags": ["pasta", "italian", "dinner"]
-    }
-    return sample_recipe
-
-@router.post("/")
-async def create_recipe(recipe: Dict[str, Any]):
+@router.get("/", response_model=List[Recipe])
+async def get_recipes(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    repository: RecipeRepository = Depends(get_recipe_repository),
+    media: MediaCatalog = Depends(get_media_catalog),
+):
+    """
+    Get a page of recipes, oldest first.
+
+    Pass the X-Next-Cursor header of a response as cursor to fetch the next
+    page. fields limits each recipe to the listed fields, e.g.
+    fields=id,title,media[0],tags. Without fields, media is replaced by
+    the thumbnail of the first image.
+    """
+    try:
+        projection = parse_fields(fields) if fields else None
+        recipes, next_cursor = await repository.list_recipes(limit=limit, cursor=cursor, projection=projection)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    if not fields:
+        recipes = await media.with_thumbnails(recipes)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return FastJSONResponse(recipes, headers=headers)
+
+@router.get("/export")
+async def export_recipes(repository: RecipeRepository = Depends(get_recipe_repository)):
+    """
+    Stream every recipe as newline-delimited JSON
+    """
+    return StreamingResponse(
+        export_ndjson(repository.iter_recipes()),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=recipes.ndjson"},
+    )
+
+@router.post("/import", dependencies=[Depends(get_current_user)])
+async def import_recipes(request: Request, repository: RecipeRepository = Depends(get_recipe_repository)):
+    """
+    Import recipes from a newline-delimited JSON request body.
+
+    Records are validated against the recipes schema and inserted in
+    unordered batches. Invalid or rejected records are reported by line
+    number without stopping the import.
+    """
+    def on_inserted(recipe: Dict[str, Any]):
+        index_recipe(recipe["id"], recipe)
+        response_cache.recipe_created(recipe["id"])
+
+    report = await import_ndjson(request.stream(), repository, on_inserted)
+    return report.as_dict()
+
+@router.post("/batch", response_model=RecipeBatch)
+async def get_recipes_batch(request: RecipeBatchRequest, repository: RecipeRepository = Depends(get_recipe_repository)):
+    """
+    Get several recipes in one request, in the order of ids. IDs that do
+    not exist are listed under missing. fields limits each recipe to the
+    listed fields, as for GET /api/recipes.
+    """
+    ids = list(dict.fromkeys(request.ids))
+    if request.fields:
+        try:
+            projection = parse_fields(request.fields)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e),
+            )
+        found = await repository.get_many(ids, projection)
+        return FastJSONResponse({
+            "recipes": [found[recipe_id] for recipe_id in ids if recipe_id in found],
+            "missing": [recipe_id for recipe_id in ids if recipe_id not in found],
+        })
+
+    # Whole recipes come from the response cache where possible, and the
+    # cached bodies are spliced into the response without decoding them
+    entries = await asyncio.gather(*(response_cache.get_recipe(recipe_id) for recipe_id in ids))
+    bodies = {recipe_id: entry.body for recipe_id, entry in zip(ids, entries) if entry is not None}
+    misses = [recipe_id for recipe_id in ids if recipe_id not in bodies]
+    if misses:
+        for recipe_id, recipe in (await repository.get_many(misses)).items():
+            # Cached under the stored ID, which writes invalidate
+            bodies[recipe_id] = (await response_cache.put_recipe(recipe["id"], recipe)).body
+    body = b"".join([
+        b'{"recipes":[',
+        b",".join(bodies[recipe_id] for recipe_id in ids if recipe_id in bodies),
+        b'],"missing":',
+        dumps([recipe_id for recipe_id in ids if recipe_id not in bodies]),
+        b"}",
+    ])
+    return Response(content=body, media_type="application/json")
+
+@router.get("/{recipe_id}", response_model=Recipe)
+async def get_recipe(recipe_id: str, request: Request, repository: RecipeRepository = Depends(get_recipe_repository)):
+    """
+    Get a specific recipe by ID.
+
+    Responses carry an ETag; send it back in If-None-Match to get a 304
+    without a body when the recipe has not changed.
+    """
+    entry = await response_cache.get_recipe(recipe_id)
+    if entry is None:
+        recipe = await repository.load_recipe(recipe_id)
+        if recipe is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Recipe {recipe_id} not found",
+            )
+        entry = await response_cache.put_recipe(recipe["id"], recipe)
+    return cached_response(entry, request)
+
+@router.get("/{recipe_id}/versions/{version}", response_model=Recipe)
+async def get_recipe_version(
+    recipe_id: str,
+    version: int = Path(..., ge=1),
+    repository: RecipeRepository = Depends(get_recipe_repository),
+):
+    """
+    Get a recipe as it was at an earlier version
+    """
+    recipe = await repository.get_version(recipe_id, version)
+    if recipe is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Version {version} of recipe {recipe_id} not found",
+        )
+    return FastJSONResponse(recipe)
+
+@router.post("/", dependencies=[Depends(get_current_user)])
+async def create_recipe(recipe: RecipeCreate, repository: RecipeRepository = Depends(get_recipe_repository)):
     """
     Create a new recipe
     """
-    # This would typically save a recipe to a database
-    # For now, just return a success message
-    return {"message": "Recipe created successfully", "id": "new-recipe-id"}
+    try:
+        created = await repository.create_recipe(recipe.model_dump(exclude_none=True))
+    except WriteError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid recipe: {str(e)}",
+        )
+    index_recipe(created["id"], created)
+    response_cache.recipe_created(created["id"])
+    return {"message": "Recipe created successfully", "id": created["id"]}
 
-@router.put("/{recipe_id}")
-async def update_recipe(recipe_id: str, recipe: Dict[str, Any]):
+@router.put("/{recipe_id}", dependencies=[Depends(get_current_user)])
+async def update_recipe(
+    recipe_id: str,
+    recipe: RecipeUpdate,
+    base_version: Optional[int] = Query(None, ge=1),
+    repository: RecipeRepository = Depends(get_recipe_repository),
+):
     """
-    Update an existing recipe
+    Update an existing recipe. Only the fields present in the request are
+    changed.
+
+    Pass the version the edit was made against as base_version to have it
+    rejected with a 409 if someone else saved the recipe in the meantime.
     """
-    # This would typically update a recipe in a database
-    # For now, just return a success message
-    return {"message": f"Recipe {recipe_id} updated successfully"}
+    changes = recipe.model_dump(exclude_unset=True)
+    if not changes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No fields to update",
+        )
+    try:
+        updated = await repository.update_recipe(recipe_id, changes, expected_version=base_version)
+    except WriteError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid recipe: {str(e)}",
+        )
+    except VersionConflict as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"{e}, not {base_version}",
+        )
+    if updated is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Recipe {recipe_id} not found",
+        )
+    index_recipe(recipe_id, updated)
+    await response_cache.invalidate_recipe(recipe_id, updated["version"])
+    return {"message": f"Recipe {recipe_id} updated successfully", "version": updated["version"]}
 
-@router.delete("/{recipe_id}")
-async def delete_recipe(recipe_id: str):
+@router.delete("/{recipe_id}", dependencies=[Depends(get_current_user)])
+async def delete_recipe(recipe_id: str, repository: RecipeRepository = Depends(get_recipe_repository)):
     """
     Delete a recipe
     """
-    # This would typically delete a recipe from a database
-    # For now, just return a success message
+    if not await repository.delete_recipe(recipe_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Recipe {recipe_id} not found",
+        )
+    unindex_recipe(recipe_id)
+    await response_cache.invalidate_recipe(recipe_id)
     return {"message": f"Recipe {recipe_id} deleted successfully"}
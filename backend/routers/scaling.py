@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field, PositiveFloat
+from typing import Dict, Any, List
+
+from repository import SCALING_PROJECTION, RecipeRepository, get_recipe_repository
+from scaling import ScaledBatch
+from serialization import FastJSONResponse
+
+router = APIRouter()
+
+class ScaleRequest(BaseModel):
+    yields: List[PositiveFloat] = Field(..., min_length=1, max_length=100)
+
+class BatchItem(BaseModel):
+    recipe_id: str
+    servings: PositiveFloat
+
+class BatchScaleRequest(BaseModel):
+    items: List[BatchItem] = Field(..., min_length=1, max_length=1000)
+
+@router.post("/batch")
+async def scale_batch(request: BatchScaleRequest, repository: RecipeRepository = Depends(get_recipe_repository)):
+    """
+    Scale a menu of recipes to their target servings and return the scaled
+    recipes with a shopping list consolidated across all of them
+    """
+    recipes = await repository.get_many([item.recipe_id for item in request.items], SCALING_PROJECTION)
+    missing = sorted({item.recipe_id for item in request.items if item.recipe_id not in recipes})
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Recipes not found: {', '.join(missing)}",
+        )
+
+    batch = ScaledBatch(
+        [recipes[item.recipe_id] for item in request.items],
+        [[item.servings] for item in request.items],
+    )
+    items = []
+    for index, item in enumerate(request.items):
+        items.append({
+            "recipe_id": item.recipe_id,
+            "title": recipes[item.recipe_id].get("title"),
+            **batch.recipe_yields(index)[0],
+        })
+    return FastJSONResponse({"items": items, "shopping_list": batch.shopping_list()})
+
+@router.post("/{recipe_id}")
+async def scale_recipe(recipe_id: str, request: ScaleRequest, repository: RecipeRepository = Depends(get_recipe_repository)):
+    """
+    Scale a recipe to each of the requested yields, in servings
+    """
+    recipe = await repository.get_recipe(recipe_id, SCALING_PROJECTION)
+    if recipe is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Recipe {recipe_id} not found",
+        )
+
+    batch = ScaledBatch([recipe], [request.yields])
+    return FastJSONResponse({
+        "recipe_id": recipe_id,
+        "title": recipe.get("title"),
+        "base_servings": recipe.get("servings"),
+        "yields": batch.recipe_yields(0),
+    })
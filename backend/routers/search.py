@@ -1,92 +1,139 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import Dict, Any, List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from typing import Dict, Any, List, Optional
+
+from attribute_store import attribute_store, parse_filters
+from cache import cached_response, response_cache
+from ingredient_index import ingredient_index, normalize_ingredient
+from media import MediaCatalog, get_media_catalog
+from models import IngredientMatch, SearchResult, Suggestion
+from search_index import recipe_index, tokenize
+from suggest_index import TOP_K, suggest_index
 
 router = APIRouter()
 
-@router.get("/")
-async def search_recipes(query: str = ""):
+@router.get("/", response_model=List[SearchResult])
+async def search_recipes(
+    request: Request,
+    query: str = "",
+    limit: int = Query(20, ge=1, le=100),
+    prefix: bool = True,
+    fuzzy: bool = True,
+    filters: str = "",
+    media: MediaCatalog = Depends(get_media_catalog),
+):
     """
-    Search for recipes based on a query string
+    Search for recipes based on a query string, ranked by relevance.
+
+    filters restricts results by numeric attributes and cuisine, e.g.
+    filters=calories<500,protein>30,cuisine=italian,total_time<30
+    Filters work with or without a query. With fuzzy, misspelled words
+    also match terms within a few edits, so "carbonra" finds carbonara.
     """
-    # This would typically search recipes in a database
-    # For now, return sample search results
-    sample_results = [
-        {
-            "id": "1",
-            "title": "Spaghetti Carbonara",
-            "description": "A classic Italian pasta dish with eggs, cheese, pancetta, and black pepper.",
-            "media": ["https://images.unsplash.com/photo-1612874742237-6526221588e3"],
-            "tags": ["pasta", "italian", "dinner"]
-        },
-        {
-            "id": "2",
-            "title": "Chicken Tikka Masala",
-            "description": "Grilled chicken chunks in a creamy sauce with Indian spices.",
-            "media": ["https://images.unsplash.com/photo-1565557623262-b51c2513a641"],
-            "tags": ["chicken", "indian", "curry", "dinner"]
-        },
-        {
-            "id": "3",
-            "title": "Avocado Toast",
-            "description": "Simple and delicious breakfast with mashed avocado on toasted bread.",
-            "media": ["https://images.unsplash.com/photo-1588137378633-dea1336ce1e2"],
-            "tags": ["breakfast", "vegetarian", "quick"]
-        }
-    ]
-    
-    # Filter results based on query if provided
-    if query:
-        filtered_results = [
-            recipe for recipe in sample_results 
-            if query.lower() in recipe["title"].lower() or 
-               query.lower() in recipe["description"].lower() or
-               any(query.lower() in tag.lower() for tag in recipe["tags"])
-        ]
-        return filtered_results
-    
-    return sample_results
+    try:
+        ranges, categories = parse_filters(filters)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+    key = f"text:{' '.join(tokenize(query))}:{limit}:{prefix}:{fuzzy}:{filters.replace(' ', '').lower()}"
+    entry = response_cache.get_search(key)
+    if entry is None:
+        generation = response_cache.generation
+        results = await media.with_thumbnails(_search_results(query, limit, prefix, fuzzy, ranges, categories))
+        entry = response_cache.put_search(key, results, generation)
+    return cached_response(entry, request)
 
-@router.get("/ingredients")
-async def search_by_ingredients(ingredients: str = ""):
+def _search_results(query: str, limit: int, prefix: bool, fuzzy: bool, ranges, categories) -> List[Dict[str, Any]]:
+    allowed = None
+    if ranges or categories:
+        rows = attribute_store.query(ranges, categories)
+        if not query.strip():
+            return [recipe_index.document(recipe_id) for recipe_id in attribute_store.recipe_ids(rows, limit)]
+        allowed = attribute_store.row_set(rows)
+    elif not query.strip():
+        return recipe_index.documents(limit)
+
+    results = []
+    for recipe_id, score in recipe_index.search(query, limit=limit, prefix=prefix, allowed=allowed, fuzzy=fuzzy):
+        result = dict(recipe_index.document(recipe_id))
+        result["score"] = round(score, 4)
+        results.append(result)
+    return results
+
+@router.get("/suggest", response_model=List[Suggestion])
+async def suggest(
+    request: Request,
+    q: str = "",
+    limit: int = Query(10, ge=1, le=TOP_K),
+    fuzzy: bool = True,
+):
     """
-    Search for recipes based on ingredients
+    Type-ahead suggestions for partially typed text: recipe titles, tags
+    and ingredient names, ranked by how many recipes use them and how well
+    they match. With fuzzy, a misspelled last word ("tika") is corrected.
+    """
+    key = f"suggest:{' '.join(tokenize(q))}:{limit}:{fuzzy}"
+    entry = response_cache.get_search(key)
+    if entry is None:
+        generation = response_cache.generation
+        results = suggest_index.suggest(q, limit=limit, fuzzy=fuzzy)
+        entry = response_cache.put_search(key, results, generation)
+    return cached_response(entry, request)
+
+@router.get("/ingredients", response_model=List[IngredientMatch])
+async def search_by_ingredients(
+    request: Request,
+    ingredients: str = "",
+    match: str = Query("any", pattern="^(any|all)$"),
+    max_missing: Optional[int] = Query(None, ge=0),
+    min_coverage: float = Query(0.0, ge=0.0, le=1.0),
+    limit: int = Query(20, ge=1, le=100),
+    media: MediaCatalog = Depends(get_media_catalog),
+):
+    """
+    Search for recipes based on ingredients, ranked by pantry coverage.
+
+    match=any returns recipes using any of the ingredients, match=all only
+    those using all of them. max_missing limits how many other ingredients
+    a recipe may need and min_coverage sets the minimum fraction of its
+    ingredients that must be covered.
     """
-    # This would typically search recipes by ingredients in a database
-    # For now, return sample search results
     ingredient_list = ingredients.split(",") if ingredients else []
-    
-    sample_results = [
-        {
-            "id": "1",
-            "title": "Spaghetti Carbonara",
-            "description": "A classic Italian pasta dish with eggs, cheese, pancetta, and black pepper.",
-            "ingredients": ["pasta", "eggs", "cheese", "pancetta", "black pepper"],
-            "media": ["https://images.unsplash.com/photo-1612874742237-6526221588e3"]
-        },
-        {
-            "id": "2",
-            "title": "Chicken Tikka Masala",
-            "description": "Grilled chicken chunks in a creamy sauce with Indian spices.",
-            "ingredients": ["chicken", "yogurt", "tomatoes", "cream", "spices"],
-            "media": ["https://images.unsplash.com/photo-1565557623262-b51c2513a641"]
-        },
-        {
-            "id": "3",
-            "title": "Avocado Toast",
-            "description": "Simple and delicious breakfast with mashed avocado on toasted bread.",
-            "ingredients": ["avocado", "bread", "lemon juice", "salt", "pepper"],
-            "media": ["https://images.unsplash.com/photo-1588137378633-dea1336ce1e2"]
-        }
-    ]
-    
-    # Filter results based on ingredients if provided
-    if ingredient_list:
-        filtered_results = []
-        for recipe in sample_results:
-            if any(ingredient.lower() in recipe_ingredient.lower() 
-                  for ingredient in ingredient_list 
-                  for recipe_ingredient in recipe["ingredients"]):
-                filtered_results.append(recipe)
-        return filtered_results
-    
-    return sample_results
+    normalized = ",".join(sorted(normalize_ingredient(item) for item in ingredient_list))
+    key = f"ingredients:{normalized}:{match}:{max_missing}:{min_coverage}:{limit}"
+    entry = response_cache.get_search(key)
+    if entry is None:
+        generation = response_cache.generation
+        results = await media.with_thumbnails(_ingredient_results(ingredient_list, match, max_missing, min_coverage, limit))
+        entry = response_cache.put_search(key, results, generation)
+    return cached_response(entry, request)
+
+def _ingredient_results(
+    ingredient_list: List[str],
+    match: str,
+    max_missing: Optional[int],
+    min_coverage: float,
+    limit: int,
+) -> List[Dict[str, Any]]:
+    if not ingredient_list:
+        return recipe_index.documents(limit)
+
+    results = []
+    for result in ingredient_index.match(
+        ingredient_list,
+        mode=match,
+        max_missing=max_missing,
+        min_coverage=min_coverage,
+        limit=limit,
+    ):
+        document = recipe_index.document(result["id"]) or {}
+        results.append({
+            "id": result["id"],
+            "title": document.get("title"),
+            "description": document.get("description"),
+            "media": document.get("media"),
+            **result,
+        })
+    return results
@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+
+# Sample recipes following the recipes collection schema in db_setup.py.
+# Used to seed local development when no catalog is available.
+SAMPLE_RECIPES = [
+    {
+        "id": "1",
+        "title": "Spaghetti Carbonara",
+        "chef_id": "sample-chef",
+        "description": "A classic Italian pasta dish with eggs, cheese, pancetta, and black pepper.",
+        "media": ["https://images.unsplash.com/photo-1612874742237-6526221588e3"],
+        "cuisine": "italian",
+        "prep_time": 10,
+        "cook_time": 15,
+        "servings": 4,
+        "ingredients": [
+            {"name": "Spaghetti", "quantity": 400.0, "unit": "g"},
+            {"name": "Pancetta", "quantity": 150.0, "unit": "g"},
+            {"name": "Eggs", "quantity": 3.0, "unit": "pcs"},
+            {"name": "Parmesan cheese", "quantity": 50.0, "unit": "g"},
+            {"name": "Black pepper", "quantity": 1.0, "unit": "tsp"},
+            {"name": "Salt", "quantity": 1.0, "unit": "tsp"}
+        ],
+        "steps": [
+            {"order": 1, "description": "Bring a large pot of salted water to boil and cook spaghetti according to package instructions.", "time": 10},
+            {"order": 2, "description": "While pasta is cooking, fry pancetta in a large pan until crispy.", "time": 8},
+            {"order": 3, "description": "In a bowl, whisk eggs and grated parmesan cheese."},
+            {"order": 4, "description": "Drain pasta, reserving some cooking water."},
+            {"order": 5, "description": "Add pasta to the pan with pancetta, remove from heat."},
+            {"order": 6, "description": "Quickly stir in egg mixture, adding some reserved cooking water if needed to create a creamy sauce."},
+            {"order": 7, "description": "Season with black pepper and serve immediately."}
+        ],
+        "nutrition": {"calories": 620, "protein": 28.0, "carbs": 72.0, "fat": 24.0, "fiber": 3.0, "sugar": 2.0},
+        "scaling_factors": {"shrinkage": 0.0, "waste": 0.05, "time_adjustment": 0.1},
+        "tags": ["pasta", "italian", "dinner"],
+        "version": 1,
+        "created_at": datetime(2025, 4, 6, 12, 0, tzinfo=timezone.utc)
+    },
+    {
+        "id": "2",
+        "title": "Chicken Tikka Masala",
+        "chef_id": "sample-chef",
+        "description": "Grilled chicken chunks in a creamy sauce with Indian spices.",
+        "media": ["https://images.unsplash.com/photo-1565557623262-b51c2513a641"],
+        "cuisine": "indian",
+        "prep_time": 20,
+        "cook_time": 30,
+        "servings": 4,
+        "ingredients": [
+            {"name": "Chicken", "quantity": 700.0, "unit": "g"},
+            {"name": "Yogurt", "quantity": 1.0, "unit": "cup"},
+            {"name": "Tomatoes", "quantity": 400.0, "unit": "g"},
+            {"name": "Cream", "quantity": 120.0, "unit": "ml"},
+            {"name": "Garam masala", "quantity": 2.0, "unit": "tbsp"},
+            {"name": "Salt", "quantity": 1.0, "unit": "tsp"}
+        ],
+        "steps": [
+            {"order": 1, "description": "Marinate chicken in yogurt and half of the spices for at least an hour.", "time": 60},
+            {"order": 2, "description": "Grill the chicken until charred at the edges.", "time": 12,
+             "temperature": {"value": 230, "unit": "C"}},
+            {"order": 3, "description": "Simmer tomatoes with the remaining spices, then stir in cream.", "time": 15},
+            {"order": 4, "description": "Add the grilled chicken to the sauce and simmer for a few minutes.", "time": 5}
+        ],
+        "nutrition": {"calories": 480, "protein": 38.0, "carbs": 14.0, "fat": 29.0, "fiber": 3.0, "sugar": 8.0},
+        "scaling_factors": {"shrinkage": 0.25, "waste": 0.1, "time_adjustment": 0.2},
+        "tags": ["chicken", "indian", "curry", "dinner"],
+        "version": 1,
+        "created_at": datetime(2025, 4, 6, 12, 5, tzinfo=timezone.utc)
+    },
+    {
+        "id": "3",
+        "title": "Avocado Toast",
+        "chef_id": "sample-chef",
+        "description": "Simple and delicious breakfast with mashed avocado on toasted bread.",
+        "media": ["https://images.unsplash.com/photo-1588137378633-dea1336ce1e2"],
+        "cuisine": "american",
+        "prep_time": 5,
+        "cook_time": 5,
+        "servings": 1,
+        "ingredients": [
+            {"name": "Avocado", "quantity": 1.0, "unit": "pcs"},
+            {"name": "Bread", "quantity": 2.0, "unit": "slices"},
+            {"name": "Lemon juice", "quantity": 1.0, "unit": "tsp"},
+            {"name": "Salt", "quantity": 0.25, "unit": "tsp"},
+            {"name": "Pepper", "quantity": 0.25, "unit": "tsp"}
+        ],
+        "steps": [
+            {"order": 1, "description": "Toast the bread until golden.", "time": 3},
+            {"order": 2, "description": "Mash avocado with lemon juice, salt and pepper."},
+            {"order": 3, "description": "Spread the avocado over the toast and serve."}
+        ],
+        "nutrition": {"calories": 320, "protein": 8.0, "carbs": 34.0, "fat": 18.0, "fiber": 10.0, "sugar": 3.0},
+        "scaling_factors": {"shrinkage": 0.0, "waste": 0.15, "time_adjustment": 0.0},
+        "tags": ["breakfast", "vegetarian", "quick"],
+        "version": 1,
+        "created_at": datetime(2025, 4, 6, 12, 10, tzinfo=timezone.utc)
+    }
+]
@@ -0,0 +1,183 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from ingredient_index import normalize_ingredient
+
+# Unit -> (dimension, factor to the dimension's base unit)
+UNITS = {
+    "mg": ("mass", 0.001),
+    "g": ("mass", 1.0),
+    "gram": ("mass", 1.0),
+    "grams": ("mass", 1.0),
+    "kg": ("mass", 1000.0),
+    "oz": ("mass", 28.3495),
+    "lb": ("mass", 453.592),
+    "lbs": ("mass", 453.592),
+    "ml": ("volume", 1.0),
+    "cl": ("volume", 10.0),
+    "dl": ("volume", 100.0),
+    "l": ("volume", 1000.0),
+    "tsp": ("volume", 4.92892),
+    "tbsp": ("volume", 14.7868),
+    "fl oz": ("volume", 29.5735),
+    "cup": ("volume", 240.0),
+    "cups": ("volume", 240.0),
+    "pint": ("volume", 473.176),
+    "quart": ("volume", 946.353),
+    "gallon": ("volume", 3785.41),
+}
+
+BASE_UNITS = {"mass": "g", "volume": "ml"}
+
+# Larger unit used for display once a base quantity reaches 1000
+DISPLAY_UNITS = {"g": "kg", "ml": "l"}
+
+COUNT_ALIASES = {"": "pcs", "pc": "pcs", "piece": "pcs", "pieces": "pcs", "whole": "pcs"}
+
+
+def canonical_unit(unit: str) -> Tuple[str, float]:
+    """
+    Return the base unit and conversion factor for a unit. Units that are
+    not mass or volume are treated as counts and kept as they are.
+    """
+    unit = (unit or "").strip().lower().rstrip(".")
+    if unit in UNITS:
+        dimension, factor = UNITS[unit]
+        return BASE_UNITS[dimension], factor
+    return COUNT_ALIASES.get(unit, unit), 1.0
+
+
+def _display(quantities: np.ndarray, base_units: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convert base quantities to display units, vectorized over a 2D array
+    whose rows share the unit in base_units
+    """
+    larger = np.array([DISPLAY_UNITS.get(unit, unit) for unit in base_units], dtype=object)
+    convertible = np.array([unit in DISPLAY_UNITS for unit in base_units], dtype=bool)
+    promote = convertible[:, None] & (quantities >= 1000.0)
+    values = np.where(promote, quantities / 1000.0, quantities)
+    units = np.where(promote, larger[:, None], base_units[:, None])
+    return np.round(values, 2), units
+
+
+def _factor(recipe: Dict[str, Any], name: str) -> float:
+    return float((recipe.get("scaling_factors") or {}).get(name) or 0.0)
+
+
+class ScaledBatch:
+    """
+    Result of scaling a list of recipes, each to one or more target servings.
+
+    All quantities are computed in a single pass over a flat array holding
+    every ingredient of every recipe, broadcast against the matrix of
+    scaling ratios.
+
+    - waste is the fraction of an ingredient lost in preparation, so the
+      purchase quantity is the recipe quantity / (1 - waste)
+    - shrinkage is the fraction of weight lost in cooking and only affects
+      the reported cooked yield
+    - time_adjustment is the exponent applied to the scaling ratio for prep
+      and cook times: 0 keeps times fixed, 1 scales them linearly
+    """
+
+    def __init__(self, recipes: Sequence[Dict[str, Any]], targets: Sequence[Sequence[float]]):
+        self.recipes = list(recipes)
+        self.targets = np.asarray(targets, dtype=float).reshape(len(self.recipes), -1)
+
+        servings = np.array([recipe.get("servings") or 1 for recipe in self.recipes], dtype=float)
+        ratios = self.targets / servings[:, None]
+
+        owners, names, units, quantities, factors = [], [], [], [], []
+        for index, recipe in enumerate(self.recipes):
+            for ingredient in recipe.get("ingredients") or []:
+                if not isinstance(ingredient, dict) or ingredient.get("quantity") is None:
+                    continue
+                unit, factor = canonical_unit(ingredient.get("unit", ""))
+                owners.append(index)
+                names.append(ingredient.get("name", ""))
+                units.append(unit)
+                quantities.append(float(ingredient["quantity"]))
+                factors.append(factor)
+
+        self.owners = np.array(owners, dtype=np.intp)
+        self.names = names
+        self.units = np.array(units, dtype=object)
+
+        waste = np.array([_factor(recipe, "waste") for recipe in self.recipes])
+        shrinkage = np.array([_factor(recipe, "shrinkage") for recipe in self.recipes])
+        time_adjustment = np.array([_factor(recipe, "time_adjustment") for recipe in self.recipes])
+
+        base = np.array(quantities) * np.array(factors)
+        self.net = base[:, None] * ratios[self.owners] if len(base) else np.zeros((0, ratios.shape[1]))
+        self.gross = self.net / np.clip(1.0 - waste[self.owners], 0.01, None)[:, None]
+
+        is_mass = self.units == "g"
+        cooked = np.zeros_like(ratios)
+        np.add.at(cooked, self.owners[is_mass], self.net[is_mass])
+        self.cooked_mass = cooked * (1.0 - shrinkage)[:, None]
+
+        time_scale = ratios ** time_adjustment[:, None]
+        prep = np.array([recipe.get("prep_time") or 0 for recipe in self.recipes], dtype=float)
+        cook = np.array([recipe.get("cook_time") or 0 for recipe in self.recipes], dtype=float)
+        self.prep_time = np.rint(prep[:, None] * time_scale).astype(int)
+        self.cook_time = np.rint(cook[:, None] * time_scale).astype(int)
+
+    def recipe_yields(self, index: int) -> List[Dict[str, Any]]:
+        """
+        Scaled ingredients and times of one recipe for each of its targets
+        """
+        rows = np.flatnonzero(self.owners == index)
+        net, net_units = _display(self.net[rows], self.units[rows])
+        gross, gross_units = _display(self.gross[rows], self.units[rows])
+        results = []
+        for column, servings in enumerate(self.targets[index].tolist()):
+            results.append({
+                "servings": servings,
+                "prep_time": int(self.prep_time[index, column]),
+                "cook_time": int(self.cook_time[index, column]),
+                "cooked_yield_g": round(float(self.cooked_mass[index, column]), 1),
+                "ingredients": [
+                    {
+                        "name": self.names[row],
+                        "quantity": float(net[position, column]),
+                        "unit": net_units[position, column],
+                        "purchase_quantity": float(gross[position, column]),
+                        "purchase_unit": gross_units[position, column],
+                    }
+                    for position, row in enumerate(rows.tolist())
+                ],
+            })
+        return results
+
+    def shopping_list(self, column: int = 0) -> List[Dict[str, Any]]:
+        """
+        Purchase quantities for one target column, aggregated across recipes
+        by ingredient and unit
+        """
+        if not len(self.owners):
+            return []
+        keys = np.array([
+            f"{normalize_ingredient(name)}|{unit}" for name, unit in zip(self.names, self.units)
+        ])
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=self.gross[:, column], minlength=len(unique_keys))
+        first = np.full(len(unique_keys), len(keys))
+        np.minimum.at(first, inverse, np.arange(len(keys)))
+        base_units = self.units[first]
+        values, units = _display(totals[:, None], base_units)
+
+        # Group rows by key to list the recipes using each ingredient
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.cumsum(np.bincount(inverse, minlength=len(unique_keys)))[:-1]
+        groups = np.split(self.owners[order], bounds)
+
+        results = []
+        for position, owners in enumerate(groups):
+            results.append({
+                "name": self.names[first[position]],
+                "quantity": float(values[position, 0]),
+                "unit": units[position, 0],
+                "recipes": sorted({str(self.recipes[owner].get("id")) for owner in owners.tolist()}),
+            })
+        return results
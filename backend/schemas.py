@@ -0,0 +1,298 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+# $jsonSchema validators shared by db_setup.py and the bulk import path
+
+# Users collection schema
+USERS_SCHEMA = {
+    'bsonType': 'object',
+    'required': ['email', 'role', 'created_at'],
+    'properties': {
+        'email': {
+            'bsonType': 'string',
+            'description': 'Email address of the user'
+        },
+        'name': {
+            'bsonType': 'string',
+            'description': 'Full name of the user'
+        },
+        'role': {
+            'enum': ['admin', 'chef', 'client', 'viewer'],
+            'description': 'Role of the user'
+        },
+        'created_at': {
+            'bsonType': 'date',
+            'description': 'Date when the user was created'
+        },
+        'updated_at': {
+            'bsonType': 'date',
+            'description': 'Date when the user was last updated'
+        },
+        'preferences': {
+            'bsonType': 'object',
+            'description': 'User preferences'
+        }
+    }
+}
+
+# Recipes collection schema
+RECIPES_SCHEMA = {
+    'bsonType': 'object',
+    'required': ['title', 'chef_id', 'ingredients', 'steps', 'created_at', 'version'],
+    'properties': {
+        'title': {
+            'bsonType': 'string',
+            'description': 'Title of the recipe'
+        },
+        'chef_id': {
+            'bsonType': 'string',
+            'description': 'ID of the chef who created the recipe'
+        },
+        'description': {
+            'bsonType': 'string',
+            'description': 'Description of the recipe'
+        },
+        'ingredients': {
+            'bsonType': 'array',
+            'description': 'List of ingredients',
+            'items': {
+                'bsonType': 'object',
+                'required': ['name', 'quantity', 'unit'],
+                'properties': {
+                    'name': {
+                        'bsonType': 'string',
+                        'description': 'Name of the ingredient'
+                    },
+                    'quantity': {
+                        'bsonType': 'double',
+                        'description': 'Quantity of the ingredient'
+                    },
+                    'unit': {
+                        'bsonType': 'string',
+                        'description': 'Unit of measurement'
+                    },
+                    'notes': {
+                        'bsonType': 'string',
+                        'description': 'Additional notes about the ingredient'
+                    }
+                }
+            }
+        },
+        'steps': {
+            'bsonType': 'array',
+            'description': 'List of steps',
+            'items': {
+                'bsonType': 'object',
+                'required': ['order', 'description'],
+                'properties': {
+                    'order': {
+                        'bsonType': 'int',
+                        'description': 'Order of the step'
+                    },
+                    'description': {
+                        'bsonType': 'string',
+                        'description': 'Description of the step'
+                    },
+                    'time': {
+                        'bsonType': 'int',
+                        'description': 'Time in minutes for this step'
+                    },
+                    'temperature': {
+                        'bsonType': 'object',
+                        'properties': {
+                            'value': {
+                                'bsonType': 'int',
+                                'description': 'Temperature value'
+                            },
+                            'unit': {
+                                'enum': ['C', 'F'],
+                                'description': 'Temperature unit (Celsius or Fahrenheit)'
+                            }
+                        }
+                    },
+                    'media': {
+                        'bsonType': 'array',
+                        'items': {
+                            'bsonType': 'string',
+                            'description': 'URL to media file'
+                        }
+                    }
+                }
+            }
+        },
+        'tags': {
+            'bsonType': 'array',
+            'items': {
+                'bsonType': 'string'
+            },
+            'description': 'Tags for the recipe'
+        },
+        'cuisine': {
+            'bsonType': 'string',
+            'description': 'Cuisine type'
+        },
+        'prep_time': {
+            'bsonType': 'int',
+            'description': 'Preparation time in minutes'
+        },
+        'cook_time': {
+            'bsonType': 'int',
+            'description': 'Cooking time in minutes'
+        },
+        'servings': {
+            'bsonType': 'int',
+            'description': 'Number of servings'
+        },
+        'media': {
+            'bsonType': 'array',
+            'items': {
+                'bsonType': 'string',
+                'description': 'URL to media file'
+            }
+        },
+        'nutrition': {
+            'bsonType': 'object',
+            'properties': {
+                'calories': {
+                    'bsonType': 'int',
+                    'description': 'Calories per serving'
+                },
+                'protein': {
+                    'bsonType': 'double',
+                    'description': 'Protein in grams'
+                },
+                'carbs': {
+                    'bsonType': 'double',
+                    'description': 'Carbohydrates in grams'
+                },
+                'fat': {
+                    'bsonType': 'double',
+                    'description': 'Fat in grams'
+                },
+                'fiber': {
+                    'bsonType': 'double',
+                    'description': 'Fiber in grams'
+                },
+                'sugar': {
+                    'bsonType': 'double',
+                    'description': 'Sugar in grams'
+                }
+            }
+        },
+        'scaling_factors': {
+            'bsonType': 'object',
+            'properties': {
+                'shrinkage': {
+                    'bsonType': 'double',
+                    'description': 'Shrinkage factor for scaling'
+                },
+                'waste': {
+                    'bsonType': 'double',
+                    'description': 'Waste factor for scaling'
+                },
+                'time_adjustment': {
+                    'bsonType': 'double',
+                    'description': 'Time adjustment factor for scaling'
+                }
+            }
+        },
+        'version': {
+            'bsonType': 'int',
+            'description': 'Version number of the recipe'
+        },
+        'created_at': {
+            'bsonType': 'date',
+            'description': 'Date when the recipe was created'
+        },
+        'updated_at': {
+            'bsonType': 'date',
+            'description': 'Date when the recipe was last updated'
+        }
+    }
+}
+
+# Notes collection schema
+NOTES_SCHEMA = {
+    'bsonType': 'object',
+    'required': ['recipe_id', 'user_id', 'content', 'created_at'],
+    'properties': {
+        'recipe_id': {
+            'bsonType': 'string',
+            'description': 'ID of the recipe'
+        },
+        'user_id': {
+            'bsonType': 'string',
+            'description': 'ID of the user who created the note'
+        },
+        'content': {
+            'bsonType': 'string',
+            'description': 'Content of the note'
+        },
+        'created_at': {
+            'bsonType': 'date',
+            'description': 'Date when the note was created'
+        },
+        'updated_at': {
+            'bsonType': 'date',
+            'description': 'Date when the note was last updated'
+        }
+    }
+}
+
+
+def _coerce(value: Any, bson_type: str) -> Any:
+    # JSON has no int/double or date distinction, so convert where it is safe
+    if bson_type == "double" and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if bson_type == "date" and isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+    return value
+
+
+def _type_matches(value: Any, bson_type: str) -> bool:
+    if bson_type == "string":
+        return isinstance(value, str)
+    if bson_type == "int":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if bson_type == "double":
+        return isinstance(value, float)
+    if bson_type == "date":
+        return isinstance(value, datetime)
+    if bson_type == "object":
+        return isinstance(value, dict)
+    if bson_type == "array":
+        return isinstance(value, list)
+    return True
+
+
+def validate(document: Any, schema: Dict[str, Any], path: str = "") -> List[str]:
+    """
+    Check a document against one of the schemas above, returning a list of
+    error messages. Ints given for double fields and ISO strings given for
+    date fields are converted in place, matching what the server stores.
+    """
+    errors = []
+    label = path or "document"
+    bson_type = schema.get("bsonType")
+    if bson_type and not _type_matches(document, bson_type):
+        return [f"{label} must be of type {bson_type}"]
+    if "enum" in schema and document not in schema["enum"]:
+        return [f"{label} must be one of {', '.join(map(str, schema['enum']))}"]
+
+    if isinstance(document, dict):
+        for field in schema.get("required", []):
+            if field not in document:
+                errors.append(f"{path + '.' if path else ''}{field} is required")
+        for field, field_schema in schema.get("properties", {}).items():
+            if field in document:
+                document[field] = _coerce(document[field], field_schema.get("bsonType"))
+                errors.extend(validate(document[field], field_schema, f"{path + '.' if path else ''}{field}"))
+    elif isinstance(document, list) and "items" in schema:
+        item_schema = schema["items"]
+        for index, item in enumerate(document):
+            document[index] = _coerce(item, item_schema.get("bsonType"))
+            errors.extend(validate(document[index], item_schema, f"{label}[{index}]"))
+    return errors
@@ -0,0 +1,237 @@
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Any, Container, Dict, Iterable, List, Optional, Tuple
+
+from fuzzy import TrigramIndex
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Weight of a single term occurrence in each indexed field
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "tags": 2.0,
+    "ingredients": 1.5,
+    "description": 1.0,
+}
+
+# Fields kept next to the postings so results can be served without a lookup
+STORED_FIELDS = ("title", "description", "media", "tags")
+
+# Score multiplier for terms reached through prefix expansion
+PREFIX_WEIGHT = 0.6
+
+# Score multiplier per edit for terms reached through typo correction
+FUZZY_WEIGHT = 0.5
+
+# Corrections tried for each query token that matches nothing
+MAX_CORRECTIONS = 3
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase alphanumeric tokens
+    """
+    return TOKEN_RE.findall(text.lower())
+
+
+def ingredient_names(recipe: Dict[str, Any]) -> List[str]:
+    """
+    Return ingredient names for both schema-style and plain string ingredients
+    """
+    names = []
+    for item in recipe.get("ingredients") or []:
+        name = item.get("name") if isinstance(item, dict) else item
+        if name:
+            names.append(name)
+    return names
+
+
+def field_texts(recipe: Dict[str, Any]) -> Iterable[Tuple[str, str]]:
+    yield "title", recipe.get("title") or ""
+    yield "description", recipe.get("description") or ""
+    for tag in recipe.get("tags") or []:
+        yield "tags", tag
+    for name in ingredient_names(recipe):
+        yield "ingredients", name
+
+
+class SearchIndex:
+    """
+    In-process inverted index over recipe title, description, tags and
+    ingredients with BM25 ranking, prefix matching and typo tolerance.
+
+    Postings map each term to the field-weighted term frequency per recipe.
+    A forward index of terms per recipe makes updates and deletes touch only
+    the postings of the recipe being changed.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_prefix_expansions: int = 64):
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_expansions = max_prefix_expansions
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._total_length = 0.0
+        self._stored: Dict[str, Dict[str, Any]] = {}
+        # Sorted vocabulary, used to expand prefixes with a binary search
+        self._vocabulary: List[str] = []
+        # The same vocabulary by trigram, used to correct misspelled terms
+        self._trigrams = TrigramIndex()
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def __contains__(self, recipe_id: str) -> bool:
+        return recipe_id in self._doc_lengths
+
+    def add(self, recipe_id: str, recipe: Dict[str, Any]):
+        """
+        Index a recipe, replacing any previous version with the same ID
+        """
+        if recipe_id in self._doc_lengths:
+            self.remove(recipe_id)
+
+        terms: Dict[str, float] = {}
+        for field, text in field_texts(recipe):
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0.0) + weight
+
+        for term, frequency in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._vocabulary, term)
+                self._trigrams.add(term)
+            postings[recipe_id] = frequency
+
+        length = sum(terms.values())
+        self._doc_terms[recipe_id] = terms
+        self._doc_lengths[recipe_id] = length
+        self._total_length += length
+        self._stored[recipe_id] = {field: recipe.get(field) for field in STORED_FIELDS}
+        self._stored[recipe_id]["id"] = recipe_id
+
+    def remove(self, recipe_id: str) -> bool:
+        """
+        Remove a recipe from the index. Returns False if it was not indexed.
+        """
+        terms = self._doc_terms.pop(recipe_id, None)
+        if terms is None:
+            return False
+
+        for term in terms:
+            postings = self._postings[term]
+            del postings[recipe_id]
+            if not postings:
+                del self._postings[term]
+                position = bisect_left(self._vocabulary, term)
+                del self._vocabulary[position]
+                self._trigrams.remove(term)
+
+        self._total_length -= self._doc_lengths.pop(recipe_id)
+        del self._stored[recipe_id]
+        return True
+
+    def clear(self):
+        self._postings.clear()
+        self._doc_terms.clear()
+        self._doc_lengths.clear()
+        self._total_length = 0.0
+        self._stored.clear()
+        self._vocabulary.clear()
+        self._trigrams.clear()
+
+    def expand_prefix(self, prefix: str) -> List[str]:
+        """
+        Return indexed terms starting with prefix. Very short prefixes are
+        capped to the most frequent max_prefix_expansions terms.
+        """
+        start = bisect_left(self._vocabulary, prefix)
+        end = bisect_left(self._vocabulary, prefix + "\uffff", lo=start)
+        if end - start <= self.max_prefix_expansions:
+            return self._vocabulary[start:end]
+        return heapq.nlargest(
+            self.max_prefix_expansions,
+            islice(self._vocabulary, start, end),
+            key=lambda term: len(self._postings[term]),
+        )
+
+    def _query_terms(self, query: str, prefix: bool, fuzzy: bool) -> Dict[str, float]:
+        tokens = tokenize(query)
+        weights = {token: 1.0 for token in tokens}
+        expanded = False
+        if prefix and tokens:
+            last = tokens[-1]
+            for term in self.expand_prefix(last):
+                expanded = True
+                if term not in weights:
+                    weights[term] = PREFIX_WEIGHT
+        if fuzzy:
+            for position, token in enumerate(tokens):
+                if token in self._postings or (expanded and position == len(tokens) - 1):
+                    continue
+                last = prefix and position == len(tokens) - 1
+                for term, distance in self._trigrams.similar(token, prefix=last, limit=MAX_CORRECTIONS):
+                    weights.setdefault(term, FUZZY_WEIGHT ** distance)
+        return weights
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        prefix: bool = True,
+        allowed: Optional[Container[str]] = None,
+        fuzzy: bool = True,
+    ) -> List[Tuple[str, float]]:
+        """
+        Return up to limit (recipe_id, score) pairs ranked by BM25.
+
+        When prefix is set, the last query token also matches every indexed
+        term it is a prefix of, so partially typed queries find results.
+        When fuzzy is set, tokens that match nothing are replaced by the
+        indexed terms within a few edits of them, so "carbonra" finds
+        carbonara. If allowed is given, only those recipe IDs are scored.
+        """
+        count = len(self._doc_lengths)
+        if not count:
+            return []
+
+        average_length = self._total_length / count
+        k1 = self.k1
+        length_norm = {}
+        scores: Dict[str, float] = {}
+
+        for term, query_weight in self._query_terms(query, prefix, fuzzy).items():
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1.0 + (count - df + 0.5) / (df + 0.5)) * query_weight
+            for recipe_id, frequency in postings.items():
+                if allowed is not None and recipe_id not in allowed:
+                    continue
+                norm = length_norm.get(recipe_id)
+                if norm is None:
+                    norm = k1 * (1.0 - self.b + self.b * self._doc_lengths[recipe_id] / average_length)
+                    length_norm[recipe_id] = norm
+                scores[recipe_id] = scores.get(recipe_id, 0.0) + idf * frequency * (k1 + 1.0) / (frequency + norm)
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+
+    def document(self, recipe_id: str) -> Optional[Dict[str, Any]]:
+        return self._stored.get(recipe_id)
+
+    def documents(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Return stored documents in insertion order
+        """
+        return list(islice(self._stored.values(), limit))
+
+
+# Shared index for the running application
+recipe_index = SearchIndex()
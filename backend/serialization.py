@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode content as compact JSON. Datetimes and numpy values are handled
+    natively, ObjectIds through json_default.
+    """
+    return orjson.dumps(content, default=json_default, option=ORJSON_OPTIONS)
+
+
+def dumps_line(content: Any) -> bytes:
+    """
+    Encode content as one NDJSON line, newline included
+    """
+    return orjson.dumps(content, default=json_default, option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE)
+
+
+loads = orjson.loads
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson.
+
+    Handlers return it directly so FastAPI skips jsonable_encoder, which
+    otherwise copies every dict and list of the payload before encoding.
+    A response_model on the route still documents the shape in OpenAPI.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
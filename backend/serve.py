@@ -0,0 +1,271 @@
+"""
+Production entry point: a pre-forking server that runs several uvicorn
+workers on one listening socket.
+
+    python serve.py --host 0.0.0.0 --port 8000 --workers 4
+
+The master process loads the recipe catalog and builds the search,
+ingredient and attribute indexes once, freezes the heap with gc.freeze()
+and only then forks. Workers start with the indexes already in memory and
+share those pages with the master copy-on-write, instead of each one
+reading the whole catalog and holding a private copy.
+
+So that a cold start is answered right away, the master first forks
+standby workers, which serve /healthz, /readyz (503 until ready) and the
+routes backed by the database, but build no indexes. Once the indexes are
+built they are replaced one at a time, as on a reload.
+
+Reloading: send SIGHUP to the master (kill -HUP <pid>, or
+docker kill -s HUP <container>). It rebuilds the indexes from the database,
+then replaces the workers one at a time: a new worker is forked, and the
+old one is asked to shut down gracefully only once the new one accepts
+connections, so the socket is always served. Code changes need a full
+restart. Between reloads, each worker follows the change streams
+from the position the master built its indexes at (see change_stream.py).
+
+SIGTERM or SIGINT stop the workers gracefully and exit. Workers that die
+unexpectedly are replaced.
+"""
+import argparse
+import asyncio
+import gc
+import os
+import select
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+import uvicorn
+from pymongo.errors import OperationFailure
+
+import change_stream
+import database
+import derived_state
+import media
+from notes import NoteService
+from repository import RecipeRepository
+
+# Seconds a new worker gets to start accepting connections during a reload
+WORKER_START_TIMEOUT = 60
+
+# Seconds a worker gets to finish in-flight requests before it is killed
+WORKER_STOP_TIMEOUT = 30
+
+MASTER_SIGNALS = {signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD}
+
+
+async def build_derived_state():
+    db = await database.connect()
+    try:
+        repository = RecipeRepository(db.recipes, db.recipe_versions)
+        # Checkpoint every stream the workers follow, as main's lifespan
+        # subscribes to them, so each worker resumes all of them from here
+        subscriber = change_stream.create_subscriber(
+            db, repository, NoteService(db.notes), media.MediaCatalog(db.media_manifests),
+        )
+        derived_state.resume_tokens = None
+        if subscriber is not None:
+            try:
+                derived_state.resume_tokens = await subscriber.checkpoint()
+            except OperationFailure as e:
+                print(f"[master {os.getpid()}] change streams unavailable: {e}", flush=True)
+        await derived_state.load(repository)
+    finally:
+        await database.close()
+
+
+def warm():
+    """
+    Build the derived structures in this process and freeze everything
+    allocated so far, so the collector never touches those objects and
+    their pages stay shared with forked workers
+    """
+    gc.collect()
+    gc.unfreeze()
+    started = time.perf_counter()
+    asyncio.run(build_derived_state())
+    derived_state.prebuilt = True
+    gc.collect()
+    gc.freeze()
+    print(f"[master {os.getpid()}] derived state built in {time.perf_counter() - started:.2f}s", flush=True)
+
+
+class WorkerServer(uvicorn.Server):
+    """
+    uvicorn server that tells the master through a pipe once it is
+    accepting connections
+    """
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        if self.started:
+            os.write(self.ready_fd, b"1")
+        os.close(self.ready_fd)
+
+
+def run_worker(sock: socket.socket, ready_fd: int, args):
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, MASTER_SIGNALS)
+    derived_state.standby = not derived_state.prebuilt
+    from main import app
+
+    config = uvicorn.Config(app, log_level=args.log_level, access_log=args.access_log)
+    WorkerServer(config, ready_fd).run(sockets=[sock])
+
+
+class Master:
+    def __init__(self, sock: socket.socket, args):
+        self.sock = sock
+        self.args = args
+        self.workers: Dict[int, float] = {}
+        self.stopping = False
+
+    def log(self, message: str):
+        print(f"[master {os.getpid()}] {message}", flush=True)
+
+    def spawn(self) -> Optional[int]:
+        """
+        Fork a worker and return its pid, or None if it failed to start
+        within WORKER_START_TIMEOUT
+        """
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            try:
+                run_worker(self.sock, write_fd, self.args)
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        self.workers[pid] = time.monotonic()
+        try:
+            ready, _, _ = select.select([read_fd], [], [], WORKER_START_TIMEOUT)
+            started = bool(ready) and os.read(read_fd, 1) == b"1"
+        finally:
+            os.close(read_fd)
+        if not started:
+            self.log(f"worker {pid} failed to start")
+            self.stop_worker(pid)
+            return None
+        self.log(f"worker {pid} ready")
+        return pid
+
+    def stop_worker(self, pid: int, terminate: bool = True):
+        """
+        Ask a worker to finish its requests and exit, killing it after
+        WORKER_STOP_TIMEOUT
+        """
+        if terminate:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + WORKER_STOP_TIMEOUT
+        try:
+            while os.waitpid(pid, os.WNOHANG)[0] == 0:
+                if time.monotonic() > deadline:
+                    os.kill(pid, signal.SIGKILL)
+                    os.waitpid(pid, 0)
+                    break
+                time.sleep(0.05)
+        except ChildProcessError:
+            pass
+        self.workers.pop(pid, None)
+
+    def replace_workers(self) -> bool:
+        """
+        Replace the workers one at a time with workers forked from the
+        current state, stopping each only once its replacement accepts
+        connections. False if a replacement failed to start.
+        """
+        for pid in list(self.workers):
+            if self.spawn() is None:
+                return False
+            self.stop_worker(pid)
+        return True
+
+    def reload(self):
+        self.log("reloading")
+        warm()
+        if self.replace_workers():
+            self.log("reload complete")
+        else:
+            self.log("reload aborted; keeping the remaining workers")
+
+    def reap(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if self.workers.pop(pid, None) is not None and not self.stopping:
+                self.log(f"worker {pid} exited with status {status}; replacing it")
+                self.spawn()
+
+    def run(self):
+        # Signals are blocked and consumed synchronously, so none can
+        # interrupt a reload half way; workers unblock them after forking
+        signal.pthread_sigmask(signal.SIG_BLOCK, MASTER_SIGNALS)
+        try:
+            # Standby workers answer while the structures are built
+            for _ in range(self.args.workers):
+                self.spawn()
+            warm()
+            if not self.replace_workers():
+                self.log("some workers are still on standby; send SIGHUP to retry")
+
+            while not self.stopping:
+                info = signal.sigtimedwait(MASTER_SIGNALS, 1.0)
+                if info is None:
+                    continue
+                if info.si_signo == signal.SIGHUP:
+                    self.reload()
+                elif info.si_signo == signal.SIGCHLD:
+                    self.reap()
+                else:
+                    self.stopping = True
+        finally:
+            self.stopping = True
+            self.log("shutting down")
+            for pid in list(self.workers):
+                os.kill(pid, signal.SIGTERM)
+            for pid in list(self.workers):
+                self.stop_worker(pid, terminate=False)
+
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with pre-forked uvicorn workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))))
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false")
+    parser.add_argument("--pidfile", help="Write the master pid here, for kill -HUP")
+    args = parser.parse_args()
+
+    sock = bind(args.host, args.port)
+    if args.pidfile:
+        with open(args.pidfile, "w") as pidfile:
+            pidfile.write(str(os.getpid()))
+    Master(sock, args).run()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
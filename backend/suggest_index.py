@@ -0,0 +1,484 @@
+import heapq
+import logging
+import math
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fuzzy import TrigramIndex
+from search_index import ingredient_names, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Ranking weight of each kind of suggestion
+KIND_WEIGHTS = {
+    "title": 1.5,
+    "tag": 1.2,
+    "ingredient": 1.0,
+}
+
+# Score multiplier for phrases matched from a word other than their first
+INNER_WORD_WEIGHT = 0.7
+
+# Score multiplier per edit for suggestions reached through typo correction
+FUZZY_WEIGHT = 0.5
+
+# Most suggestions a request can ask for
+TOP_K = 20
+
+# Completions cached per trie node, more than TOP_K so that removals
+# rarely force a cache to be recomputed. Nodes with no more keys than this
+# below them cache nothing and are ranked on demand.
+CACHE_SIZE = 2 * TOP_K
+
+# Memory budget, as the number of keys (phrases and their inner-word
+# suffixes) the trie may hold, each costing roughly 250 bytes. A catalog
+# needs about 5 per recipe, so the default fits 500k recipes with room to
+# spare. Phrases that do not fit are not suggested until others are
+# removed, and a warning is logged when that first happens.
+SUGGEST_MAX_KEYS = int(os.getenv("SUGGEST_MAX_KEYS", "3000000"))
+
+# Longest phrase indexed, in words; longer titles are truncated
+MAX_PHRASE_WORDS = 8
+
+# Keys are packed into one int: the phrase ID, then the word position
+POSITION_BITS = 3
+
+# (kind, normalized text)
+PhraseKey = Tuple[str, str]
+
+# (score, packed key)
+Entry = Tuple[float, int]
+
+
+class _Node:
+    """
+    Radix trie node. label is the edge from the parent, terminals the
+    packed keys ending here and size the number of keys in the subtree.
+    top caches the best CACHE_SIZE entries of large subtrees: nothing
+    outside it scores higher than its last entry. None means it is
+    computed on demand.
+    """
+
+    __slots__ = ("label", "children", "terminals", "top", "size")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.children: Optional[Dict[str, "_Node"]] = None
+        self.terminals: Optional[List[int]] = None
+        self.top: Optional[List[Entry]] = None
+        self.size = 0
+
+
+def _common_prefix(a: str, b: str) -> int:
+    if b.startswith(a):
+        return len(a)
+    size = min(len(a), len(b))
+    for i in range(size):
+        if a[i] != b[i]:
+            return i
+    return size
+
+
+class SuggestIndex:
+    """
+    Type-ahead over recipe titles, tags and ingredient names.
+
+    Every phrase is stored in a compressed prefix trie under its full text
+    and under each suffix starting at a word, so "chick" completes both
+    "chicken tikka masala" and "butter chicken". Nodes with large subtrees
+    cache their best completions, ranked by how many recipes use the
+    phrase, its kind and whether the match starts at its first word, so a
+    lookup costs a walk down the trie regardless of catalog size. Caches
+    are updated in place as recipes change and only recomputed from the
+    subtree when removals leave one with fewer than TOP_K entries.
+
+    Words are also kept in a trigram index, so a misspelled last word
+    ("tika") is corrected to the words it could become ("tikka").
+    """
+
+    def __init__(self, max_keys: int = SUGGEST_MAX_KEYS):
+        self.max_keys = max_keys
+        self._root = _Node("")
+        self._keys = 0
+        self._phrase_ids: Dict[PhraseKey, int] = {}
+        self._phrases: List[Optional[PhraseKey]] = []
+        self._free_ids: List[int] = []
+        self._counts: List[int] = []
+        # Recipes per title, so a title used once can link to its recipe
+        self._title_recipes: Dict[int, set] = {}
+        self._doc_phrases: Dict[str, List[int]] = {}
+        self._word_counts: Dict[str, int] = {}
+        self._words = TrigramIndex()
+        self.skipped = 0
+        # Set while loading a catalog: caches are left stale and rebuilt
+        # once by end_bulk
+        self._bulk = False
+
+    def __len__(self) -> int:
+        return len(self._doc_phrases)
+
+    def __contains__(self, recipe_id: str) -> bool:
+        return recipe_id in self._doc_phrases
+
+    @property
+    def key_count(self) -> int:
+        return self._keys
+
+    @staticmethod
+    def phrases(recipe: Dict[str, Any]) -> Iterator[PhraseKey]:
+        texts = [("title", recipe.get("title") or "")]
+        texts.extend(("tag", tag) for tag in recipe.get("tags") or [])
+        texts.extend(("ingredient", name) for name in ingredient_names(recipe))
+        seen = set()
+        for kind, text in texts:
+            words = tokenize(text)[:MAX_PHRASE_WORDS]
+            key = (kind, " ".join(words))
+            if words and key not in seen:
+                seen.add(key)
+                yield key
+
+    def _score(self, packed: int) -> float:
+        phrase_id = packed >> POSITION_BITS
+        weight = KIND_WEIGHTS[self._phrases[phrase_id][0]] * math.log1p(self._counts[phrase_id])
+        return weight if not packed & ((1 << POSITION_BITS) - 1) else weight * INNER_WORD_WEIGHT
+
+    @staticmethod
+    def _suffixes(text: str) -> Iterator[Tuple[int, str]]:
+        words = text.split(" ")
+        for position in range(len(words)):
+            yield position, " ".join(words[position:])
+
+    def add(self, recipe_id: str, recipe: Dict[str, Any]):
+        """
+        Index a recipe's phrases, replacing any previous version
+        """
+        if recipe_id in self._doc_phrases:
+            self.remove(recipe_id)
+
+        phrase_ids = []
+        for key in self.phrases(recipe):
+            phrase_id = self._phrase_ids.get(key)
+            if phrase_id is None:
+                phrase_id = self._new_phrase(key)
+                if phrase_id is None:
+                    if not self.skipped:
+                        logger.warning(
+                            "Suggest index is full at %d keys; phrases beyond SUGGEST_MAX_KEYS are not suggested",
+                            self.max_keys,
+                        )
+                    self.skipped += 1
+                    continue
+            else:
+                self._counts[phrase_id] += 1
+                if not self._bulk:
+                    self._rescore(phrase_id)
+            if key[0] == "title":
+                self._title_recipes.setdefault(phrase_id, set()).add(recipe_id)
+            phrase_ids.append(phrase_id)
+        self._doc_phrases[recipe_id] = phrase_ids
+
+    def remove(self, recipe_id: str) -> bool:
+        """
+        Remove a recipe's phrases. Returns False if it was not indexed.
+        """
+        phrase_ids = self._doc_phrases.pop(recipe_id, None)
+        if phrase_ids is None:
+            return False
+        for phrase_id in phrase_ids:
+            self._counts[phrase_id] -= 1
+            recipes = self._title_recipes.get(phrase_id)
+            if recipes is not None:
+                recipes.discard(recipe_id)
+            if not self._counts[phrase_id]:
+                self._drop_phrase(phrase_id)
+            elif not self._bulk:
+                self._rescore(phrase_id)
+        return True
+
+    def clear(self):
+        self._root = _Node("")
+        self._keys = 0
+        self._phrase_ids.clear()
+        self._phrases.clear()
+        self._free_ids.clear()
+        self._counts.clear()
+        self._title_recipes.clear()
+        self._doc_phrases.clear()
+        self._word_counts.clear()
+        self._words.clear()
+        self.skipped = 0
+
+    def begin_bulk(self):
+        """
+        Defer ranking until end_bulk, so loading a catalog does not keep
+        re-sorting the completions of popular phrases
+        """
+        self._bulk = True
+
+    def end_bulk(self):
+        """
+        Drop every cache and rank the whole trie once, from the leaves up
+        """
+        self._bulk = False
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            node.top = None
+            if node.children:
+                stack.extend(node.children.values())
+        self._top(self._root)
+
+    def _new_phrase(self, key: PhraseKey) -> Optional[int]:
+        text = key[1]
+        if self._keys + text.count(" ") + 1 > self.max_keys:
+            return None
+        if self._free_ids:
+            phrase_id = self._free_ids.pop()
+            self._phrases[phrase_id] = key
+            self._counts[phrase_id] = 1
+        else:
+            phrase_id = len(self._phrases)
+            self._phrases.append(key)
+            self._counts.append(1)
+        self._phrase_ids[key] = phrase_id
+        for word in text.split(" "):
+            count = self._word_counts.get(word, 0)
+            if not count:
+                self._words.add(word)
+            self._word_counts[word] = count + 1
+        for position, suffix in self._suffixes(text):
+            self._set(suffix, phrase_id << POSITION_BITS | position, True)
+        return phrase_id
+
+    def _drop_phrase(self, phrase_id: int):
+        key = self._phrases[phrase_id]
+        for position, suffix in self._suffixes(key[1]):
+            self._set(suffix, phrase_id << POSITION_BITS | position, False)
+        for word in key[1].split(" "):
+            self._word_counts[word] -= 1
+            if not self._word_counts[word]:
+                del self._word_counts[word]
+                self._words.remove(word)
+        del self._phrase_ids[key]
+        self._title_recipes.pop(phrase_id, None)
+        self._phrases[phrase_id] = None
+        self._free_ids.append(phrase_id)
+
+    def _rescore(self, phrase_id: int):
+        """
+        Update the caches along every key of a phrase whose count changed
+        """
+        for position, suffix in self._suffixes(self._phrases[phrase_id][1]):
+            packed = phrase_id << POSITION_BITS | position
+            score = self._score(packed)
+            for node in self._path(suffix, create=False):
+                self._update_top(node, packed, score)
+
+    def _path(self, key: str, create: bool) -> List[_Node]:
+        """
+        Nodes from the root to the node for key, splitting edges as needed
+        when create is set. Returns an empty list if key is absent.
+        """
+        node = self._root
+        path = [node]
+        rest = key
+        while rest:
+            child = node.children.get(rest[0]) if node.children else None
+            if child is None:
+                if not create:
+                    return []
+                child = _Node(rest)
+                if node.children is None:
+                    node.children = {}
+                node.children[rest[0]] = child
+                path.append(child)
+                return path
+            shared = _common_prefix(child.label, rest)
+            if shared < len(child.label):
+                if not create:
+                    return []
+                middle = _Node(child.label[:shared])
+                middle.children = {child.label[shared]: child}
+                middle.size = child.size
+                middle.top = child.top
+                child.top = list(child.top) if child.top is not None else None
+                child.label = child.label[shared:]
+                node.children[rest[0]] = middle
+                child = middle
+            node = child
+            path.append(node)
+            rest = rest[shared:]
+        return path
+
+    def _set(self, key: str, packed: int, present: bool):
+        """
+        Add or remove one key of a phrase and update the sizes and caches
+        along its path
+        """
+        path = self._path(key, create=present)
+        if not path:
+            return
+        terminal = path[-1]
+        terminals = terminal.terminals
+        if present:
+            if terminals is None:
+                terminals = terminal.terminals = []
+            elif packed in terminals:
+                return
+            terminals.append(packed)
+            delta = 1
+        else:
+            if terminals is None or packed not in terminals:
+                return
+            terminals.remove(packed)
+            if not terminals:
+                terminal.terminals = None
+            delta = -1
+        self._keys += delta
+        score = self._score(packed) if present and not self._bulk else None
+        for node in path:
+            node.size += delta
+            if not self._bulk:
+                self._update_top(node, packed, score)
+        if not present:
+            self._prune(path)
+
+    @staticmethod
+    def _prune(path: List[_Node]):
+        """
+        Detach nodes left without keys or children at the end of path
+        """
+        for parent, node in zip(reversed(path[:-1]), reversed(path[1:])):
+            if node.terminals or node.children:
+                return
+            del parent.children[node.label[0]]
+            if not parent.children:
+                parent.children = None
+
+    @staticmethod
+    def _update_top(node: _Node, packed: int, score: Optional[float]):
+        """
+        Apply a key's new score, or its removal when score is None, to a
+        node's cache
+        """
+        top = node.top
+        if top is None:
+            return
+        if node.size <= CACHE_SIZE:
+            node.top = None
+            return
+        floor = top[-1][0]
+        for index, entry in enumerate(top):
+            if entry[1] == packed:
+                del top[index]
+                break
+        # Keys outside the cache score at most floor, so one scoring below
+        # it cannot be placed
+        if score is not None and score >= floor:
+            top.append((score, packed))
+            top.sort(reverse=True)
+            del top[CACHE_SIZE:]
+        if len(top) < TOP_K:
+            node.top = None
+
+    def _top(self, node: _Node) -> List[Entry]:
+        """
+        Best CACHE_SIZE entries below node, from its cache or merged from
+        its terminals and children
+        """
+        if node.top is not None:
+            return node.top
+        entries = [(self._score(packed), packed) for packed in node.terminals or ()]
+        for child in (node.children or {}).values():
+            entries.extend(self._top(child))
+        top = heapq.nlargest(CACHE_SIZE, entries)
+        if node.size > CACHE_SIZE:
+            node.top = top
+        return top
+
+    def _find(self, prefix: str) -> Optional[_Node]:
+        """
+        Node whose subtree holds exactly the keys starting with prefix
+        """
+        node = self._root
+        rest = prefix
+        while rest:
+            child = node.children.get(rest[0]) if node.children else None
+            if child is None:
+                return None
+            shared = _common_prefix(child.label, rest)
+            if shared < len(rest) and shared < len(child.label):
+                return None
+            node = child
+            rest = rest[shared:]
+        return node
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """
+        Up to limit (phrase ID, score) completions of a normalized prefix,
+        best first
+        """
+        node = self._find(prefix)
+        if node is None:
+            return []
+        results: Dict[int, float] = {}
+        for score, packed in self._top(node):
+            phrase_id = packed >> POSITION_BITS
+            if phrase_id not in results:
+                results[phrase_id] = score
+                if len(results) >= limit:
+                    break
+        return list(results.items())
+
+    def suggest(self, query: str, limit: int = 10, fuzzy: bool = True) -> List[Dict[str, Any]]:
+        """
+        Suggestions for partially typed text, best first. When fuzzy is
+        set and exact completions do not fill limit, the last word is
+        corrected to vocabulary words within a few edits of it and earlier
+        unknown words to their closest match.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        limit = min(limit, TOP_K)
+        scored: Dict[int, Tuple[float, int]] = {
+            phrase_id: (score, 0) for phrase_id, score in self.complete(" ".join(words), limit)
+        }
+
+        if fuzzy and len(scored) < limit:
+            head = []
+            head_edits = 0
+            for word in words[:-1]:
+                if word not in self._words:
+                    corrections = self._words.similar(word, limit=1)
+                    if corrections:
+                        word, distance = corrections[0]
+                        head_edits += distance
+                head.append(word)
+            lasts = [(words[-1], 0)] if head_edits else []
+            lasts.extend(self._words.similar(words[-1], prefix=True, limit=limit))
+            for last, distance in lasts:
+                edits = head_edits + distance
+                for phrase_id, score in self.complete(" ".join(head + [last]), limit):
+                    score *= FUZZY_WEIGHT ** edits
+                    if phrase_id not in scored or scored[phrase_id][0] < score:
+                        scored[phrase_id] = (score, edits)
+
+        best = heapq.nlargest(limit, scored.items(), key=lambda item: (item[1][0], -item[0]))
+        results = []
+        for phrase_id, (score, edits) in best:
+            kind, text = self._phrases[phrase_id]
+            recipes = self._title_recipes.get(phrase_id)
+            results.append({
+                "text": text,
+                "kind": kind,
+                "recipes": self._counts[phrase_id],
+                "recipe_id": next(iter(recipes)) if recipes and len(recipes) == 1 else None,
+                "score": round(score, 4),
+                "edits": edits,
+            })
+        return results
+
+
+# Shared index for the running application
+suggest_index = SuggestIndex()
@@ -0,0 +1,48 @@
+import pytest
+
+from attribute_store import AttributeStore, parse_filters
+
+
+def recipe(cuisine, calories, prep_time=None, cook_time=None):
+    return {"cuisine": cuisine, "nutrition": {"calories": calories}, "prep_time": prep_time, "cook_time": cook_time}
+
+
+def matching(store, text):
+    return sorted(store.recipe_ids(store.query(*parse_filters(text))))
+
+
+def test_filters_by_ranges_and_cuisine():
+    store = AttributeStore(capacity=2)
+    store.add("a", recipe("italian", 620, 10, 15))
+    store.add("b", recipe("indian", 480, 20, 30))
+    store.add("c", recipe("Italian", 320))
+
+    assert matching(store, "calories<500") == ["b", "c"]
+    assert matching(store, "calories<=620,cuisine=italian") == ["a", "c"]
+    assert matching(store, "total_time<30") == ["a"]
+    assert matching(store, "calories>100,calories<400") == ["c"]
+    assert matching(store, "cuisine=french") == []
+
+
+def test_writes_are_visible_before_the_sorted_index_is_rebuilt():
+    store = AttributeStore()
+    store.add("a", recipe("italian", 620))
+    assert matching(store, "calories>600") == ["a"]
+
+    store.add("a", recipe("italian", 300))
+    store.add("b", recipe("italian", 700))
+    assert matching(store, "calories>600") == ["b"]
+    store.remove("b")
+    assert matching(store, "calories>600") == []
+
+
+@pytest.mark.parametrize("text", ["calories<<5", "colour=red", "cuisine>italian", "protein>lots"])
+def test_rejects_malformed_filters(text):
+    with pytest.raises(ValueError):
+        parse_filters(text)
+
+
+def test_search_with_filters(client):
+    results = client.get("/api/search/", params={"filters": "calories<500"}).json()
+    assert sorted(result["id"] for result in results) == ["2", "3"]
+    assert client.get("/api/search/", params={"filters": "colour=red"}).status_code == 400
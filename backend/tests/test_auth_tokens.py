@@ -0,0 +1,119 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from fastapi.testclient import TestClient
+
+import auth_tokens
+from auth_tokens import TokenError, TokenVerifier
+
+PROJECT = "cookpilot-test"
+
+
+def key_pair():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken")])
+    now = datetime.now(timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+    return pem, certificate.public_bytes(serialization.Encoding.PEM).decode()
+
+
+SIGNING_KEY, CERTIFICATE = key_pair()
+OTHER_KEY, _ = key_pair()
+
+
+def token(key=SIGNING_KEY, kid="key-1", **claims):
+    now = int(time.time())
+    payload = {
+        "iss": f"https://securetoken.google.com/{PROJECT}",
+        "aud": PROJECT,
+        "sub": "user-1",
+        "iat": now,
+        "exp": now + 3600,
+        "auth_time": now,
+        **claims,
+    }
+    return jwt.encode(payload, key, algorithm="RS256", headers={"kid": kid})
+
+
+def verifier(fetch_certs=lambda: ({"key-1": CERTIFICATE}, 3600)):
+    return TokenVerifier(PROJECT, fetch_certs=fetch_certs)
+
+
+def verify(verifier, token):
+    return asyncio.run(verifier.verify(token))
+
+
+def test_accepts_a_valid_token():
+    assert verify(verifier(), token())["sub"] == "user-1"
+
+
+@pytest.mark.parametrize("bad_token", [
+    token(exp=int(time.time()) - 60),
+    token(aud="another-project"),
+    token(iss="https://securetoken.google.com/another-project"),
+    token(key=OTHER_KEY),
+    token(kid="unknown"),
+    token(sub=""),
+    "not.a.token",
+])
+def test_rejects_invalid_tokens(bad_token):
+    with pytest.raises(TokenError):
+        verify(verifier(), bad_token)
+
+
+def test_keeps_the_last_keys_while_a_refresh_fails(monkeypatch):
+    monkeypatch.setattr(auth_tokens, "MIN_FORCED_REFRESH_SECONDS", 0)
+    fetches = []
+
+    def fetch_certs():
+        fetches.append(time.monotonic())
+        if len(fetches) > 1:
+            raise OSError("network unreachable")
+        return {"key-1": CERTIFICATE}, 3600
+
+    tokens = verifier(fetch_certs)
+    assert verify(tokens, token())["sub"] == "user-1"
+    # An unknown key ID forces a refresh, which fails without dropping key-1
+    with pytest.raises(TokenError, match="unknown key"):
+        verify(tokens, token(kid="key-2"))
+    assert verify(tokens, token(sub="user-2"))["sub"] == "user-2"
+    assert len(fetches) == 2
+
+
+def test_fetch_errors_without_usable_keys_are_token_errors():
+    def fetch_certs():
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")
+
+    with pytest.raises(TokenError, match="Signing keys unavailable"):
+        verify(verifier(fetch_certs), token())
+
+
+def test_writes_require_a_valid_bearer_token(monkeypatch, recipe_payload):
+    from main import app
+
+    monkeypatch.setattr(auth_tokens, "token_verifier", verifier())
+    with TestClient(app) as client:
+        assert client.post("/api/recipes/", json=recipe_payload()).status_code == 401
+        assert client.post("/api/recipes/1/notes", json={"content": "hi"}).status_code == 401
+        assert client.delete("/api/recipes/1", headers={"Authorization": f"Bearer {token(aud='x')}"}).status_code == 401
+
+        response = client.post("/api/recipes/", json=recipe_payload(), headers={"Authorization": f"Bearer {token()}"})
+        assert response.status_code == 200
+        assert client.get("/api/recipes/1").status_code == 200
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+from benchmarks import harness, startup
+from benchmarks.catalog import generate_catalog
+from bulk import prepare_recipe
+
+
+def test_generated_catalog_is_deterministic_and_valid():
+    first = list(generate_catalog(50, seed=7))
+    assert first == list(generate_catalog(50, seed=7))
+    now = datetime.now(timezone.utc)
+    for recipe in first:
+        _, errors = prepare_recipe(recipe, now)
+        assert errors == []
+
+
+def test_summary_and_regression_check():
+    summary = harness.summarize([0.001] * 90 + [0.010] * 10, errors=2, elapsed=0.5)
+    assert summary["requests"] == 100
+    assert summary["p50_ms"] == 1.0
+    assert summary["p99_ms"] == 10.0
+    assert summary["rps"] == 200.0
+
+    baseline = {"runs": [{"size": 1000, "endpoints": {"search": {"p50_ms": 1.0, "p95_ms": 2.0}}}]}
+    current = {"runs": [{"size": 1000, "endpoints": {"search": {"p50_ms": 1.05, "p95_ms": 3.0}}}]}
+    [row] = harness.compare(current, baseline, threshold=0.1)
+    assert row["p50_ms_ratio"] == 1.05
+    assert row["regression"]
+
+
+def test_scaling_exponents_separate_constant_from_linear():
+    runs = [
+        {"size": size, "endpoints": {"get": {"p50_ms": 1.0}, "scan": {"p50_ms": size / 1000}}}
+        for size in (1000, 10000, 100000)
+    ]
+    exponents = harness.scaling_exponents(runs)
+    assert exponents["get"]["growth"] == "constant"
+    assert exponents["scan"]["exponent"] == pytest.approx(1.0)
+
+
+def test_startup_compare_flags_slower_imports():
+    current = {"imports": {"total_ms": 300.0}, "startup": {"ready_ms": 100.0}}
+    baseline = {"imports": {"total_ms": 200.0}, "startup": {"ready_ms": 100.0}}
+    rows = {row["metric"]: row for row in startup.compare(current, baseline, threshold=0.2)}
+    assert rows["import_total_ms"]["regression"]
+    assert not rows["ready_ms"]["regression"]
+
+
+def test_importing_the_app_defers_heavy_dependencies():
+    code = "import sys, main; print(sorted(name for name in ('jwt', 'PIL', 'firebase_admin') if name in sys.modules))"
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from cache import DELETED, CacheBackend, DictBackend, LRUCache, ResponseCache
+
+
+def test_lru_evicts_least_recently_used_and_expired_entries():
+    cache = LRUCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache.set("d", 4, ttl=-1)
+    assert cache.get("d") is None
+
+
+def test_entries_older_than_the_recipe_version_are_ignored():
+    async def scenario():
+        cache = ResponseCache(LRUCache())
+        await cache.put_recipe("1", {"id": "1", "version": 1})
+        assert (await cache.get_recipe("1")).version == 1
+
+        await cache.invalidate_recipe("1", 2)
+        assert await cache.get_recipe("1") is None
+        # A slow request that read version 1 before the write
+        await cache.put_recipe("1", {"id": "1", "version": 1})
+        assert await cache.get_recipe("1") is None
+        await cache.put_recipe("1", {"id": "1", "version": 2})
+        assert (await cache.get_recipe("1")).version == 2
+
+        await cache.invalidate_recipe("1")
+        await cache.put_recipe("1", {"id": "1", "version": 3})
+        assert await cache.get_recipe("1") is None
+        assert cache._versions.get("1") == DELETED
+
+    asyncio.run(scenario())
+
+
+def test_version_records_are_bounded():
+    async def scenario():
+        cache = ResponseCache(LRUCache(max_entries=10))
+        for number in range(100):
+            await cache.invalidate_recipe(str(number), 2)
+        assert len(cache._versions) == 10
+        await cache.put_recipe("99", {"version": 1})
+        assert await cache.get_recipe("99") is None
+
+    asyncio.run(scenario())
+
+
+def test_backends_must_implement_the_interface():
+    class Partial(CacheBackend):
+        async def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_instances_share_entries_through_the_shared_tier():
+    async def scenario():
+        shared = DictBackend()
+        first, second = ResponseCache(LRUCache(), shared), ResponseCache(LRUCache(), shared)
+        stored = await first.put_recipe("1", {"id": "1", "version": 1})
+        assert await second.get_recipe("1") == stored
+
+        # Another instance's write reaches this one through the change stream
+        await first.invalidate_recipe("1", 2)
+        await second.invalidate_recipe("1", 2)
+        assert await shared.get("recipe:1") is None
+        assert await second.get_recipe("1") is None
+
+        await shared.set("expired", b"x", ttl=-1)
+        assert await shared.get("expired") is None
+
+    asyncio.run(scenario())
+
+
+def test_search_entries_are_keyed_by_generation():
+    cache = ResponseCache(LRUCache())
+    generation = cache.generation
+    cache.put_search("q", [1])
+    assert cache.get_search("q") is not None
+
+    cache.recipe_created("9")
+    assert cache.get_search("q") is None
+    # Results built across a write are stored under the older generation
+    cache.put_search("q", [2], generation=generation)
+    assert cache.get_search("q") is None
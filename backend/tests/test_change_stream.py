@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+import change_stream
+import derived_state
+from change_stream import ChangeSubscriber, InMemoryChangeSource, RecipeChangeHandler, ResumeTokenLost, create_subscriber
+from ingredient_index import ingredient_index
+from memory_store import InMemoryDatabase
+from repository import RecipeRepository
+
+CARBONARA = {
+    "_id": "r1",
+    "title": "Carbonara",
+    "servings": 4,
+    "ingredients": [{"name": "Spaghetti"}, {"name": "Pancetta"}],
+    "version": 1,
+}
+
+
+def update(document, updated_fields):
+    return {
+        "operationType": "update",
+        "documentKey": {"_id": document["_id"]},
+        "fullDocument": document,
+        "updateDescription": {"updatedFields": updated_fields, "removedFields": []},
+    }
+
+
+async def until(condition):
+    for _ in range(1000):
+        if condition():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("condition not reached")
+
+
+def matches(ingredient):
+    return [result["id"] for result in ingredient_index.match([ingredient])]
+
+
+def test_updates_from_other_instances_reach_the_ingredient_index():
+    async def scenario():
+        derived_state.clear()
+        derived_state.index_recipe("r1", {"id": "r1", **CARBONARA})
+        source = InMemoryChangeSource()
+        subscriber = ChangeSubscriber(source, [RecipeChangeHandler(RecipeRepository(InMemoryDatabase().recipes))])
+        task = asyncio.create_task(subscriber.run(await subscriber.checkpoint()))
+        try:
+            # Fields the indexes are not built from leave them alone
+            unindexed = {**CARBONARA, "steps": [{"order": 1}], "ingredients": [{"name": "Saffron"}], "version": 2}
+            token = await source.publish("recipes", update(unindexed, {"steps": [{"order": 1}]}))
+            await until(lambda: subscriber.tokens.get("recipes") == token)
+            assert matches("saffron") == []
+
+            guanciale = {**CARBONARA, "ingredients": [{"name": "Spaghetti"}, {"name": "Guanciale"}], "version": 3}
+            await source.publish("recipes", update(guanciale, {"ingredients.1.name": "Guanciale"}))
+            await until(lambda: matches("guanciale") == ["r1"])
+            assert matches("pancetta") == []
+        finally:
+            task.cancel()
+            derived_state.clear()
+
+    asyncio.run(scenario())
+
+
+def test_resuming_from_a_token_no_longer_in_the_history_fails():
+    async def scenario():
+        source = InMemoryChangeSource(history_size=2)
+        start = await source.checkpoint("recipes")
+        for _ in range(3):
+            await source.publish("recipes", update(CARBONARA, {"title": "Carbonara"}))
+        async for _ in source.watch("recipes", start):
+            pass
+
+    with pytest.raises(ResumeTokenLost):
+        asyncio.run(scenario())
+
+
+class PausedCatalog:
+    """
+    Repository whose catalog scan waits for resume after its first recipe
+    """
+
+    def __init__(self, *recipes):
+        self.recipes = recipes
+        self.resume = asyncio.Event()
+
+    async def iter_recipes(self, projection=None):
+        for number, recipe in enumerate(self.recipes):
+            if number == 1:
+                await self.resume.wait()
+            yield recipe
+
+
+def test_rebuilds_keep_the_current_structures_serving(monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(derived_state, "ready", asyncio.Event())
+        derived_state.clear()
+        derived_state.index_recipe("r1", {"id": "r1", **CARBONARA})
+        derived_state.ready.set()
+
+        omelette = {"id": "r2", "title": "Omelette", "ingredients": [{"name": "Eggs"}]}
+        toast = {"id": "r3", "title": "Toast", "ingredients": [{"name": "Bread"}]}
+        catalog = PausedCatalog(omelette, toast)
+        rebuild = asyncio.create_task(derived_state.rebuild(catalog))
+        try:
+            await until(lambda: derived_state._rebuilding is not None)
+            assert derived_state.ready.is_set()
+            assert matches("pancetta") == ["r1"]
+            assert matches("eggs") == []
+
+            derived_state.index_recipe("r4", {"id": "r4", "title": "Salad", "ingredients": [{"name": "Lettuce"}]})
+            catalog.resume.set()
+            await rebuild
+        finally:
+            rebuild.cancel()
+
+        assert matches("pancetta") == []
+        assert matches("eggs") == ["r2"]
+        assert matches("bread") == ["r3"]
+        assert matches("lettuce") == ["r4"]
+        derived_state.clear()
+
+    asyncio.run(scenario())
+
+
+def test_the_memory_store_has_no_subscriber(monkeypatch):
+    monkeypatch.setattr(change_stream, "CHANGE_STREAMS", True)
+    database = InMemoryDatabase()
+    assert create_subscriber(database, RecipeRepository(database.recipes)) is None
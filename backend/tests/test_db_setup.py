@@ -0,0 +1,27 @@
+from db_setup import INDEXES, plan_stages
+
+
+def test_plan_stages_walks_nested_plans():
+    plan = {
+        "stage": "LIMIT",
+        "inputStage": {
+            "stage": "FETCH",
+            "inputStage": {"stage": "OR", "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}]},
+        },
+    }
+    assert list(plan_stages(plan)) == ["LIMIT", "FETCH", "OR", "IXSCAN", "COLLSCAN"]
+
+
+def test_pagination_index_matches_the_page_sort():
+    from repository import PAGE_SORT
+
+    keys = [index["keys"] for index in INDEXES["recipes"]]
+    assert [tuple(key) for key in PAGE_SORT] in [[tuple(key) for key in index] for index in keys]
+
+
+def test_connects_to_the_configured_database(monkeypatch):
+    import db_setup
+
+    monkeypatch.setattr(db_setup, "DB_NAME", "cookpilot_staging")
+    monkeypatch.setattr(db_setup, "MongoClient", lambda uri: {"cookpilot_staging": "staging database"})
+    assert db_setup.connect() == "staging database"
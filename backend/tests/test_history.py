@@ -0,0 +1,51 @@
+import asyncio
+import copy
+import random
+
+import history
+from history import RecipeHistory, apply, diff
+from memory_store import InMemoryDatabase
+
+
+def test_diff_stores_only_what_changed():
+    old = {"title": "Carbonara", "steps": ["boil", "fry", "mix"], "tags": ["pasta"], "servings": 4}
+    new = {"title": "Carbonara", "steps": ["boil", "crisp", "mix"], "tags": ["pasta", "quick"], "cuisine": "italian"}
+    ops = diff(old, new)
+    assert ops == [
+        ["u", ["servings"]],
+        ["s", ["steps", 1], "crisp"],
+        ["r", ["tags"], 1, 1, ["quick"]],
+        ["s", ["cuisine"], "italian"],
+    ]
+    assert apply(copy.deepcopy(old), ops) == new
+
+
+def test_rebuilds_every_version_across_snapshots(monkeypatch):
+    monkeypatch.setattr(history, "SNAPSHOT_INTERVAL", 4)
+    rng = random.Random(3)
+
+    async def scenario():
+        versions = RecipeHistory(InMemoryDatabase().recipe_versions)
+        current = {"id": "r", "version": 1, "title": "v1", "steps": ["a"]}
+        states = {1: copy.deepcopy(current)}
+        for version in range(2, 15):
+            updated = copy.deepcopy(current)
+            updated["version"] = version
+            updated["title"] = f"v{version}"
+            updated["steps"].insert(rng.randrange(len(updated["steps"]) + 1), f"step {version}")
+            if rng.random() < 0.3:
+                if "note" in updated:
+                    del updated["note"]
+                else:
+                    updated["note"] = version
+            await versions.record(current, updated)
+            current = states[version] = updated
+
+        for version, state in states.items():
+            assert await versions.rebuild(current, version) == state
+        assert await versions.rebuild(current, 15) is None
+
+        await versions.delete("r")
+        assert await versions.rebuild(current, 3) is None
+
+    asyncio.run(scenario())
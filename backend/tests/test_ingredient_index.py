@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+import ingredient_index
+from ingredient_index import IngredientIndex
+
+
+def recipe(*ingredients):
+    return {"ingredients": [{"name": name} for name in ingredients]}
+
+
+@pytest.fixture
+def index():
+    index = IngredientIndex()
+    index.add("carbonara", recipe("Spaghetti", "Eggs", "Pancetta", "Black pepper"))
+    index.add("omelette", recipe("Eggs", "Butter"))
+    index.add("toast", recipe("Bread", "Butter", "Avocado"))
+    return index
+
+
+def ids(results):
+    return [result["id"] for result in results]
+
+
+def test_ranks_by_pantry_coverage(index):
+    results = index.match(["eggs", "butter"])
+    assert ids(results) == ["omelette", "toast", "carbonara"]
+    assert results[0]["coverage"] == 1.0
+    assert results[2]["missing_ingredients"] == ["Spaghetti", "Pancetta", "Black pepper"]
+
+
+def test_all_mode_and_missing_limits(index):
+    assert ids(index.match(["eggs", "butter"], mode="all")) == ["omelette"]
+    assert ids(index.match(["eggs"], max_missing=1)) == ["omelette"]
+    assert ids(index.match(["butter", "bread"], min_coverage=0.6)) == ["toast"]
+
+
+def test_partial_names_resolve_to_vocabulary_entries(index):
+    assert ids(index.match(["pepper"])) == ["carbonara"]
+    assert index.match(["saffron"]) == []
+
+
+def test_remove_and_replace(index):
+    assert index.remove("omelette")
+    assert not index.remove("omelette")
+    assert ids(index.match(["eggs"])) == ["carbonara"]
+
+    index.add("carbonara", recipe("Spaghetti", "Guanciale"))
+    assert index.match(["eggs"]) == []
+    assert ids(index.match(["guanciale"])) == ["carbonara"]
+    assert index.vocabulary_size == 5
+
+    index.add("omelette", recipe("Eggs", "Chives"))
+    assert ids(index.match(["eggs", "chives"], mode="all")) == ["omelette"]
+
+
+def test_ingredient_search_endpoint(client):
+    results = client.get("/api/search/ingredients", params={"ingredients": "eggs,spaghetti", "match": "all"}).json()
+    assert [result["id"] for result in results] == ["1"]
+
+
+def test_removals_are_compacted_without_changing_results(monkeypatch):
+    monkeypatch.setattr(ingredient_index, "COMPACT_THRESHOLD", 8)
+    rng = random.Random(5)
+    pantry = ["eggs", "butter", "flour", "milk", "sugar", "salt", "lemon", "rice"]
+    index = IngredientIndex()
+    recipes = {}
+    for step in range(600):
+        recipe_id = f"r{rng.randrange(40)}"
+        if recipe_id in recipes and rng.random() < 0.5:
+            assert index.remove(recipe_id)
+            del recipes[recipe_id]
+        else:
+            recipes[recipe_id] = rng.sample(pantry, rng.randint(1, 4))
+            index.add(recipe_id, recipe(*recipes[recipe_id]))
+
+        if step % 50 == 0:
+            wanted = rng.sample(pantry, 2)
+            expected = {recipe_id for recipe_id, names in recipes.items() if set(wanted) <= set(names)}
+            assert set(ids(index.match(wanted, mode="all", limit=100))) == expected
+
+    # Dead rows were freed and reused, and the tombstones stay bounded
+    assert len(index._recipe_ids) < 80
+    assert index._tombstones < max(8, ingredient_index.COMPACT_FRACTION * index._posting_count) + 4
+    index.compact()
+    assert index._posting_count == sum(len(set(names)) for names in recipes.values())
+    assert index.vocabulary_size == len({name for names in recipes.values() for name in names})
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from pymongo.errors import WriteError
+
+from loader import BatchLoader, BatchWriter
+
+
+def test_concurrent_loads_share_one_fetch():
+    batches = []
+
+    async def fetch(keys):
+        batches.append(sorted(keys))
+        return {key: key.upper() for key in keys if key != "missing"}
+
+    async def scenario():
+        loader = BatchLoader("test", fetch, window=0.001)
+        return await asyncio.gather(*(loader.load(key) for key in ("a", "b", "a", "missing")))
+
+    assert asyncio.run(scenario()) == ["A", "B", "A", None]
+    assert batches == [["a", "b", "missing"]]
+
+
+def test_writer_batches_items_and_fails_only_rejected_ones():
+    batches = []
+
+    async def write(items):
+        batches.append(list(items))
+        return {index: WriteError("rejected") for index, item in enumerate(items) if item < 0}
+
+    async def scenario():
+        writer = BatchWriter("test", write, window=0.001, max_batch=3)
+        results = await asyncio.gather(*(writer.submit(item) for item in (1, -2, 3, 4)), return_exceptions=True)
+        await writer.drain()
+        return results
+
+    results = asyncio.run(scenario())
+    assert batches == [[1, -2, 3], [4]]
+    assert results[0] is None and results[2] is None and results[3] is None
+    assert isinstance(results[1], WriteError)
+
+
+def test_fetch_errors_reach_every_waiter():
+    async def fetch(keys):
+        raise RuntimeError("down")
+
+    async def scenario():
+        loader = BatchLoader("test", fetch, window=0.001)
+        await asyncio.gather(loader.load("a"), loader.load("b"))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scenario())
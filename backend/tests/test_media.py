@@ -0,0 +1,70 @@
+import os
+import shutil
+
+import numpy as np
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import media
+from media import blurhash, process_image, recipe_media, source_path
+
+
+def write_image(directory, name, size=(800, 600)):
+    path = os.path.join(directory, name)
+    gradient = np.linspace(0, 255, size[0], dtype=np.uint8)
+    pixels = np.stack([np.tile(gradient, (size[1], 1))] * 3, axis=-1)
+    Image.fromarray(pixels).save(path)
+    return path
+
+
+def test_source_paths_stay_inside_the_upload_directory(upload_dir):
+    assert source_path("photos/a.jpg") == os.path.join(upload_dir, "photos", "a.jpg")
+    assert source_path("../../etc/passwd") is None
+    assert recipe_media({"media": ["a", "b"], "steps": [{"media": ["b", "c"]}, {}]}) == ["a", "b", "c"]
+
+
+def test_blurhash_matches_the_reference_encoder():
+    y, x = np.mgrid[0:24, 0:32]
+    pixels = np.stack([x * 8, y * 10, (x + y) * 4], axis=-1).astype(np.uint8)
+    # blurhash.encode(pixels, 4, 3) of the blurhash package
+    assert blurhash(pixels, (4, 3)) == "LxH27b2kwzX5mAWYjuf7gKfkfQfj"
+
+
+def test_variants_are_written_once_per_width_and_format(upload_dir):
+    path = write_image(upload_dir, "gradient.png")
+    first = process_image(path, ("webp",))
+    widths = [variant["width"] for variant in first["variants"]]
+    assert widths == [width for width in media.MEDIA_WIDTHS if width < 800] + [800]
+    assert first["variants"][0]["height"] == round(600 * widths[0] / 800)
+    assert all(os.path.exists(os.path.join(media.MEDIA_VARIANT_DIR, variant["url"].removeprefix(media.MEDIA_URL + "/"))) for variant in first["variants"])
+    assert process_image(path, ("webp",)) == first
+
+
+def test_ingest_embeds_thumbnails_in_lists(client, upload_dir):
+    write_image(upload_dir, "carbonara.png")
+    client.put("/api/recipes/1", json={"media": ["carbonara.png", "missing.png"]})
+
+    manifest = client.post("/api/media/recipes/1").json()
+    assert manifest["missing"] == ["missing.png"]
+    [image] = manifest["images"]
+    assert image["thumbnail"]["width"] == media.THUMBNAIL_WIDTH
+
+    listed = client.get("/api/recipes/").json()[0]
+    assert listed["thumbnail"] == image["thumbnail"]
+    assert listed["media"] == ["carbonara.png", "missing.png"]
+    [found] = client.get("/api/search/", params={"query": "carbonara"}).json()
+    assert found["media"] == listed["media"] and found["thumbnail"] == image["thumbnail"]
+    variant = client.get(image["thumbnail"]["url"])
+    assert variant.status_code == 200
+    assert "immutable" in variant.headers["cache-control"]
+    assert client.get("/api/media/recipes/2").status_code == 404
+
+
+def test_missing_variants_are_a_404_before_the_first_ingest():
+    from main import app
+
+    shutil.rmtree(media.MEDIA_VARIANT_DIR, ignore_errors=True)
+    # The mount checks its directory once, on its first request
+    next(route.app for route in app.routes if getattr(route, "name", None) == "media").config_checked = False
+    with TestClient(app) as client:
+        assert client.get(f"{media.MEDIA_URL}/missing.webp").status_code == 404
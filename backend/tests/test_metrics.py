@@ -0,0 +1,30 @@
+import re
+
+
+def test_requests_are_reported_by_route_template(client):
+    client.get("/api/recipes/1")
+    client.get("/api/recipes/2")
+
+    text = client.get("/metrics").text
+    counts = re.findall(
+        r'^http_request_duration_seconds_count\{method="GET",route="/api/recipes/\{recipe_id\}",status="200"\} (\d+)',
+        text,
+        re.MULTILINE,
+    )
+    assert counts and int(counts[0]) >= 2
+    assert "/api/recipes/1\"" not in text
+    assert re.search(r"^process_start_time_seconds \d", text, re.MULTILINE)
+
+
+def test_route_labels_do_not_depend_on_parameter_values(client):
+    client.get("/api/recipes/1/versions/1")
+    client.get("/api/recipes/recipes")
+    client.get("/no/such/route")
+
+    routes = set(re.findall(r'^http_request_duration_seconds_count\{method="GET",route="([^"]*)"', client.get("/metrics").text, re.MULTILINE))
+    assert {"/api/recipes/{recipe_id}/versions/{version}", "/api/recipes/{recipe_id}", "unmatched"} <= routes
+    assert not any("{version}/versions" in route or route.startswith("/api/{") for route in routes)
+
+
+def test_unknown_profile_is_a_404(client):
+    assert client.get("/metrics/profiles/missing").status_code == 404
@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import notes
+from memory_store import InMemoryDatabase
+from notes import NoteService
+
+
+def test_notes_are_served_newest_first(client):
+    for number in range(3):
+        response = client.post("/api/recipes/1/notes", json={"content": f"note {number}"})
+        assert response.status_code == 201
+    listed = client.get("/api/recipes/1/notes", params={"limit": 2}).json()
+    assert [note["content"] for note in listed] == ["note 2", "note 1"]
+    assert client.post("/api/recipes/1/notes", json={"content": ""}).status_code == 422
+
+
+def test_notes_are_posted_as_the_signed_in_user(client):
+    response = client.post("/api/recipes/1/notes", json={"user_id": "someone-else", "content": "mine"})
+    assert response.json()["user_id"] == "test-user"
+
+
+def test_concurrent_writes_share_an_insert_and_keep_the_buffer_bounded(monkeypatch):
+    monkeypatch.setattr(notes, "NOTES_RECENT_LIMIT", 5)
+
+    async def scenario():
+        collection = InMemoryDatabase().notes
+        inserts = []
+        insert_many = collection.insert_many
+
+        async def counting_insert_many(documents, **kwargs):
+            inserts.append(len(documents))
+            return await insert_many(documents, **kwargs)
+
+        collection.insert_many = counting_insert_many
+        service = NoteService(collection)
+        await service.recent("r")
+        await asyncio.gather(*(service.add("r", "cook", f"note {number}") for number in range(20)))
+        await service.close()
+
+        recent = await service.recent("r")
+        assert [note["content"] for note in recent] == [f"note {number}" for number in range(19, 14, -1)]
+        assert sum(inserts) == 20 and len(inserts) < 20
+
+        # A cold buffer loads the same notes from the collection
+        service.forget("r")
+        assert [note["id"] for note in await service.recent("r")] == [note["id"] for note in recent]
+
+    asyncio.run(scenario())
+
+
+def test_live_stream_replays_missed_notes():
+    async def scenario():
+        service = NoteService(InMemoryDatabase().notes)
+        first = await service.add("r", "cook", "first")
+        queue = service.subscribe("r")
+        second = await service.add("r", "cook", "second")
+        # Change events for a note this process wrote are not sent twice
+        service.publish(second)
+        assert queue.get_nowait() == second
+        assert queue.empty()
+        service.unsubscribe("r", queue)
+        await service.close()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    from routers.notes import _event
+
+    lines = _event(second).decode().splitlines()
+    assert lines[0] == f"id: {second['id']}"
+    assert json.loads(lines[2].removeprefix("data: "))["content"] == "second"
+    assert first["id"] < second["id"]
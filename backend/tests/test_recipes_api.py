@@ -0,0 +1,136 @@
+import json
+
+from bson import ObjectId
+
+
+def test_crud_round_trip(client, recipe_payload):
+    created = client.post("/api/recipes/", json=recipe_payload())
+    assert created.status_code == 200
+    recipe_id = created.json()["id"]
+    assert ObjectId.is_valid(recipe_id)
+
+    recipe = client.get(f"/api/recipes/{recipe_id}").json()
+    assert recipe["title"] == "Lemon Risotto"
+    assert recipe["version"] == 1
+
+    updated = client.put(f"/api/recipes/{recipe_id}", json={"title": "Lemon Barley Risotto"})
+    assert updated.json()["version"] == 2
+    assert client.get(f"/api/recipes/{recipe_id}").json()["title"] == "Lemon Barley Risotto"
+
+    assert client.delete(f"/api/recipes/{recipe_id}").status_code == 200
+    assert client.get(f"/api/recipes/{recipe_id}").status_code == 404
+    assert client.delete(f"/api/recipes/{recipe_id}").status_code == 404
+
+
+def test_rejects_empty_and_unknown_updates(client):
+    assert client.put("/api/recipes/1", json={}).status_code == 400
+    assert client.put("/api/recipes/missing", json={"title": "Nothing"}).status_code == 404
+
+
+def test_pages_follow_the_cursor(client, recipe_payload):
+    for number in range(4):
+        client.post("/api/recipes/", json=recipe_payload(f"Risotto {number}"))
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/recipes/", params=params)
+        seen.extend(recipe["title"] for recipe in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+    assert len(seen) == 7
+    assert seen[-4:] == [f"Risotto {number}" for number in range(4)]
+
+    assert client.get("/api/recipes/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_field_projection(client):
+    recipes = client.get("/api/recipes/", params={"fields": "id,title,media[0]"}).json()
+    assert recipes[0] == {
+        "id": "1",
+        "title": "Spaghetti Carbonara",
+        "media": ["https://images.unsplash.com/photo-1612874742237-6526221588e3"],
+    }
+    assert client.get("/api/recipes/", params={"fields": "id,secret"}).status_code == 400
+
+
+def test_export_then_import_reports_bad_lines(client):
+    exported = client.get("/api/recipes/export")
+    assert exported.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in exported.text.splitlines()]
+    assert [record["id"] for record in records] == ["1", "2", "3"]
+
+    valid = {key: value for key, value in records[0].items() if key != "id"}
+    body = "\n".join([
+        json.dumps({**valid, "title": "Imported carbonara"}),
+        "{not json",
+        json.dumps({**valid, "servings": "four"}),
+        json.dumps(records[1]),
+    ]).encode()
+    report = client.post("/api/recipes/import", content=body).json()
+    assert report["inserted"] == 1
+    assert report["failed"] == 3
+    assert [error["line"] for error in report["errors"]] == [2, 3, 4]
+    assert "Invalid JSON" in report["errors"][0]["error"]
+
+    results = client.get("/api/search/", params={"query": "imported"}).json()
+    assert [result["title"] for result in results] == ["Imported carbonara"]
+
+
+def test_etag_revalidation(client):
+    first = client.get("/api/recipes/1")
+    etag = first.headers["etag"]
+
+    cached = client.get("/api/recipes/1", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    client.put("/api/recipes/1", json={"servings": 6})
+    changed = client.get("/api/recipes/1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["servings"] == 6
+    assert changed.headers["etag"] != etag
+
+
+def test_batch_fetch_keeps_order_and_reports_missing(client):
+    batch = client.post("/api/recipes/batch", json={"ids": ["3", "missing", "1", "3"], "fields": "id,title"}).json()
+    assert [recipe["id"] for recipe in batch["recipes"]] == ["3", "1"]
+    assert batch["recipes"][0] == {"id": "3", "title": "Avocado Toast"}
+    assert batch["missing"] == ["missing"]
+
+
+def test_version_history_and_conflicts(client):
+    titles = ["Carbonara", "Carbonara Romana", "Carbonara Romana"]
+    for title in titles[1:]:
+        client.put("/api/recipes/1", json={"title": title, "ingredients": [{"name": "Guanciale", "quantity": 150.0, "unit": "g"}]})
+    client.put("/api/recipes/1", json={"title": "Carbonara classica"})
+
+    first = client.get("/api/recipes/1/versions/1").json()
+    assert first["title"] == "Spaghetti Carbonara"
+    assert len(first["ingredients"]) == 6
+    assert client.get("/api/recipes/1/versions/2").json()["title"] == "Carbonara Romana"
+    assert client.get("/api/recipes/1/versions/4").json()["title"] == "Carbonara classica"
+    assert client.get("/api/recipes/1/versions/5").status_code == 404
+
+    stale = client.put("/api/recipes/1", params={"base_version": 3}, json={"title": "Stale edit"})
+    assert stale.status_code == 409
+    fresh = client.put("/api/recipes/1", params={"base_version": 4}, json={"title": "Fresh edit"})
+    assert fresh.json()["version"] == 5
+
+
+def test_object_ids_are_found_in_any_case(client, recipe_payload):
+    recipe_id = client.post("/api/recipes/", json=recipe_payload()).json()["id"]
+    upper = recipe_id.upper()
+
+    batch = client.post("/api/recipes/batch", json={"ids": [upper, "missing"]}).json()
+    assert [recipe["id"] for recipe in batch["recipes"]] == [recipe_id]
+    assert batch["missing"] == ["missing"]
+    assert client.get(f"/api/recipes/{upper}").json()["id"] == recipe_id
+    menu = client.post("/api/scaling/batch", json={"items": [{"recipe_id": upper, "servings": 4}]})
+    assert menu.status_code == 200
+
+    # Entries cached through either spelling follow later writes
+    client.put(f"/api/recipes/{recipe_id}", json={"title": "Renamed"})
+    assert client.get(f"/api/recipes/{upper}").json()["title"] == "Renamed"
+    assert client.post("/api/recipes/batch", json={"ids": [upper]}).json()["recipes"][0]["title"] == "Renamed"
@@ -0,0 +1,77 @@
+import pytest
+
+from scaling import ScaledBatch, canonical_unit
+
+RISOTTO = {
+    "id": "r",
+    "servings": 2,
+    "prep_time": 10,
+    "cook_time": 20,
+    "ingredients": [
+        {"name": "Rice", "quantity": 300.0, "unit": "g"},
+        {"name": "Stock", "quantity": 0.5, "unit": "l"},
+        {"name": "Eggs", "quantity": 2.0, "unit": ""},
+    ],
+    "scaling_factors": {"waste": 0.2, "shrinkage": 0.5, "time_adjustment": 0.5},
+}
+
+
+def test_canonical_units():
+    assert canonical_unit("Tbsp.") == ("ml", 14.7868)
+    assert canonical_unit("kg") == ("g", 1000.0)
+    assert canonical_unit("piece") == ("pcs", 1.0)
+
+
+def test_scales_quantities_waste_and_times():
+    yields = ScaledBatch([RISOTTO], [[2, 8]]).recipe_yields(0)
+    base, large = yields
+
+    assert base["ingredients"][0] == {
+        "name": "Rice", "quantity": 300.0, "unit": "g", "purchase_quantity": 375.0, "purchase_unit": "g",
+    }
+    assert base["cooked_yield_g"] == 150.0
+    # Four times the servings: 1200 g is shown in kg, times grow by 4 ** 0.5
+    assert large["ingredients"][0]["quantity"] == 1.2
+    assert large["ingredients"][0]["unit"] == "kg"
+    assert large["ingredients"][1]["quantity"] == 2.0
+    assert large["ingredients"][1]["unit"] == "l"
+    assert large["ingredients"][2] == {
+        "name": "Eggs", "quantity": 8.0, "unit": "pcs", "purchase_quantity": 10.0, "purchase_unit": "pcs",
+    }
+    assert (large["prep_time"], large["cook_time"]) == (20, 40)
+
+
+def test_shopping_list_merges_ingredients_across_recipes():
+    omelette = {"id": "o", "servings": 1, "ingredients": [{"name": "eggs", "quantity": 3.0, "unit": "pcs"}]}
+    shopping = ScaledBatch([RISOTTO, omelette], [[2], [2]]).shopping_list()
+    eggs = next(item for item in shopping if item["name"] == "Eggs")
+    assert eggs["quantity"] == pytest.approx(8.5)
+    assert eggs["recipes"] == ["o", "r"]
+
+
+def test_scaling_endpoints(client):
+    scaled = client.post("/api/scaling/1", json={"yields": [8]}).json()
+    assert scaled["base_servings"] == 4
+    assert scaled["yields"][0]["ingredients"][0]["quantity"] == 800.0
+
+    menu = client.post("/api/scaling/batch", json={"items": [{"recipe_id": "1", "servings": 2}, {"recipe_id": "2", "servings": 8}]}).json()
+    salt = next(item for item in menu["shopping_list"] if item["name"] == "Salt")
+    assert salt["recipes"] == ["1", "2"]
+    assert client.post("/api/scaling/batch", json={"items": [{"recipe_id": "missing", "servings": 2}]}).status_code == 404
+
+
+def test_recipes_without_ingredients_scale_to_empty_lists():
+    batch = ScaledBatch([{"id": "e", "servings": 2, "ingredients": []}], [[4]])
+    assert batch.recipe_yields(0)[0]["ingredients"] == []
+    assert batch.shopping_list() == []
+
+
+def test_scaling_a_recipe_without_ingredients(client):
+    client.put("/api/recipes/3", json={"ingredients": []})
+    scaled = client.post("/api/scaling/3", json={"yields": [2]})
+    assert scaled.status_code == 200
+    assert scaled.json()["yields"][0]["ingredients"] == []
+
+    menu = client.post("/api/scaling/batch", json={"items": [{"recipe_id": "3", "servings": 2}]})
+    assert menu.status_code == 200
+    assert menu.json()["shopping_list"] == []
@@ -0,0 +1,105 @@
+from fuzzy import TrigramIndex
+from search_index import SearchIndex
+from suggest_index import SuggestIndex
+
+
+def recipe(title, *ingredients, tags=()):
+    return {"title": title, "ingredients": [{"name": name} for name in ingredients], "tags": list(tags)}
+
+
+def test_bm25_ranks_rarer_and_denser_matches_first():
+    index = SearchIndex()
+    index.add("a", recipe("Tomato soup", "Tomato", "Basil"))
+    index.add("b", recipe("Tomato tomato salad", "Tomato"))
+    index.add("c", recipe("Basil pesto", "Basil", "Pine nuts"))
+
+    ranked = [recipe_id for recipe_id, _ in index.search("tomato", prefix=False, fuzzy=False)]
+    assert ranked == ["b", "a"]
+    # "pesto" occurs in one recipe only, so it outweighs the shared "basil"
+    assert index.search("basil pesto", prefix=False, fuzzy=False)[0][0] == "c"
+
+
+def test_search_respects_prefix_allowed_and_removal():
+    index = SearchIndex()
+    index.add("a", recipe("Carbonara", "Spaghetti"))
+    index.add("b", recipe("Spaghetti bolognese", "Spaghetti"))
+
+    assert {recipe_id for recipe_id, _ in index.search("spag")} == {"a", "b"}
+    assert index.search("spag", prefix=False, fuzzy=False) == []
+    assert [recipe_id for recipe_id, _ in index.search("spaghetti", allowed={"b"})] == ["b"]
+
+    assert index.remove("b")
+    assert "b" not in index
+    assert [recipe_id for recipe_id, _ in index.search("spaghetti")] == ["a"]
+
+
+def test_fuzzy_search_corrects_typos():
+    index = SearchIndex()
+    index.add("a", recipe("Spaghetti carbonara", "Spaghetti"))
+
+    assert index.search("carbonra", fuzzy=False) == []
+    assert [recipe_id for recipe_id, _ in index.search("carbonra")] == ["a"]
+
+
+def test_trigram_index_finds_words_within_edit_distance():
+    words = TrigramIndex()
+    for word in ("carbonara", "cardamom", "carrot"):
+        words.add(word)
+
+    assert words.similar("carbonra")[0] == ("carbonara", 1)
+    assert words.similar("carbonara") == []
+    words.remove("carbonara")
+    assert words.similar("carbonra") == []
+
+
+def test_suggest_completes_prefixes_and_corrects_the_last_word():
+    index = SuggestIndex()
+    index.add("1", recipe("Chicken Tikka Masala", "Chicken", "Garam masala", tags=["indian"]))
+    index.add("2", recipe("Chicken Curry", "Chicken", tags=["indian"]))
+
+    texts = [suggestion["text"] for suggestion in index.suggest("chick", fuzzy=False)]
+    assert texts[0] == "chicken"
+    assert "chicken tikka masala" in texts
+
+    corrected = index.suggest("chicken tika")
+    assert corrected[0]["text"] == "chicken tikka masala"
+    assert corrected[0]["edits"] == 1
+    assert corrected[0]["recipe_id"] == "1"
+
+    index.remove("1")
+    assert all(suggestion["text"] != "chicken tikka masala" for suggestion in index.suggest("chicken tika"))
+
+
+def test_suggest_warns_once_when_full(caplog):
+    index = SuggestIndex(max_keys=3)
+    index.add("1", recipe("Chicken Curry"))
+    index.add("2", recipe("Lemon Tart"))
+    index.add("3", recipe("Beef Stew"))
+
+    assert index.key_count == 2
+    assert index.skipped == 2
+    assert [record.levelname for record in caplog.records] == ["WARNING"]
+    assert "SUGGEST_MAX_KEYS" in caplog.text
+
+
+def test_search_endpoints(client):
+    results = client.get("/api/search/", params={"query": "carbonra"}).json()
+    assert results[0]["id"] == "1"
+
+    suggestions = client.get("/api/search/suggest", params={"q": "spag"}).json()
+    assert {"spaghetti", "spaghetti carbonara"} <= {suggestion["text"] for suggestion in suggestions}
+
+
+def test_suggestions_built_across_a_write_are_not_cached(client, monkeypatch):
+    from cache import response_cache
+    from suggest_index import suggest_index
+
+    suggest = suggest_index.suggest
+
+    def suggest_during_a_write(*args, **kwargs):
+        response_cache.recipe_created("9")
+        return suggest(*args, **kwargs)
+
+    monkeypatch.setattr(suggest_index, "suggest", suggest_during_a_write)
+    client.get("/api/search/suggest", params={"q": "avo"})
+    assert response_cache.get_search("suggest:avo:10:True") is None
@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import orjson
+from bson import ObjectId
+
+from serialization import dumps, dumps_line
+
+
+def test_encodes_datetimes_object_ids_and_numpy_values():
+    key = ObjectId()
+    content = {
+        "id": key,
+        "at": datetime(2025, 4, 6, 12, 0, tzinfo=timezone.utc),
+        "values": np.array([1.5, 2.0]),
+        "count": np.int64(3),
+    }
+    assert orjson.loads(dumps(content)) == {
+        "id": str(key),
+        "at": "2025-04-06T12:00:00+00:00",
+        "values": [1.5, 2.0],
+        "count": 3,
+    }
+    assert dumps_line([1]) == b"[1]\n"
+
+
+def test_list_responses_match_their_response_model(client):
+    recipe = client.get("/api/recipes/").json()[0]
+    assert recipe["id"] == "1"
+    assert recipe["thumbnail"] == {"url": "https://images.unsplash.com/photo-1612874742237-6526221588e3"}
+    assert recipe["media"] == ["https://images.unsplash.com/photo-1612874742237-6526221588e3"]
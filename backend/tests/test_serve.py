@@ -0,0 +1,62 @@
+import asyncio
+
+import change_stream
+import derived_state
+import serve
+from change_stream import ChangeSubscriber, InMemoryChangeSource, change_handlers, start_subscriber
+from ingredient_index import ingredient_index
+
+
+class CountingSource(InMemoryChangeSource):
+    def __init__(self):
+        super().__init__()
+        self.checkpoints = 0
+
+    async def checkpoint(self, collection):
+        self.checkpoints += 1
+        return await super().checkpoint(collection)
+
+
+def test_master_checkpoints_every_stream_the_workers_follow(monkeypatch):
+    monkeypatch.setattr(derived_state, "resume_tokens", None)
+    monkeypatch.setattr(
+        change_stream,
+        "create_subscriber",
+        lambda database, repository, notes=None, media=None: ChangeSubscriber(
+            InMemoryChangeSource(), change_handlers(repository, notes, media),
+        ),
+    )
+    asyncio.run(serve.build_derived_state())
+
+    assert set(derived_state.resume_tokens) == {"recipes", "notes", "media_manifests"}
+    assert [result["id"] for result in ingredient_index.match(["pancetta"])] == ["1"]
+
+
+def test_workers_resume_from_the_given_tokens():
+    async def scenario(tokens):
+        source = CountingSource()
+        subscriber = ChangeSubscriber(source, change_handlers(None))
+        task = await start_subscriber(subscriber, tokens)
+        await asyncio.sleep(0)
+        task.cancel()
+        return source.checkpoints, subscriber.tokens
+
+    assert asyncio.run(scenario({"recipes": 0})) == (0, {"recipes": 0})
+    checkpoints, _ = asyncio.run(scenario(None))
+    assert checkpoints == 1
+
+
+def test_standby_workers_answer_without_building_the_indexes(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from main import app
+
+    monkeypatch.setattr(derived_state, "standby", True)
+    monkeypatch.setattr(derived_state, "prebuilt", False)
+    monkeypatch.setattr(derived_state, "ready", asyncio.Event())
+    with TestClient(app) as client:
+        assert client.get("/healthz").status_code == 200
+        assert client.get("/readyz").status_code == 503
+        assert client.get("/api/search/", params={"query": "carbonara"}).status_code == 503
+        assert client.get("/api/recipes/1").status_code == 200
+    assert not derived_state.ready.is_set()
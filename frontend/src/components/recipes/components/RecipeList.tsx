@@ -41,7 +41,8 @@ const RecipeList: React.FC = () => {
           id: recipe.id || recipe._id,
           title: recipe.title || recipe.name,
           description: recipe.description,
-          imageUrl: recipe.media && recipe.media.length > 0 ? recipe.media[0] : undefined,
+          // Prefer the thumbnail of the first image to the full-size original
+          imageUrl: recipe.thumbnail ? recipe.thumbnail.url : recipe.media && recipe.media.length > 0 ? recipe.media[0] : undefined,
           prepTime: recipe.prep_time,
           cookTime: recipe.cook_time,
           servings: recipe.servings,